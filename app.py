@@ -1,13 +1,23 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, jsonify
+from flask import (Flask, Response, render_template, request, redirect, url_for, send_from_directory,
+                   jsonify, stream_with_context)
 from flask_cors import CORS
 from pathlib import Path
-import time, uuid, json, shutil
+import os, time, uuid, json, shutil, threading, hashlib
 
 from config import settings
-from credilens.agents.pipeline import run_agentic_pipeline, save_json
+from credilens.agents.pipeline import run_agentic_pipeline, save_json, _get_ade_cache
+from credilens.agents.jobs import JobQueue, DONE, FAILED
+from credilens.services.llm import chat_completion, chat_completion_stream, get_llm_cache
+from credilens.services.ratelimit import get_governor
+from credilens.services.tracing import render_metrics
+from credilens.store.catalog import Catalog, PROCESSING, READY, FAILED as DOC_FAILED
+from credilens.store.artifacts import ArtifactCache
+from credilens.store.kg_store import KGStore
+from credilens.engines.retrieval import BM25Index, format_passages
+from credilens.engines.kg_engine import kg_layout
 
 app = Flask(__name__)
 CORS(app)
@@ -20,23 +30,166 @@ GRAPHS = Path(settings.STATIC_GRAPHS_DIR)
 def _doc_dir(doc_id: str) -> Path:
     return OUTPUTS / doc_id
 
-def _load_json(path: Path, default=None):
-    if path.exists():
-        return json.loads(path.read_text())
-    return default
+_static_versions = {}
+
+def _static_url(filename: str) -> str:
+    """Static URL with a content hash, so the file can be cached as immutable."""
+    if filename not in _static_versions:
+        digest = hashlib.sha256((Path(app.static_folder) / filename).read_bytes()).hexdigest()[:12]
+        _static_versions[filename] = url_for("static", filename=filename, v=digest)
+    return _static_versions[filename]
+
+@app.after_request
+def _cache_versioned_static(resp):
+    if request.path.startswith("/static/") and request.args.get("v") and resp.status_code == 200:
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 365 * 24 * 3600
+        resp.cache_control.immutable = True
+    return resp
+
+ARTIFACTS = ArtifactCache(OUTPUTS,
+                          max_bytes=settings.ARTIFACT_CACHE_MAX_MB * 1024 * 1024,
+                          revalidate_seconds=settings.ARTIFACT_CACHE_REVALIDATE_SECONDS)
+
+def _artifact(doc_id: str, name: str, default=None):
+    """Parsed <doc_id>/<name> from the in-process artifact cache (read-only)."""
+    return ARTIFACTS.get(doc_id, name, default)
+
+_catalog = None
+
+def _docs() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(STORAGE / "catalog.sqlite3")
+    return _catalog
+
+_kg_store = None
+
+def _kgs() -> KGStore:
+    global _kg_store
+    if _kg_store is None:
+        _kg_store = KGStore(STORAGE / "kg.sqlite3")
+    return _kg_store
+
+def _run_process_job(job):
+    doc_id = job["doc_id"]
+    out_dir = _doc_dir(doc_id)
+    try:
+        result = run_agentic_pipeline(Path(job["payload"]["pdf_path"]), out_dir,
+                                      refresh=job["payload"].get("refresh", False))
+    except Exception:
+        _docs().set_status(doc_id, DOC_FAILED)
+        raise
+    finally:
+        ARTIFACTS.invalidate(doc_id)
+    company = result["doc"].get("company", {})
+    # Store an index file to quickly load doc meta
+    save_json({"doc_id": doc_id, "company": company}, out_dir / "index.json")
+    _docs().upsert(doc_id, status=READY, company=company, final_score=result["score"].get("final_score"))
+    try:
+        _kgs().ingest(doc_id, (result.get("kg") or {}).get("kg") or {})
+    except Exception:
+        app.logger.exception("KG store ingest failed doc=%s", doc_id)
+    return {"doc_id": doc_id, "failed_stages": sorted(result.get("stage_errors", {}))}
+
+_jobs_queue = None
+_jobs_lock = threading.Lock()
+
+def _reset_jobs_after_fork():
+    # A forked child (gunicorn --preload) inherits the queue object but not its threads
+    global _jobs_queue, _jobs_lock
+    _jobs_queue = None
+    _jobs_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_jobs_after_fork)
+
+def _jobs() -> JobQueue:
+    # One queue per process; importing the app only submits/reads jobs, the worker
+    # threads run where `start_job_workers()` is called
+    global _jobs_queue
+    with _jobs_lock:
+        if _jobs_queue is None:
+            _jobs_queue = JobQueue(STORAGE / "jobs.sqlite3",
+                                   {"process": _run_process_job},
+                                   workers=settings.JOB_WORKERS)
+    return _jobs_queue
+
+def start_job_workers() -> JobQueue:
+    """
+    Start this process's JOB_WORKERS threads and requeue jobs orphaned by a dead process.
+    Called by serving processes only: `python app.py`, the WSGI entry point (wsgi.py) or a
+    gunicorn --preload post_fork hook. Idempotent.
+    """
+    return _jobs().start()
+
+@app.before_request
+def _ensure_job_workers():
+    # Fallback for servers pointed straight at app:app; a no-op once started
+    start_job_workers()
+
+def _job_view(job):
+    view = {k: job[k] for k in ("id", "doc_id", "status", "created_at", "started_at", "finished_at")}
+    view["queue_position"] = _jobs().position(job["id"])
+    if job["status"] == DONE:
+        view["dashboard_url"] = url_for("dashboard", doc_id=job["doc_id"])
+    if job["status"] == FAILED:
+        view["error"] = ((job.get("error") or "").splitlines() or [""])[0]
+    return view
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/api/cache-stats")
+def cache_stats():
+    return jsonify({"ade": _get_ade_cache().stats(), "llm": get_llm_cache().stats(),
+                    "artifacts": ARTIFACTS.stats()})
+
+@app.get("/api/rate-limits")
+def rate_limits():
+    return jsonify(get_governor().stats())
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape target: stage/call latency histograms, call, token and cost counters."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.get("/api/kg/shared")
+def kg_shared():
+    """Entities shared by several documents, e.g. ?type=Auditor&type=Partner&min_docs=2."""
+    return jsonify(_kgs().shared_entities(types=request.args.getlist("type") or None,
+                                          min_docs=request.args.get("min_docs", 2, type=int),
+                                          limit=request.args.get("limit", 100, type=int)))
+
+@app.get("/api/kg/shared/<doc_id>")
+def kg_shared_with(doc_id):
+    """Other documents that share entities with `doc_id` (optionally only ?type=...)."""
+    return jsonify(_kgs().documents_sharing(doc_id, types=request.args.getlist("type") or None,
+                                            limit=request.args.get("limit", 50, type=int)))
+
+@app.get("/api/kg/entity")
+def kg_entity():
+    """Resolve ?label=...[&type=...] and return each match's documents and neighbourhood."""
+    store = _kgs()
+    out = []
+    for ent in store.resolve(request.args.get("label", ""), request.args.get("type") or None):
+        out.append({**ent, "documents": store.documents_for(ent["id"]),
+                    "neighbors": store.neighbors(ent["id"], limit=request.args.get("limit", 50, type=int))})
+    return jsonify(out)
+
 @app.get("/")
 def index():
-    # list recent docs
-    if OUTPUTS.exists():
-        docs = sorted([p.name for p in OUTPUTS.iterdir() if p.is_dir()], reverse=True)[:10]
-    else:
-        docs = []
-    return render_template("index.html", title="Upload", recent=docs)
+    # list recent docs (paginated, optional company/ticker search) from the catalog
+    q = request.args.get("q", "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = 10
+    offset = (page - 1) * per_page
+    cat = _docs()
+    docs = cat.search(q, per_page + 1, offset) if q else cat.recent(per_page + 1, offset)
+    return render_template("index.html", title="Upload", recent=docs[:per_page], q=q, page=page,
+                           has_next=len(docs) > per_page)
 
 @app.post("/process")
 def process_upload():
@@ -47,21 +200,43 @@ def process_upload():
     pdf_path = UPLOADS / f"{doc_id}.pdf"
     f.save(str(pdf_path))
 
-    out_dir = _doc_dir(doc_id)
-    result = run_agentic_pipeline(pdf_path, out_dir)
+    _docs().upsert(doc_id, status=PROCESSING)
+    job_id = _jobs().submit("process", {"pdf_path": str(pdf_path)}, doc_id=doc_id)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id, "doc_id": doc_id,
+                        "status_url": url_for("job_status", job_id=job_id)}), 202
+    return redirect(url_for("dashboard", doc_id=doc_id))
 
-    # Store an index file to quickly load doc meta
-    save_json({"doc_id": doc_id, "company": result["doc"].get("company", {})}, out_dir / "index.json")
+@app.post("/refresh/<doc_id>")
+def refresh_doc(doc_id):
+    """Re-run only the stages whose inputs, rules, prompts or models changed since the last run."""
+    pdf_path = UPLOADS / f"{doc_id}.pdf"
+    if not pdf_path.exists():
+        return jsonify({"error": "unknown document"}), 404
+    _docs().set_status(doc_id, PROCESSING)
+    job_id = _jobs().submit("process", {"pdf_path": str(pdf_path), "refresh": True}, doc_id=doc_id)
+    return jsonify({"job_id": job_id, "doc_id": doc_id,
+                    "status_url": url_for("job_status", job_id=job_id)}), 202
 
-    return redirect(url_for("dashboard", doc_id=doc_id))
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    job = _jobs().get(job_id)
+    if not job:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(_job_view(job))
 
 @app.get("/dashboard/<doc_id>")
 def dashboard(doc_id):
-    ddir = _doc_dir(doc_id)
-    doc = _load_json(ddir / "parsed_extracted10k.json", {})
-    ratios = _load_json(ddir / "ratios.json", {"ratios": {}})
-    score = _load_json(ddir / "score.json", {"pillars":{}, "final_score": None})
-    summaries = _load_json(ddir / "summaries.json", {"pillars":{}, "risks":[]})
+    job = _jobs().latest_for_doc(doc_id)
+    if job and job["status"] != DONE:
+        return render_template("job_status.html",
+                               title="Processing",
+                               doc_id=None,
+                               job=_job_view(job))
+    doc = _artifact(doc_id, "parsed_extracted10k.json", {})
+    ratios = _artifact(doc_id, "ratios.json", {"ratios": {}})
+    score = _artifact(doc_id, "score.json", {"pillars":{}, "final_score": None})
+    summaries = _artifact(doc_id, "summaries.json", {"pillars":{}, "risks":[]})
     # Render Chart.js labels
     pillar_items = list((score.get("pillars") or {}).items())
     return render_template("dashboard.html",
@@ -74,19 +249,22 @@ def dashboard(doc_id):
 
 @app.get("/knowledge-graph/<doc_id>")
 def knowledge_graph(doc_id):
-    ddir = _doc_dir(doc_id)
-    doc = _load_json(ddir / "parsed_extracted10k.json", {})
-    kg = _load_json(ddir / "kg.json", {"kg":{}, "bullets":[], "html": ""})
-    # Make a relative path for iframe
+    doc = _artifact(doc_id, "parsed_extracted10k.json", {})
+    kg = _artifact(doc_id, "kg.json", {"kg":{}, "bullets":[], "html": ""})
+    layout = kg.get("layout")
+    if layout is None and (kg.get("kg") or {}).get("nodes"):
+        layout = kg_layout(kg["kg"])  # documents processed before layouts were stored
+    # Legacy PyVis HTML: relative path for iframe
     html_abs = Path(kg.get("html") or "")
     html_rel = ""
-    if html_abs and html_abs.exists():
-        html_rel = str(html_abs).replace("\\","/")
+    if kg.get("html") and html_abs.exists():
+        html_rel = "/" + str(html_abs).replace("\\","/")
     return render_template("knowledge_graph.html",
                            title="Knowledge Graph",
                            doc_id=doc_id,
                            doc=doc,
-                           kg={"bullets": kg.get("bullets",[]), "html_rel": "/" + html_rel})
+                           kg={"bullets": kg.get("bullets",[]), "html_rel": html_rel,
+                               "layout": layout, "js_url": _static_url("js/kg.js")})
 
 @app.route("/pdf/<doc_id>")
 def pdf_viewer(doc_id):
@@ -94,42 +272,118 @@ def pdf_viewer(doc_id):
     return render_template("pdf_viewer.html",
                            title="PDF",
                            doc_id=doc_id,
-                           doc=_load_json(_doc_dir(doc_id)/"parsed_extracted10k.json", {}),
+                           doc=_artifact(doc_id, "parsed_extracted10k.json", {}),
                            pdf_url=url_for("static", filename=f"uploads/{pdf_file}"))
 
+def _retrieve(doc_id: str, q: str):
+    """Top-k chunk passages for `q` from the doc's BM25 index, or None for docs processed without one."""
+    data = _artifact(doc_id, "retrieval.json")
+    if not data:
+        return None
+    t0 = time.perf_counter()
+    hits = BM25Index.from_dict(data).search(q, k=settings.CHAT_TOP_K)
+    ms = round((time.perf_counter() - t0) * 1000, 3)
+    app.logger.info("retrieval doc=%s hits=%d query_ms=%.3f", doc_id, len(hits), ms)
+    return {"hits": hits, "query_ms": ms, "build_ms": data.get("build_ms"),
+            "pages": sorted({p["page"] for _, p in hits if p.get("page")})}
+
+def _chat_messages(doc_id: str, q: str):
+    """(chat messages, retrieval info or None) for a question about one document."""
+    retrieval = _retrieve(doc_id, q)
+    if retrieval is None:
+        ctx = {
+            "doc": _artifact(doc_id, "parsed_extracted10k.json", {}),
+            "ratios": _artifact(doc_id, "ratios.json", {}),
+            "score": _artifact(doc_id, "score.json", {}),
+            "summaries": _artifact(doc_id, "summaries.json", {}),
+            "kg": _artifact(doc_id, "kg.json", {}),
+        }
+        context = f"CONTEXT(JSON):\n{json.dumps(ctx)[:12000]}"
+    else:
+        doc = _artifact(doc_id, "parsed_extracted10k.json", {})
+        score = _artifact(doc_id, "score.json", {})
+        facts = {
+            "company": doc.get("company"),
+            "financials": doc.get("financials"),
+            "ratios": {k: r.get("value") for k, r in (_artifact(doc_id, "ratios.json", {}).get("ratios") or {}).items()},
+            "final_score": score.get("final_score"),
+            "pillar_scores": {p: m.get("score") for p, m in (score.get("pillars") or {}).items()},
+        }
+        context = (f"FACTS(JSON):\n{json.dumps(facts)}\n\n"
+                   f"PASSAGES (cite the [p. N] page):\n{format_passages(retrieval['hits'])}")
+    # Tight, grounded answer pattern
+    if retrieval is None:  # processed before the retrieval index existed
+        system = ("You are a cautious financial assistant. Answer ONLY from provided JSON context. "
+                  "If unknown, reply 'Not disclosed'. Include citation keys and pages when referencing numbers.")
+    else:
+        system = ("You are a cautious financial assistant. Answer ONLY from the provided FACTS and "
+                  "PASSAGES from the filing. If they do not contain the answer, reply 'Not disclosed'. "
+                  "Cite the page of every passage you use as [p. N], and cite a page for every number.")
+    msg = f"QUESTION: {q}\n\n{context}"
+    return [{"role":"system","content":system},{"role":"user","content":msg}], retrieval
+
+def _answer(doc_id: str, q: str, use_cache: bool = True):
+    """(answer, retrieval info or None) for a question about one document."""
+    messages, retrieval = _chat_messages(doc_id, q)
+    return chat_completion(messages, temperature=0.1, use_cache=use_cache), retrieval
+
+def _sse(data, event=None) -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
 @app.route("/api/chat/<doc_id>", methods=["POST"])
 def api_chat(doc_id):
-    q = (request.json or {}).get("q","").strip()
+    body = request.json or {}
+    q = body.get("q","").strip()
     if not q:
         return jsonify({"answer":"Ask a question."})
-    ddir = _doc_dir(doc_id)
-    ctx = {
-        "doc": _load_json(ddir / "parsed_extracted10k.json", {}),
-        "ratios": _load_json(ddir / "ratios.json", {}),
-        "score": _load_json(ddir / "score.json", {}),
-        "summaries": _load_json(ddir / "summaries.json", {}),
-        "kg": _load_json(ddir / "kg.json", {}),
-    }
-    # Tight, grounded answer pattern
-    system = ("You are a cautious financial assistant. Answer ONLY from provided JSON context. "
-              "If unknown, reply 'Not disclosed'. Include citation keys and pages when referencing numbers.")
-    from openai import OpenAI
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    msg = f"QUESTION: {q}\n\nCONTEXT(JSON):\n{json.dumps(ctx)[:12000]}"
-    resp = client.chat.completions.create(
-        model=settings.OPENAI_MODEL,
-        messages=[{"role":"system","content":system},{"role":"user","content":msg}],
-        temperature=0.1,
-    )
-    answer = resp.choices[0].message.content.strip()
-    return jsonify({"answer": answer})
+    answer, retrieval = _answer(doc_id, q, use_cache=not body.get("no_cache", False))
+    out = {"answer": answer}
+    if retrieval is not None:
+        out["retrieval"] = {k: retrieval[k] for k in ("pages", "query_ms", "build_ms")}
+    return jsonify(out)
+
+@app.route("/api/chat/<doc_id>/stream", methods=["POST"])
+def api_chat_stream(doc_id):
+    """
+    Server-Sent Events: `meta` (cited pages), then `{"delta": ...}` messages as tokens
+    arrive, then `done` with ttft_ms/total_ms (or `error`). A client disconnect closes
+    the generator, which closes the upstream completion stream.
+    """
+    body = request.json or {}
+    q = body.get("q","").strip()
+    use_cache = not body.get("no_cache", False)
+    t0 = time.perf_counter()
+
+    def events():
+        if not q:
+            yield _sse({"delta": "Ask a question."})
+            yield _sse({"ttft_ms": 0.0, "total_ms": 0.0}, "done")
+            return
+        messages, retrieval = _chat_messages(doc_id, q)
+        yield _sse({"pages": (retrieval or {}).get("pages") or []}, "meta")
+        ttft_ms = None
+        try:
+            for delta in chat_completion_stream(messages, temperature=0.1, use_cache=use_cache):
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - t0) * 1000, 1)
+                yield _sse({"delta": delta})
+        except Exception as e:
+            app.logger.exception("chat stream failed doc=%s", doc_id)
+            yield _sse({"error": f"{type(e).__name__}: {e}"}, "error")
+            return
+        total_ms = round((time.perf_counter() - t0) * 1000, 1)
+        app.logger.info("chat stream doc=%s ttft_ms=%s total_ms=%s", doc_id, ttft_ms, total_ms)
+        yield _sse({"ttft_ms": ttft_ms, "total_ms": total_ms}, "done")
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/chat/<doc_id>")
 def chat(doc_id):
     return render_template("chat.html",
                            title="Chat",
                            doc_id=doc_id,
-                           doc=_load_json(_doc_dir(doc_id)/"parsed_extracted10k.json", {}),
+                           doc=_artifact(doc_id, "parsed_extracted10k.json", {}),
                            answer=None)
 
 @app.post("/chat/<doc_id>")
@@ -137,16 +391,16 @@ def chat_post(doc_id):
     q = request.form.get("q","").strip()
     if not q:
         return redirect(url_for("chat", doc_id=doc_id))
-    # call the API endpoint internally
-    with app.test_client() as c:
-        r = c.post(url_for("api_chat", doc_id=doc_id), json={"q": q})
-        answer = r.json.get("answer","")
+    answer, retrieval = _answer(doc_id, q)
     return render_template("chat.html",
                            title="Chat",
                            doc_id=doc_id,
-                           doc=_load_json(_doc_dir(doc_id)/"parsed_extracted10k.json", {}),
-                           answer=answer)
+                           doc=_artifact(doc_id, "parsed_extracted10k.json", {}),
+                           answer=answer,
+                           pages=(retrieval or {}).get("pages"))
 
 if __name__ == "__main__":
+    if not settings.DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_job_workers()  # skip the debug reloader's watcher process; its child serves requests
     print(f"🚀 CrediLens Flask on http://{settings.HOST}:{settings.PORT}")
     app.run(host=settings.HOST, port=settings.PORT, debug=settings.DEBUG)
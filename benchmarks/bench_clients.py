@@ -0,0 +1,111 @@
+"""
+Per-call overhead of a fresh OpenAI client vs the pooled one from services/clients.py,
+measured against a local stub of /v1/chat/completions (no network, no API key needed).
+
+    python benchmarks/bench_clients.py --calls 300 --threads 4
+
+The stub is plain HTTP, so the saving shown is client construction + TCP connect;
+against the real API each new connection also pays a TLS handshake.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("VISION_AGENT_API_KEY", "bench")
+
+_COMPLETION = json.dumps({
+    "id": "bench", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "ok"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    connections: set = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.lock:
+            self.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_COMPLETION)))
+        self.end_headers()
+        self.wfile.write(_COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+
+def _run(label: str, call, calls: int, threads: int) -> dict:
+    _Stub.connections.clear()
+    lat = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        call()
+        lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(calls)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return {"mode": label, "calls": calls, "wall_s": round(wall, 3),
+            "mean_ms": round(statistics.fmean(lat), 3),
+            "p50_ms": round(lat[len(lat) // 2], 3),
+            "p95_ms": round(lat[int(len(lat) * 0.95) - 1], 3),
+            "tcp_connections": len(_Stub.connections)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    import openai
+    from credilens.services.clients import close_clients, get_openai
+
+    msgs = [{"role": "user", "content": "ping"}]
+
+    def fresh():
+        with openai.OpenAI(api_key="bench", max_retries=0) as c:
+            c.chat.completions.create(model="stub", messages=msgs)
+
+    def pooled():
+        get_openai().chat.completions.create(model="stub", messages=msgs)
+
+    pooled()  # build the shared client outside the timed loop
+    results = [_run("client per call", fresh, args.calls, args.threads),
+               _run("pooled client", pooled, args.calls, args.threads)]
+    close_clients()
+    server.shutdown()
+
+    for r in results:
+        print(json.dumps(r))
+    saved = results[0]["mean_ms"] - results[1]["mean_ms"]
+    print(f"per-call overhead saved: {saved:.3f} ms "
+          f"({results[0]['mean_ms'] / results[1]['mean_ms']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
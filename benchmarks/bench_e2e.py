@@ -0,0 +1,163 @@
+"""
+End-to-end pipeline benchmark against the offline ADE/OpenAI fakes (services/fakes.py):
+N uploads are POSTed to the Flask app's /process route from --concurrency threads, the
+background job queue runs the full pipeline, and per-stage / end-to-end latency
+percentiles and throughput are reported. No keys, no network.
+
+    python benchmarks/bench_e2e.py --uploads 40 --concurrency 8 --job-workers 4 --pages 60
+
+Everything runs in a temporary STORAGE_DIR with the ADE/LLM caches off (pass --warm to
+keep them on). Fake latency/size knobs are the FAKE_* settings, e.g.
+FAKE_ADE_LATENCY_MS=0 FAKE_LLM_LATENCY_MS=0 measures pure local overhead.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0–100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def make_pdf(pages: int, tag: str) -> bytes:
+    from pypdf import PdfWriter
+    w = PdfWriter()
+    for _ in range(pages):
+        w.add_blank_page(width=612, height=792)
+    w.add_metadata({"/Title": tag})  # distinct bytes per upload: no ADE cache collisions
+    buf = io.BytesIO()
+    w.write(buf)
+    return buf.getvalue()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="offline end-to-end pipeline benchmark")
+    ap.add_argument("--uploads", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=4, help="client threads submitting uploads")
+    ap.add_argument("--job-workers", type=int, default=2, help="JOB_WORKERS for the app's queue")
+    ap.add_argument("--pages", type=int, default=60, help="pages per generated PDF")
+    ap.add_argument("--warm", action="store_true", help="keep the ADE/LLM caches enabled")
+    ap.add_argument("--no-rate-limit", action="store_true", help="disable the shared rate limiter")
+    ap.add_argument("--json", type=Path, help="also write raw per-upload timings here")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="credilens-bench-"))
+    os.environ.update({
+        "OPENAI_API_KEY": "offline", "VISION_AGENT_API_KEY": "offline", "FAKE_SERVICES": "true",
+        "FAKE_SEED_PATH": str(ROOT / "data/examples/dummy_extracted_10k.yaml"),
+        "STORAGE_DIR": str(tmp / "data"), "STATIC_PDFS_DIR": str(tmp / "uploads"),
+        "STATIC_GRAPHS_DIR": str(tmp / "graphs"), "JOB_WORKERS": str(args.job_workers),
+        "DEBUG": "false",
+    })
+    if not args.warm:
+        os.environ.update({"ADE_CACHE_ENABLED": "false", "LLM_CACHE_ENABLED": "false"})
+    if args.no_rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+    (tmp / "uploads").mkdir(parents=True)
+    os.chdir(ROOT)  # the pipeline reads data/config/* relative to the repo
+
+    import app as web  # noqa: E402  (settings are read at import time)
+    from credilens.agents import pipeline  # noqa: E402
+
+    # per-upload ADE and analysis wall time, attributed through the job's worker thread
+    local = threading.local()
+    phases: Dict[str, Dict[str, float]] = {}
+    ade_fn, stages_fn = pipeline.ade_parse_extract_cached, pipeline.run_stages
+
+    def timed_ade(pdf_path):
+        local.doc = Path(pdf_path).stem
+        t0 = time.perf_counter()
+        try:
+            return ade_fn(pdf_path)
+        finally:
+            phases.setdefault(local.doc, {})["ade"] = time.perf_counter() - t0
+
+    def timed_stages(*a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return stages_fn(*a, **kw)
+        finally:
+            phases.setdefault(local.doc, {})["analysis"] = time.perf_counter() - t0
+
+    pipeline.ade_parse_extract_cached, pipeline.run_stages = timed_ade, timed_stages
+
+    pdfs = [make_pdf(args.pages, f"bench-{i}") for i in range(args.uploads)]
+    jobs: List[Dict[str, str]] = []
+    jobs_lock = threading.Lock()
+    web.start_job_workers()
+
+    def upload(i: int) -> None:
+        client = web.app.test_client()
+        resp = client.post("/process", data={"pdf": (io.BytesIO(pdfs[i]), f"bench-{i}.pdf")},
+                           headers={"Accept": "application/json"}, content_type="multipart/form-data")
+        assert resp.status_code == 202, resp.data
+        with jobs_lock:
+            jobs.append(resp.get_json())
+
+    print(f"{args.uploads} uploads × {args.pages} pages, {args.concurrency} client threads, "
+          f"{args.job_workers} job workers, caches {'on' if args.warm else 'off'}, storage {tmp}")
+    t_start = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(upload, range(args.uploads)))
+    queue = web._jobs()
+    pending = {j["job_id"] for j in jobs}
+    while pending:
+        time.sleep(0.05)
+        pending = {jid for jid in pending if queue.get(jid)["status"] not in (web.DONE, web.FAILED)}
+    t_end = time.time()
+    queue.stop(timeout=5)
+
+    rows = []
+    series: Dict[str, List[float]] = {}
+    for j in jobs:
+        job = queue.get(j["job_id"])
+        row = {"doc_id": j["doc_id"], "status": job["status"],
+               "queue_wait": job["started_at"] - job["created_at"],
+               "job_run": job["finished_at"] - job["started_at"],
+               "end_to_end": job["finished_at"] - job["created_at"]}
+        row.update(phases.get(j["doc_id"], {}))
+        stages_path = web._doc_dir(j["doc_id"]) / "stages.json"
+        if stages_path.exists():
+            for name, st in json.loads(stages_path.read_text()).items():
+                if st.get("seconds") is not None:
+                    row[f"stage.{name}"] = st["seconds"]
+        rows.append(row)
+        if job["status"] == web.DONE:
+            for k, v in row.items():
+                if isinstance(v, float):
+                    series.setdefault(k, []).append(v)
+
+    order = ["queue_wait", "ade", "analysis"] + sorted(k for k in series if k.startswith("stage.")) \
+        + ["job_run", "end_to_end"]
+    print(f"\n{'phase (seconds)':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for k in order:
+        if k in series:
+            v = series[k]
+            print(f"{k:<26} {percentile(v, 50):8.3f} {percentile(v, 95):8.3f} {percentile(v, 99):8.3f} {max(v):8.3f}")
+    done = sum(1 for r in rows if r["status"] == web.DONE)
+    wall = t_end - t_start
+    print(f"\ncompleted {done}/{len(rows)} in {wall:.2f}s: {done / wall:.2f} docs/s ({done / wall * 60:.1f} docs/min)")
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
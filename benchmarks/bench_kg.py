@@ -0,0 +1,108 @@
+"""
+Coverage and wall-clock of KG extraction: the single call over the first 12,000 chars
+vs the chunked map-reduce mode (KG_EXTRACT_MODE=chunked).
+
+Offline (default): a synthetic filing with --entities named entities spread through
+--chars of text, and a stub model that "finds" the entities present in its prompt and
+sleeps --base-ms + --ms-per-1k-tokens per call, so the numbers show coverage and the
+effect of concurrency without an API key.
+
+    python benchmarks/bench_kg.py --chars 400000 --entities 300
+
+Live: run both modes against a processed document with the configured model
+(responses are LLM-cached, so pass --no-cache to time real calls).
+
+    python benchmarks/bench_kg.py --doc data/outputs/<doc_id>/parsed_extracted10k.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("VISION_AGENT_API_KEY", "bench")
+
+from config import settings  # noqa: E402
+from credilens.engines import kg_engine as K  # noqa: E402
+
+_TYPES = ("Product", "Segment", "Geography", "Risk", "Partner", "Client", "Auditor")
+_FILLER = ("revenue increased compared to the prior year driven by pricing and volume",
+           "management believes liquidity is sufficient for the next twelve months",
+           "the company may be adversely affected by changes in interest rates",
+           "operating expenses reflect continued investment in research and development")
+
+
+def synthetic_doc(chars: int, entities: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    names = [(f"Entity{i:04d}", rnd.choice(_TYPES)) for i in range(entities)]
+    sections = {"business_overview": [], "mdna": [], "risk_factors": []}
+    keys = list(sections)
+    size = 0
+    i = 0
+    while size < chars:
+        name = names[i % entities][0]
+        para = f"{name} {rnd.choice(_FILLER)}. " + " ".join(rnd.choice(_FILLER) + "." for _ in range(4))
+        sections[keys[i % 3]].append(para)
+        size += len(para)
+        i += 1
+    return {"company": {"name": "Synthetic Corp"},
+            "sections": {"business_overview": "\n\n".join(sections["business_overview"]),
+                         "mdna": "\n\n".join(sections["mdna"]),
+                         "risk_factors": sections["risk_factors"]},
+            "_types": dict(names)}
+
+
+def stub_model(types: dict, base_ms: float, ms_per_1k: float):
+    def chat_completion(messages, **_):
+        text = messages[-1]["content"]
+        time.sleep((base_ms + ms_per_1k * len(text) / K.CHARS_PER_TOKEN / 1000) / 1000)
+        found = sorted(set(re.findall(r"Entity\d{4}", text)))
+        nodes = [{"id": "c", "label": "Synthetic Corp", "type": "Company"}]
+        nodes += [{"id": str(i), "label": n, "type": types[n]} for i, n in enumerate(found)]
+        edges = [{"source": "c", "target": str(i), "label": "mentions"} for i in range(len(found))]
+        return json.dumps({"nodes": nodes, "edges": edges})
+    return chat_completion
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="KG extraction: single call vs chunked map-reduce")
+    ap.add_argument("--doc", type=Path, help="parsed_extracted10k.json to run live against the model")
+    ap.add_argument("--no-cache", action="store_true", help="bypass the LLM cache in live mode")
+    ap.add_argument("--chars", type=int, default=400_000, help="synthetic filing size")
+    ap.add_argument("--entities", type=int, default=300, help="distinct synthetic entities")
+    ap.add_argument("--base-ms", type=float, default=800.0, help="stub latency per call")
+    ap.add_argument("--ms-per-1k-tokens", type=float, default=400.0, help="stub latency per 1k prompt tokens")
+    args = ap.parse_args()
+
+    if args.doc:
+        doc = json.loads(args.doc.read_text())
+        if args.no_cache:
+            settings.LLM_CACHE_ENABLED = False
+        truth = None
+    else:
+        doc = synthetic_doc(args.chars, args.entities)
+        K.chat_completion = stub_model(doc["_types"], args.base_ms, args.ms_per_1k_tokens)
+        truth = args.entities + 1  # plus the company itself
+
+    text_chars = sum(len(s) for s in K._sections(doc))
+    print(f"filing text: {text_chars:,} chars; window {settings.KG_WINDOW_TOKENS} tokens, "
+          f"{settings.KG_WORKERS} workers, max {settings.KG_MAX_WINDOWS} windows, max {settings.KG_MAX_NODES} nodes")
+    print(f"  {'mode':<8} {'windows':>7} {'chars seen':>11} {'nodes':>6} {'edges':>6} {'coverage':>9} {'wall ms':>9}")
+    for mode in ("single", "chunked"):
+        t0 = time.perf_counter()
+        st = K.extract_kg(doc, mode=mode)["stats"]
+        ms = (time.perf_counter() - t0) * 1000.0
+        cov = f"{st['nodes'] / truth:.0%}" if truth else "-"
+        print(f"  {mode:<8} {st['windows']:>7} {st['chars']:>11,} {st['nodes']:>6} {st['edges']:>6} "
+              f"{cov:>9} {ms:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmarks for qa/provenance.py: the previous re-sort-on-every-insert functions
+vs the current add_ref / merge_page_refs / build_clickmap and the interval PageSet.
+
+    python benchmarks/bench_provenance.py --refs 5000 --pages 400
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from credilens.qa import provenance as P  # noqa: E402
+
+
+# ---- previous implementations (baseline) ----
+
+def legacy_normalize(pages: Iterable[int]) -> List[int]:
+    uniq = set()
+    for p in pages:
+        try:
+            ip = int(p)
+        except (TypeError, ValueError):
+            continue
+        if ip > 0:
+            uniq.add(ip)
+    return sorted(uniq)
+
+
+def legacy_add_ref(page_refs: Dict[str, List[int]], keypath: str, pages: Iterable[int]) -> None:
+    pages_norm = legacy_normalize(pages)
+    if not keypath or not pages_norm:
+        return
+    page_refs[keypath] = legacy_normalize([*page_refs.get(keypath, []), *pages_norm])
+
+
+def legacy_merge(a, b):
+    out = {k: legacy_normalize(v) for k, v in a.items()}
+    for k, v in b.items():
+        out[k] = legacy_normalize([*out.get(k, []), *(v or [])])
+    return out
+
+
+def _bench(label: str, fn, number: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<38} {best * 1e3:9.3f} ms")
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="provenance micro-benchmarks")
+    ap.add_argument("--refs", type=int, default=5000, help="add_ref calls per document")
+    ap.add_argument("--pages", type=int, default=400, help="document length in pages")
+    ap.add_argument("--keys", type=int, default=40, help="distinct keypaths")
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    keys = [f"financials.field_{i}" for i in range(args.keys)]
+    # chunk-level refs: mostly runs of neighbouring pages, some scattered
+    calls = []
+    for _ in range(args.refs):
+        start = rnd.randint(1, args.pages)
+        calls.append((rnd.choice(keys), [start + d for d in range(rnd.choice((1, 1, 2, 3)))]))
+
+    def run(add):
+        refs: Dict[str, List[int]] = {}
+        for k, pages in calls:
+            add(refs, k, pages)
+        return refs
+
+    def run_pageset():
+        sets: Dict[str, P.PageSet] = {}
+        for k, pages in calls:
+            ps = sets.get(k)
+            if ps is None:
+                ps = sets[k] = P.PageSet()
+            ps.update(pages)
+        return sets
+
+    assert run(legacy_add_ref) == run(P.add_ref) == P.page_sets_to_refs(run_pageset())
+    refs = run(P.add_ref)
+    other = run(P.add_ref)
+    sets = P.page_sets_from_refs(refs)
+
+    print(f"{args.refs} refs over {args.keys} keys, {args.pages}-page document")
+    print("add_ref (all refs)")
+    a = _bench("legacy (normalize + sort per add)", lambda: run(legacy_add_ref), 3)
+    b = _bench("add_ref (bisect insert)", lambda: run(P.add_ref), 3)
+    c = _bench("PageSet.update", run_pageset, 3)
+    print(f"  speedup: add_ref {a / b:.1f}x, PageSet {a / c:.1f}x")
+
+    print("merge two documents' page_refs")
+    a = _bench("legacy merge_page_refs", lambda: legacy_merge(refs, other), 20)
+    b = _bench("merge_page_refs", lambda: P.merge_page_refs(refs, other), 20)
+    c = _bench("PageSet union per key", lambda: {k: s | sets[k] for k, s in sets.items()}, 20)
+    print(f"  speedup: merge_page_refs {a / b:.1f}x, PageSet {a / c:.1f}x")
+
+    print("render")
+    _bench("build_clickmap (lists)", lambda: P.build_clickmap(refs, doc_id="d"), 20)
+    _bench("build_clickmap (PageSets)", lambda: P.build_clickmap(sets, doc_id="d"), 20)
+    a = _bench("compact_ranges (lists)", lambda: [P.compact_ranges(v) for v in refs.values()], 50)
+    b = _bench("PageSet.compact", lambda: [s.compact() for s in sets.values()], 50)
+    print(f"  speedup: compact {a / b:.1f}x")
+
+    print("JSON round trip")
+    _bench("page_sets_from_refs + to_refs", lambda: P.page_sets_to_refs(P.page_sets_from_refs(refs)), 20)
+    assert P.page_sets_to_refs(P.page_sets_from_refs(refs)) == refs
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 from pathlib import Path
+from typing import Dict
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
@@ -13,6 +14,12 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-5"
     ADE_PARSE_MODEL: str = "dpt-2-latest"
     ADE_EXTRACT_MODEL: str = "extract-latest"
+    # Parse PDFs longer than ADE_SHARD_MIN_PAGES as concurrent ADE_SHARD_PAGES-page shards (0 = off)
+    ADE_SHARD_PAGES: int = 50
+    ADE_SHARD_MIN_PAGES: int = 120
+    ADE_SHARD_WORKERS: int = 4
+    # One JSON-mode request for all pillar summaries instead of one per pillar
+    PILLAR_SUMMARY_BATCHED: bool = True
 
     HOST: str = "127.0.0.1"
     PORT: int = 8000
@@ -21,6 +28,91 @@ class Settings(BaseSettings):
     STORAGE_DIR: str = "data"
     STATIC_PDFS_DIR: str = "static/uploads"
     STATIC_GRAPHS_DIR: str = "static/graphs"
+    # "json": kg.json + server-side layout drawn by static/js/kg.js; "pyvis": standalone HTML per doc
+    KG_RENDER_MODE: str = "json"
+    # "chunked": map the full filing text in KG_WINDOW_TOKENS windows and merge; "single": first 12k chars
+    KG_EXTRACT_MODE: str = "chunked"
+    KG_WINDOW_TOKENS: int = 3000
+    KG_WINDOW_OVERLAP_TOKENS: int = 150
+    KG_MAX_WINDOWS: int = 32
+    KG_WORKERS: int = 4
+    KG_MAX_NODES: int = 150
+
+    # Background pipeline jobs (queue lives in STORAGE_DIR/jobs.sqlite3)
+    JOB_WORKERS: int = 2
+    # Threads per pipeline for independent analysis stages (QA, scoring, LLM summaries, KG)
+    PIPELINE_STAGE_WORKERS: int = 4
+
+    # Content-addressed ADE parse/extract cache (STORAGE_DIR/cache/ade)
+    ADE_CACHE_ENABLED: bool = True
+    ADE_CACHE_MAX_MB: int = 512
+
+    # Shared LLM response cache (STORAGE_DIR/cache/llm.sqlite3); per-call bypass via use_cache=False
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_MB: int = 256
+
+    # In-process cache of parsed data/outputs/<doc_id>/*.json for the web routes
+    ARTIFACT_CACHE_MAX_MB: int = 128
+    ARTIFACT_CACHE_REVALIDATE_SECONDS: float = 5.0
+
+    # Shared OpenAI/ADE HTTP connection pools (one client per process, see services/clients.py)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    OPENAI_TIMEOUT_SECONDS: float = 120.0
+    ADE_TIMEOUT_SECONDS: float = 600.0
+
+    # Outbound rate limits shared by all workers (STORAGE_DIR/ratelimit.sqlite3); 0 = unlimited.
+    # *_MAX_CONCURRENCY caps in-flight calls across all processes on the host; a slot held by
+    # a process that died is freed after RATE_LIMIT_SLOT_LEASE_SECONDS (keep it > the timeouts).
+    # Per-model overrides: RATE_LIMITS='{"openai:gpt-5": {"rpm": 500, "tpm": 400000, "concurrency": 8}}'
+    RATE_LIMIT_ENABLED: bool = True
+    LLM_RPM: int = 500
+    LLM_TPM: int = 200_000
+    LLM_MAX_CONCURRENCY: int = 8
+    ADE_RPM: int = 60
+    ADE_MAX_CONCURRENCY: int = 4
+    RATE_LIMITS: Dict[str, Dict[str, int]] = {}
+    RATE_LIMIT_MAX_RETRIES: int = 5
+    RATE_LIMIT_BACKOFF_BASE_SECONDS: float = 1.0
+    RATE_LIMIT_BACKOFF_MAX_SECONDS: float = 60.0
+    RATE_LIMIT_SLOT_LEASE_SECONDS: float = 900.0
+
+    # Risk bullets: "hybrid" = local anchor tagger picks tags/pages, LLM explains the top paragraphs;
+    # "local" = tagging only (no LLM); "llm" = whole taxonomy + risk text in one prompt
+    RISK_TAGGER_MODE: str = "hybrid"
+    RISK_MAX_TAGS: int = 5
+    RISK_PARAGRAPHS_PER_TAG: int = 3
+    RISK_PARAGRAPH_MAX_CHARS: int = 1500
+
+    # Offline ADE/OpenAI stand-ins (services/fakes.py) seeded from FAKE_SEED_PATH: no keys or network used
+    FAKE_SERVICES: bool = False
+    FAKE_SEED_PATH: str = "data/examples/dummy_extracted_10k.yaml"
+    FAKE_ADE_LATENCY_MS: float = 1500.0
+    FAKE_ADE_MS_PER_PAGE: float = 40.0
+    FAKE_ADE_PAGES: int = 80          # when the uploaded file is not a readable PDF
+    FAKE_ADE_CHUNKS_PER_PAGE: int = 6
+    FAKE_ADE_CHUNK_CHARS: int = 600
+    FAKE_LLM_LATENCY_MS: float = 500.0
+    FAKE_LLM_MS_PER_TOKEN: float = 8.0
+    FAKE_LLM_COMPLETION_TOKENS: int = 200
+    FAKE_JITTER: float = 0.2          # ± fraction applied to every simulated latency
+
+    # Spans per phase/stage/outbound call → outputs/<doc_id>/timings.json and the /metrics route.
+    # Cost estimates: LLM_PRICES in USD per 1M tokens (exact model or longest prefix), ADE per parsed page.
+    TRACING_ENABLED: bool = True
+    LLM_PRICES: Dict[str, Dict[str, float]] = {
+        "gpt-5": {"prompt": 1.25, "completion": 10.0},
+        "gpt-5-mini": {"prompt": 0.25, "completion": 2.0},
+        "gpt-4o": {"prompt": 2.5, "completion": 10.0},
+        "gpt-4o-mini": {"prompt": 0.15, "completion": 0.6},
+    }
+    ADE_COST_PER_PAGE: float = 0.0
+
+    # Chunk passages retrieved (BM25 over ADE chunks) per chat question
+    CHAT_TOP_K: int = 6
 
     @field_validator("OPENAI_API_KEY", "VISION_AGENT_API_KEY")
     @classmethod
@@ -0,0 +1,151 @@
+# credilens/agents/ade_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def sha256_file(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def ade_cache_key(pdf_path: Union[str, Path], parse_model: str, extract_model: str,
+                  schema: Dict[str, Any]) -> str:
+    """
+    Content address for one ADE parse+extract result:
+    sha256(pdf bytes) + parse model + extract model + extraction schema hash.
+    """
+    parts = [sha256_file(pdf_path), parse_model, extract_model, schema_hash(schema)]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+class ADECache:
+    """
+    Disk cache of ADE results: {"markdown": str, "chunks": [...], "extraction": {...}}.
+
+    Payloads are JSON files under `root/`; a SQLite index tracks size and last access
+    so the cache stays under `max_bytes` by evicting least-recently-used entries.
+    Hit/miss/eviction counters are persisted alongside and returned by `stats()`.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30, isolation_level=None)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    @staticmethod
+    def _bump(con: sqlite3.Connection, name: str, n: int = 1) -> None:
+        con.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, n),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        with self._connect() as con:
+            known = con.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+            if not known or not path.exists():
+                if known:
+                    con.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump(con, "misses")
+                return None
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                con.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bump(con, "misses")
+                return None
+            con.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._bump(con, "hits")
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        data = json.dumps(entry).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created_at, last_access) VALUES (?,?,?,?)",
+                (key, len(data), now, now),
+            )
+            self._evict(con)
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in con.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            con.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._bump(con, "evictions")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as con:
+            counters = dict(con.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
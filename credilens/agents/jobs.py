@@ -0,0 +1,212 @@
+# credilens/agents/jobs.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+Handler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    doc_id      TEXT,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    owner_pid   INTEGER,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_doc_id ON jobs(doc_id);
+"""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Durable FIFO job queue backed by SQLite, drained by a bounded pool of worker threads.
+
+    Jobs are rows in `jobs`; a worker claims the oldest queued row with a single
+    UPDATE so several processes can share one database file. On start, jobs left
+    `running` by a process that no longer exists are put back in the queue, so
+    uploads survive a restart.
+
+        q = JobQueue(Path("data/jobs.sqlite3"), {"process": run_upload}, workers=2)
+        q.start()
+        job_id = q.submit("process", {"pdf_path": "..."}, doc_id="1762750644-40cb22")
+        q.get(job_id)["status"]  # queued | running | done | failed
+    """
+
+    def __init__(self, db_path: Path, handlers: Mapping[str, Handler], workers: int = 2,
+                 poll_interval: float = 2.0):
+        self.db_path = Path(db_path)
+        self.handlers = dict(handlers)
+        self.workers = max(1, int(workers))
+        self.poll_interval = poll_interval
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    # ---- producer side ----
+
+    def submit(self, kind: str, payload: Dict[str, Any], doc_id: Optional[str] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._connect() as con:
+            con.execute(
+                "INSERT INTO jobs (id, kind, doc_id, payload, status, created_at) VALUES (?,?,?,?,?,?)",
+                (job_id, kind, doc_id, json.dumps(payload), QUEUED, time.time()),
+            )
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def latest_for_doc(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT * FROM jobs WHERE doc_id = ? ORDER BY created_at DESC LIMIT 1", (doc_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Number of queued jobs ahead of `job_id` (None once it has left the queue)."""
+        with self._connect() as con:
+            row = con.execute("SELECT status, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row or row["status"] != QUEUED:
+                return None
+            ahead = con.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, row["created_at"])
+            ).fetchone()[0]
+        return int(ahead)
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        d = dict(row)
+        d["payload"] = json.loads(d["payload"]) if d.get("payload") else {}
+        d["result"] = json.loads(d["result"]) if d.get("result") else None
+        return d
+
+    # ---- consumer side ----
+
+    def recover(self) -> int:
+        """Requeue jobs whose owning process died mid-run. Returns the number requeued."""
+        requeued = 0
+        with self._connect() as con:
+            rows = con.execute("SELECT id, owner_pid FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            for row in rows:
+                if _pid_alive(row["owner_pid"]) and row["owner_pid"] != os.getpid():
+                    continue
+                cur = con.execute(
+                    "UPDATE jobs SET status = ?, owner_pid = NULL, started_at = NULL "
+                    "WHERE id = ? AND status = ?",
+                    (QUEUED, row["id"], RUNNING),
+                )
+                requeued += cur.rowcount
+        return requeued
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if not row:
+                con.execute("COMMIT")
+                return None
+            con.execute(
+                "UPDATE jobs SET status = ?, owner_pid = ?, started_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (RUNNING, os.getpid(), time.time(), row["id"]),
+            )
+            claimed = con.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            con.execute("COMMIT")
+        return self._row_to_dict(claimed)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._connect() as con:
+            con.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def run_one(self) -> bool:
+        """Claim and run a single job in the calling thread. Returns False if the queue was empty."""
+        job = self._claim()
+        if job is None:
+            return False
+        try:
+            result = self.handlers[job["kind"]](job)
+            self._finish(job["id"], DONE, result=result)
+        except Exception as e:
+            self._finish(job["id"], FAILED, error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+        return True
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            if self.run_one():
+                continue
+            with self._wake:
+                self._wake.wait(self.poll_interval)
+
+    def start(self) -> "JobQueue":
+        if self._threads:
+            return self
+        self.recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"credilens-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
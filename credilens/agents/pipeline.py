@@ -1,19 +1,50 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
-from tempfile import NamedTemporaryFile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 
-from landingai_ade import LandingAIADE, UnprocessableEntityError
+from landingai_ade import UnprocessableEntityError
 
+from .ade_cache import ADECache, ade_cache_key
+from .scheduler import Stage, file_hash, run_stages
+from .shards import merge_shards, pdf_page_count, split_pdf
+from ..engines import kg_engine, ratio_engine, retrieval, risk_tagger, scoring_engine, summary_engine
 from ..engines.mapper import map_ade_to_10k
 from ..engines.ratio_engine import compute_ratios
-from ..engines.scoring_engine import compute_scores
-from ..engines.summary_engine import generate_pillar_summaries, generate_risk_bullets
-from ..engines.kg_engine import build_kg, kg_to_4_bullets
+from ..engines.scoring_engine import SCORING_YAML, compute_scores
+from ..engines.summary_engine import (PILLAR_BATCH_SYS, PILLAR_SUMMARY_SYS, RISK_BULLETS_SYS, RISK_EXPLAIN_SYS,
+                                      generate_pillar_summaries, generate_risk_bullets)
+from ..engines.kg_engine import (BULLETS_SYS, KG_SYS, LAYOUT_HEIGHT, LAYOUT_WIDTH, build_kg, kg_layout,
+                                 kg_to_4_bullets)
+from ..engines.retrieval import build_retrieval_index
+from ..qa import checks as qa_checks
 from ..qa.checks import run_all_checks
+from ..qa.numeric_index import NumericIndex
+from ..rules import ratios as ratio_rules
 from ..schemas.models import Extracted10K
+from ..store import kg_store
+from ..services.clients import get_ade
+from ..services.ratelimit import governed_call
+from ..services.tracing import annotate, propagate, span, trace
 from config import settings
 
+log = logging.getLogger(__name__)
+
+FINGERPRINTS = "fingerprints.json"
+# Rule and engine modules hashed as this process imported them: RATIOS/COMPILED and the
+# checks are built at import, and any engine edit only runs after a restart, so fingerprints
+# must describe the code that runs, not a later edit on disk (that takes effect, and re-runs
+# the stages it implements, once workers restart)
+_LOADED_CODE = {Path(m.__file__).name: file_hash(m.__file__)
+                for m in (ratio_rules, ratio_engine, qa_checks, scoring_engine, summary_engine,
+                          risk_tagger, retrieval, kg_engine, kg_store)}
+
+
+def _code(*names: str) -> Dict[str, Optional[str]]:
+    return {n: _LOADED_CODE[n] for n in names}
+
 
 def save_json(obj, path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -170,14 +201,78 @@ def _minimal_extraction_schema() -> dict:
     }
 
 
-def run_agentic_pipeline(pdf_path: Path, out_dir: Path) -> Dict[str, Any]:
-    out_dir.mkdir(parents=True, exist_ok=True)
+_ade_cache = None
+
+
+def _get_ade_cache() -> ADECache:
+    global _ade_cache
+    if _ade_cache is None:
+        _ade_cache = ADECache(Path(settings.STORAGE_DIR) / "cache" / "ade",
+                              max_bytes=settings.ADE_CACHE_MAX_MB * 1024 * 1024)
+    return _ade_cache
+
+
+def _chunk_to_dict(ch) -> Dict[str, Any]:
+    if isinstance(ch, dict):
+        return ch
+    return ch.model_dump(mode="json") if hasattr(ch, "model_dump") else dict(ch)
+
+
+def _chunk_page(ch: Dict[str, Any]):
+    """0-indexed page of a chunk; grounding is a single object or a list of them."""
+    g = ch.get("grounding") or {}
+    if isinstance(g, list):
+        g = g[0] if g else {}
+    return (g or {}).get("page")
 
-    # 1) ADE parse (PDF → markdown + chunks)
-    ade = LandingAIADE()
-    parsed = ade.parse(document_url=str(pdf_path), model=settings.ADE_PARSE_MODEL)
-    markdown_text = parsed.markdown or ""
-    chunks = parsed.chunks or []
+
+def _shard_pages(pdf_path: Path) -> int:
+    """Pages per parse shard for this PDF, or 0 to parse it in one call."""
+    size = settings.ADE_SHARD_PAGES
+    if size <= 0:
+        return 0
+    try:
+        n = pdf_page_count(pdf_path)
+    except ImportError:
+        log.warning("pypdf is not installed; parsing %s without sharding", pdf_path.name)
+        return 0
+    except Exception as e:  # unreadable locally; let ADE try the whole file
+        log.warning("could not count pages of %s (%s); parsing without sharding", pdf_path.name, e)
+        return 0
+    return size if n > max(size, settings.ADE_SHARD_MIN_PAGES) else 0
+
+
+def _ade_parse(pdf_path: Path, shard_pages: int = 0) -> Tuple[str, List[Dict[str, Any]]]:
+    """ADE parse → (markdown, chunk dicts), optionally as concurrent page-range shards."""
+    ade = get_ade()
+
+    def parse(path: Path) -> Tuple[str, List[Dict[str, Any]]]:
+        with span("ade.parse", kind="call", model=settings.ADE_PARSE_MODEL) as sp:
+            parsed = governed_call("ade", settings.ADE_PARSE_MODEL,
+                                   lambda: ade.parse(document_url=str(path), model=settings.ADE_PARSE_MODEL))
+            chunks = [_chunk_to_dict(ch) for ch in (parsed.chunks or [])]
+            pages = len({p for p in map(_chunk_page, chunks) if p is not None})
+            sp.set(pages=pages, chunks=len(chunks), cost_usd=round(pages * settings.ADE_COST_PER_PAGE, 6))
+        return parsed.markdown or "", chunks
+
+    if not shard_pages:
+        return parse(pdf_path)
+    with TemporaryDirectory(prefix="ade-shards-") as tmp:
+        shards = split_pdf(pdf_path, shard_pages, Path(tmp))
+        log.info("parsing %s as %d shards of %d pages", pdf_path.name, len(shards), shard_pages)
+        with ThreadPoolExecutor(max_workers=max(1, settings.ADE_SHARD_WORKERS)) as pool:
+            results = list(pool.map(propagate(lambda s: parse(s[1])), shards))
+    return merge_shards([(start, md, chunks) for (start, _), (md, chunks) in zip(shards, results)])
+
+
+def _ade_parse_extract(pdf_path: Path, shard_pages: int = 0) -> Dict[str, Any]:
+    """
+    Run ADE parse + extract, returning {"markdown", "chunks", "extraction", "schema"}, where
+    "schema" is "full", or "minimal" when ADE rejected the full schema (422).
+    """
+    # 1) ADE parse (PDF → markdown + chunks); page-range shards for long filings
+    ade = get_ade()
+    markdown_text, chunks = _ade_parse(pdf_path, shard_pages)
 
     # Write markdown to a temp file (ADE expects a file pointer / path for 'markdown')
     with NamedTemporaryFile(mode="w", suffix=".md", delete=False, encoding="utf-8") as tmp_md:
@@ -186,25 +281,142 @@ def run_agentic_pipeline(pdf_path: Path, out_dir: Path) -> Dict[str, Any]:
 
     # 2) ADE extract with safe schema; fallback to minimal on 422
     schema = _safe_extraction_schema()
+    used = "full"
     try:
-        extracted = ade.extract(
-            schema=schema,          # dict is fine; client serializes to JSON
-            markdown=md_path,       # pass a file path, not a string blob
-            model=settings.ADE_EXTRACT_MODEL
-        ).extraction
+        with span("ade.extract", kind="call", model=settings.ADE_EXTRACT_MODEL):
+            extracted = governed_call("ade", settings.ADE_EXTRACT_MODEL, lambda: ade.extract(
+                schema=schema,          # dict is fine; client serializes to JSON
+                markdown=md_path,       # pass a file path, not a string blob
+                model=settings.ADE_EXTRACT_MODEL
+            )).extraction
     except UnprocessableEntityError as e:
         # Retry with a smaller schema if server complains about schema payload
-        extracted = ade.extract(
-            schema=_minimal_extraction_schema(),
-            markdown=md_path,
-            model=settings.ADE_EXTRACT_MODEL
-        ).extraction
+        with span("ade.extract", kind="call", model=settings.ADE_EXTRACT_MODEL, schema="minimal"):
+            extracted = governed_call("ade", settings.ADE_EXTRACT_MODEL, lambda: ade.extract(
+                schema=_minimal_extraction_schema(),
+                markdown=md_path,
+                model=settings.ADE_EXTRACT_MODEL
+            )).extraction
+        used = "minimal"
+    finally:
+        md_path.unlink(missing_ok=True)
+
+    return {"markdown": markdown_text, "chunks": chunks, "extraction": extracted, "schema": used}
+
+
+def ade_parse_extract_cached(pdf_path: Path) -> Dict[str, Any]:
+    """
+    `_ade_parse_extract` behind the content-addressed ADE cache: the same PDF bytes,
+    parse/extract models and extraction schema never hit the network twice. Results of the
+    minimal-schema fallback are not cached, so the next run retries the full schema.
+    """
+    shard_pages = _shard_pages(pdf_path)
+    if not settings.ADE_CACHE_ENABLED:
+        return _ade_parse_extract(pdf_path, shard_pages)
+    cache = _get_ade_cache()
+    parse_model = settings.ADE_PARSE_MODEL + (f"+shards{shard_pages}" if shard_pages else "")
+    key = ade_cache_key(pdf_path, parse_model, settings.ADE_EXTRACT_MODEL,
+                        _safe_extraction_schema())
+    entry = cache.get(key)
+    annotate(cache="miss" if entry is None else "hit")
+    if entry is None:
+        entry = _ade_parse_extract(pdf_path, shard_pages)
+        if entry.get("schema", "full") == "full":
+            cache.put(key, entry)
+        else:
+            log.warning("%s: extracted with the minimal schema; not caching", pdf_path.name)
+    return entry
+
+
+def analysis_stages(kg_html: Optional[Path] = None) -> List[Stage]:
+    """
+    Post-mapping stages with explicit inputs/outputs (see `scheduler.run_stages`). Each
+    stage's `deps` lists the code (as loaded), config, model ids and prompts its output
+    depends on, so refresh mode re-runs exactly the stages an edit affects.
+    """
+    llm = lambda **extra: lambda: {"model": settings.OPENAI_MODEL, **extra}
+    return [
+        Stage("qa", run_all_checks, inputs=("doc",), output="issues",
+              deps=lambda: _code("checks.py")),
+        Stage("ratios", compute_ratios, inputs=("doc",), output="ratios",
+              deps=lambda: _code("ratios.py", "ratio_engine.py")),
+        Stage("score", compute_scores, inputs=("ratios",), output="score",
+              deps=lambda: {"scoring.yaml": file_hash(SCORING_YAML), **_code("scoring_engine.py")}),
+        Stage("pillar_summaries", generate_pillar_summaries,
+              inputs=("doc_dict", "ratios", "score"), output="pillar_summaries",
+              deps=llm(prompts=[PILLAR_SUMMARY_SYS, PILLAR_BATCH_SYS], batched=settings.PILLAR_SUMMARY_BATCHED,
+                       weights=file_hash(SCORING_YAML), code=_code("summary_engine.py"))),
+        Stage("risk_bullets", generate_risk_bullets,
+              inputs=("risk_text", "taxonomy_yaml", "chunks"), output="risk_bullets",
+              deps=llm(prompts=[RISK_BULLETS_SYS, RISK_EXPLAIN_SYS], mode=settings.RISK_TAGGER_MODE,
+                       limits=[settings.RISK_MAX_TAGS, settings.RISK_PARAGRAPHS_PER_TAG,
+                               settings.RISK_PARAGRAPH_MAX_CHARS],
+                       code=_code("summary_engine.py", "risk_tagger.py", "retrieval.py"))),
+        Stage("kg", lambda doc_dict: build_kg(doc_dict, kg_html), inputs=("doc_dict",), output="kg",
+              deps=llm(prompts=[KG_SYS], mode=settings.KG_EXTRACT_MODE, html=str(kg_html or ""),
+                       windows=[settings.KG_WINDOW_TOKENS, settings.KG_WINDOW_OVERLAP_TOKENS,
+                                settings.KG_MAX_WINDOWS, settings.KG_MAX_NODES],
+                       code=_code("kg_engine.py", "kg_store.py"))),
+        Stage("kg_bullets", kg_to_4_bullets, inputs=("kg",), output="kg_bullets",
+              deps=llm(prompts=[BULLETS_SYS], code=_code("kg_engine.py"))),
+        Stage("kg_layout", kg_layout, inputs=("kg",), output="kg_layout",
+              deps=lambda: {"size": [LAYOUT_WIDTH, LAYOUT_HEIGHT], **_code("kg_engine.py")}),
+        Stage("retrieval", build_retrieval_index, inputs=("chunks",), output="retrieval",
+              deps=lambda: _code("retrieval.py")),
+    ]
+
+
+# where each stage output is saved in outputs/<doc_id> (file, key or None for the whole file)
+_SAVED_OUTPUTS = {
+    "issues": ("qa.json", "qa_issues"),
+    "ratios": ("ratios.json", None),
+    "score": ("score.json", None),
+    "pillar_summaries": ("summaries.json", "pillars"),
+    "risk_bullets": ("summaries.json", "risks"),
+    "kg": ("kg.json", "kg"),
+    "kg_bullets": ("kg.json", "bullets"),
+    "kg_layout": ("kg.json", "layout"),
+    "retrieval": ("retrieval.json", None),
+}
+
+
+def _saved_output(out_dir: Path, output: str) -> Any:
+    """A stage output as saved by a previous run; raises if it is missing."""
+    name, key = _SAVED_OUTPUTS[output]
+    data = json.loads((out_dir / name).read_text())
+    return data if key is None else data[key]
+
+
+def run_agentic_pipeline(pdf_path: Path, out_dir: Path, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Full pipeline for one PDF into `out_dir`. With `refresh=True` only stale stages run:
+    ADE output comes from the ADE cache, and every analysis stage whose fingerprint
+    (input hashes + deps) matches fingerprints.json is loaded from its saved artifact.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Spans for every phase, stage and ADE/LLM call → timings.json (also on failure)
+    with trace(out_dir.name) as tr:
+        try:
+            with span("pipeline", kind="pipeline", refresh=refresh):
+                return _run_agentic_pipeline(pdf_path, out_dir, refresh)
+        finally:
+            if tr is not None:
+                save_json(tr.to_dict(), out_dir / "timings.json")
+
+
+def _run_agentic_pipeline(pdf_path: Path, out_dir: Path, refresh: bool = False) -> Dict[str, Any]:
+    # 1-2) ADE parse + extract (served from the ADE cache when this PDF was seen before)
+    with span("ade", kind="phase"):
+        ade_out = ade_parse_extract_cached(pdf_path)
+    markdown_text = ade_out["markdown"]
+    chunks = ade_out["chunks"]
+    extracted = ade_out["extraction"]
 
     # 3) Build coarse provenance from chunk grounding (dedup pages)
     prov = {"page_refs": {}}
     seen = set()
     for ch in (chunks or []):
-        pg = (ch.get("grounding", [{}])[0] or {}).get("page")
+        pg = _chunk_page(ch)
         if pg is None:
             continue
         p = int(pg) + 1  # ADE pages are 0-indexed
@@ -214,48 +426,80 @@ def run_agentic_pipeline(pdf_path: Path, out_dir: Path) -> Dict[str, Any]:
         # Attach broadly to a section; field-level provenance is added by mapper/add_ref()
         prov["page_refs"].setdefault("sections.business_overview", []).append(p)
 
+    # Numeric token → page index over the chunks, for field-level provenance in the mapper
+    with span("numeric_index", kind="phase"):
+        numeric_index = NumericIndex.from_chunks(chunks or [])
+
     ade_json = {
         "parsed": {"markdown": markdown_text},
         "extraction": extracted,
-        "provenance": prov
+        "provenance": prov,
+        "numeric_index": numeric_index,
     }
 
     # 4) Map ADE → Extracted10K (derives missing fields like gross_profit, total_debt, fcf)
-    doc = map_ade_to_10k(ade_json)
+    with span("map", kind="phase"):
+        doc = map_ade_to_10k(ade_json)
     save_json(doc.model_dump(), out_dir / "parsed_extracted10k.json")
 
-    # 5) QA
-    issues = run_all_checks(doc)
-    save_json({"qa_issues": issues}, out_dir / "qa.json")
-
-    # 6) Ratios
-    ratios = compute_ratios(doc)
-    save_json(ratios, out_dir / "ratios.json")
+    # 5-9) Analysis stages as a DAG: QA, ratios → score → pillar summaries,
+    # risk bullets, KG → KG bullets and the chat retrieval index run concurrently
+    # where inputs allow.
+    # KG is stored as JSON + layout for the shared static renderer; PyVis HTML only on request
+    kg_html = (Path(settings.STATIC_GRAPHS_DIR) / f"{out_dir.name}_kg.html"
+               if settings.KG_RENDER_MODE == "pyvis" else None)
+    # Refresh: stages whose inputs/deps fingerprint matches the last run reuse its artifacts
+    previous = None
+    if refresh and (out_dir / FINGERPRINTS).exists():
+        previous = json.loads((out_dir / FINGERPRINTS).read_text())
+    stages = analysis_stages(kg_html)
+    with span("analysis", kind="phase"):
+        run = run_stages(stages, {
+            "doc": doc,
+            "doc_dict": doc.model_dump(),
+            "chunks": chunks or [],
+            "risk_text": "\n".join(doc.sections.risk_factors or []),
+            "taxonomy_yaml": Path("data/config/risk_taxonomy.yaml").read_text(),
+        }, max_workers=settings.PIPELINE_STAGE_WORKERS,
+           previous=previous, load=lambda stage: _saved_output(out_dir, stage.output))
+    v = run.values
 
-    # 7) Scoring
-    score = compute_scores(ratios)
-    save_json(score, out_dir / "score.json")
+    issues = v.get("issues", [])
+    if run.ok("qa"):
+        save_json({"qa_issues": issues}, out_dir / "qa.json")
+    ratios = v.get("ratios", {"ratios": {}, "used_fields": []})
+    if run.ok("ratios"):
+        save_json(ratios, out_dir / "ratios.json")
+    score = v.get("score", {"ratio_scores": {}, "pillars": {}, "final_score": None})
+    if run.ok("score"):
+        save_json(score, out_dir / "score.json")
 
-    # 8) Summaries (pillar + risks)
-    taxonomy_yaml = Path("data/config/risk_taxonomy.yaml").read_text()
-    risk_text = "\n".join(doc.sections.risk_factors or [])
     summaries = {
-        "pillars": generate_pillar_summaries(doc.model_dump(), ratios, score),
-        "risks": generate_risk_bullets(risk_text, taxonomy_yaml),
+        "pillars": v.get("pillar_summaries", {}),
+        "risks": v.get("risk_bullets", []),
     }
     save_json(summaries, out_dir / "summaries.json")
 
-    # 9) Knowledge Graph (PyVis HTML + 4 bullets)
-    kg_html = Path("static/graphs") / f"{out_dir.name}_kg.html"
-    kg = build_kg(doc.model_dump(), kg_html)
-    kg_bullets = kg_to_4_bullets(kg)
-    save_json({"kg": kg, "bullets": kg_bullets, "html": str(kg_html)}, out_dir / "kg.json")
+    kg = v.get("kg", {"nodes": [], "edges": []})
+    kg_bullets = v.get("kg_bullets", [])
+    kg_out = {"kg": kg, "bullets": kg_bullets, "html": str(kg_html) if kg_html else "",
+              "layout": v.get("kg_layout")}
+    save_json(kg_out, out_dir / "kg.json")
+    # Chunk passages with page grounding + BM25 postings for chat retrieval
+    if run.ok("retrieval"):
+        save_json(v["retrieval"], out_dir / "retrieval.json")
+    save_json(run.as_dict(), out_dir / "stages.json")
+    records = run.fingerprint_records(stages)
+    if (kg.get("stats") or {}).get("failed_windows"):
+        records.pop("kg", None)  # partial graph: let the next refresh retry the failed windows
+    save_json(records, out_dir / FINGERPRINTS)
 
     return {
-        "doc": doc.model_dump(),
+        "doc": v["doc_dict"],
         "ratios": ratios,
         "score": score,
         "summaries": summaries,
-        "kg": {"kg": kg, "bullets": kg_bullets, "html": str(kg_html)},
-        "issues": issues
+        "kg": kg_out,
+        "issues": issues,
+        "stage_errors": run.errors,
     }
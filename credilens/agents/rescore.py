@@ -0,0 +1,210 @@
+# credilens/agents/rescore.py
+"""
+Portfolio rescoring: recompute ratios.json, score.json and qa.json for every processed
+filing from its saved parsed_extracted10k.json (no ADE or LLM calls), then write one
+portfolio table.
+
+    python -m credilens.agents.rescore --outputs data/outputs --out data/portfolio.csv --workers 8
+    python -m credilens.agents.rescore --resume          # continue an interrupted run
+
+Progress is journaled to <out>.progress.jsonl; --resume skips filings already in the
+journal as long as the qa/ratios/score stage deps (scoring.yaml and the rule and engine
+modules, see `pipeline.analysis_stages`) are unchanged since it was written. Each
+filing's fingerprints.json is updated for those stages, so a later pipeline refresh
+reuses the rescored artifacts instead of recomputing them.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .pipeline import FINGERPRINTS, analysis_stages
+from .scheduler import stage_fingerprint, value_hash
+from ..engines.ratio_engine import compute_ratios_batch
+from ..engines.scoring_engine import compute_scores_batch
+from ..qa.checks import run_all_checks
+from ..schemas.models import Extracted10K
+from ..store.catalog import Catalog
+
+PARSED = "parsed_extracted10k.json"
+# the pipeline stages whose outputs rescoring rewrites, in dependency order
+_STAGES = [s for s in analysis_stages() if s.name in ("qa", "ratios", "score")]
+
+
+def _write_json(obj: Any, path: Path) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2))
+    os.replace(tmp, path)
+
+
+def rules_fingerprint() -> str:
+    """Hash of everything that changes rescoring output: the deps of the rescored stages."""
+    return value_hash({s.name: s.deps() for s in _STAGES})
+
+
+def _update_fingerprints(ddir: Path, values: Dict[str, Any]) -> None:
+    """Record the rewritten qa/ratios/score outputs in fingerprints.json, as `run_stages` would."""
+    path = ddir / FINGERPRINTS
+    if not path.exists():  # processed before fingerprints existed: refresh recomputes anyway
+        return
+    records = json.loads(path.read_text())
+    hashes = {"doc": value_hash(values["doc"])}
+    for stage in _STAGES:
+        fp = stage_fingerprint(stage, [hashes[i] for i in stage.inputs])
+        hashes[stage.output] = value_hash(values[stage.output])
+        records[stage.name] = {"fingerprint": fp, "output_hash": hashes[stage.output]}
+    _write_json(records, path)
+
+
+def _row(doc_id: str, doc: Dict[str, Any], score: Dict[str, Any], ratios: Dict[str, Any],
+         issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    company = doc.get("company") or {}
+    row: Dict[str, Any] = {
+        "doc_id": doc_id,
+        "company": company.get("name"),
+        "ticker": company.get("ticker"),
+        "final_score": score.get("final_score"),
+    }
+    for pillar, meta in (score.get("pillars") or {}).items():
+        row[f"pillar:{pillar}"] = meta.get("score")
+    for rk, rdata in (ratios.get("ratios") or {}).items():
+        row[f"ratio:{rk}"] = rdata.get("value")
+    row["qa_failed"] = ";".join(i["check"] for i in issues if not i.get("pass"))
+    return row
+
+
+def rescore_chunk(doc_dirs: Sequence[str]) -> List[Dict[str, Any]]:
+    """Worker: rescore a chunk of filings with the batch engines and write their artifacts."""
+    dirs, docs = [], []
+    for d in doc_dirs:
+        try:
+            docs.append(Extracted10K.model_validate_json((Path(d) / PARSED).read_text()))
+            dirs.append(Path(d))
+        except Exception as e:
+            print(f"skip {d}: {type(e).__name__}: {e}", file=sys.stderr)
+    if not docs:
+        return []
+    dumped = [doc.model_dump() for doc in docs]
+    ratios_all = compute_ratios_batch(dumped)
+    scores_all = compute_scores_batch(ratios_all)
+    rows = []
+    for ddir, doc, dump, ratios, score in zip(dirs, docs, dumped, ratios_all, scores_all):
+        issues = run_all_checks(doc)
+        _write_json(ratios, ddir / "ratios.json")
+        _write_json(score, ddir / "score.json")
+        _write_json({"qa_issues": issues}, ddir / "qa.json")
+        _update_fingerprints(ddir, {"doc": doc, "issues": issues, "ratios": ratios, "score": score})
+        rows.append(_row(ddir.name, dump, score, ratios, issues))
+    return rows
+
+
+def _load_journal(path: Path, fingerprint: str) -> Dict[str, Dict[str, Any]]:
+    done: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return done
+    for line in path.read_text().splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue  # torn last line from an interrupted run
+        if rec.get("rules") == fingerprint:
+            done[rec["row"]["doc_id"]] = rec["row"]
+    return done
+
+
+def write_table(rows: List[Dict[str, Any]], out: Path) -> None:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    columns = list(dict.fromkeys(k for r in rows for k in r))
+    if out.suffix == ".parquet":
+        try:
+            import pandas as pd
+        except ImportError:
+            raise SystemExit("Parquet output needs pandas + pyarrow; use a .csv path instead.")
+        pd.DataFrame(rows, columns=columns).to_parquet(out, index=False)
+        return
+    with out.open("w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=columns)
+        w.writeheader()
+        w.writerows(rows)
+
+
+def _chunks(items: Sequence[str], size: int) -> Iterable[Sequence[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def rescore_portfolio(outputs: Path, out: Path, workers: Optional[int] = None, chunk_size: int = 64,
+                      resume: bool = False, catalog: Optional[Path] = None) -> Dict[str, Any]:
+    fingerprint = rules_fingerprint()
+    journal = out.with_name(out.name + ".progress.jsonl")
+    done = _load_journal(journal, fingerprint) if resume else {}
+    if not resume and journal.exists():
+        journal.unlink()
+
+    doc_dirs = sorted(str(p.parent) for p in outputs.glob(f"*/{PARSED}"))
+    todo = [d for d in doc_dirs if Path(d).name not in done]
+    print(f"{len(doc_dirs)} filings, {len(done)} already done, {len(todo)} to rescore "
+          f"(rules {fingerprint})", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    processed = 0
+    journal.parent.mkdir(parents=True, exist_ok=True)
+    with journal.open("a") as jf, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(rescore_chunk, c) for c in _chunks(todo, chunk_size)]
+        for fut in as_completed(futures):
+            for row in fut.result():
+                done[row["doc_id"]] = row
+                jf.write(json.dumps({"rules": fingerprint, "row": row}) + "\n")
+                processed += 1
+            jf.flush()
+            elapsed = time.perf_counter() - t0
+            print(f"  {processed}/{len(todo)}  {processed / elapsed if elapsed else 0:.1f} docs/sec",
+                  file=sys.stderr)
+
+    elapsed = time.perf_counter() - t0
+    rows = [done[Path(d).name] for d in doc_dirs if Path(d).name in done]
+    write_table(rows, out)
+    if catalog is not None:
+        Catalog(catalog).upsert_many(
+            {"doc_id": r["doc_id"], "company": {"name": r["company"], "ticker": r["ticker"]},
+             "final_score": r["final_score"]} for r in rows
+        )
+    journal.unlink(missing_ok=True)
+    stats = {
+        "filings": len(doc_dirs),
+        "rescored": processed,
+        "resumed": len(doc_dirs) - len(todo),
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(processed / elapsed, 1) if elapsed and processed else None,
+        "table": str(out),
+    }
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Recompute ratios, scores and QA for processed filings.")
+    ap.add_argument("--outputs", type=Path, default=Path("data/outputs"),
+                    help="directory of <doc_id>/parsed_extracted10k.json (default: data/outputs)")
+    ap.add_argument("--out", type=Path, default=Path("data/portfolio.csv"),
+                    help="portfolio table; .csv or .parquet (default: data/portfolio.csv)")
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    ap.add_argument("--chunk-size", type=int, default=64, help="filings per worker task (default: 64)")
+    ap.add_argument("--resume", action="store_true", help="skip filings finished by an interrupted run")
+    ap.add_argument("--catalog", type=Path, default=None,
+                    help="document catalog to update with new scores (default: <outputs>/../catalog.sqlite3 if present)")
+    args = ap.parse_args(argv)
+    catalog = args.catalog or args.outputs.parent / "catalog.sqlite3"
+    stats = rescore_portfolio(args.outputs, args.out, workers=args.workers, chunk_size=args.chunk_size,
+                              resume=args.resume, catalog=catalog if catalog.exists() else None)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# credilens/agents/scheduler.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from ..services.tracing import propagate, span
+
+OK, FAILED, SKIPPED = "ok", "failed", "skipped"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline step: `fn(*[values[i] for i in inputs])` produces `values[output]`.
+
+        Stage("score", compute_scores, inputs=("ratios",), output="score",
+              deps=lambda: {"scoring.yaml": file_hash(SCORING_YAML)})
+
+    `deps` returns whatever else the result depends on (config/rule file hashes, model
+    ids, prompt text); it is part of the stage's fingerprint next to its input hashes.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: Sequence[str]
+    output: str
+    deps: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class StageRun:
+    values: Dict[str, Any] = field(default_factory=dict)
+    status: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    hashes: Dict[str, str] = field(default_factory=dict)        # value name → content hash
+    fingerprints: Dict[str, str] = field(default_factory=dict)  # stage name → inputs + deps hash
+    reused: set = field(default_factory=set)
+
+    def ok(self, name: str) -> bool:
+        return self.status.get(name) == OK
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, st in self.status.items():
+            out[name] = {"status": st, "seconds": self.seconds.get(name)}
+            if name in self.reused:
+                out[name]["reused"] = True
+            if name in self.errors:
+                out[name]["error"] = self.errors[name]
+        return out
+
+    def fingerprint_records(self, stages: Sequence[Stage]) -> Dict[str, Dict[str, str]]:
+        """{stage: {fingerprint, output_hash}} for successful stages (persist as fingerprints.json)."""
+        return {s.name: {"fingerprint": self.fingerprints[s.name], "output_hash": self.hashes[s.output]}
+                for s in stages if self.ok(s.name) and s.name in self.fingerprints and s.output in self.hashes}
+
+
+def value_hash(value: Any) -> str:
+    """Content hash of a JSON-able value (pydantic models via model_dump)."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json")
+    data = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_hash(path: Any) -> Optional[str]:
+    """Content hash of a file, memoised on (path, mtime, size); None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    if key not in _file_hashes:
+        with open(path, "rb") as f:
+            _file_hashes[key] = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _file_hashes[key]
+
+
+def stage_fingerprint(stage: Stage, input_hashes: Sequence[str]) -> str:
+    deps = stage.deps() if stage.deps is not None else None
+    return value_hash({"stage": stage.name, "inputs": dict(zip(stage.inputs, input_hashes)),
+                       "output": stage.output, "deps": deps})
+
+
+def validate_stages(stages: Sequence[Stage], initial: Iterable[str]) -> None:
+    """Raise ValueError on duplicate names/outputs, unknown inputs or cycles."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names: {names}")
+    available = set(initial)
+    producers: Dict[str, str] = {}
+    for s in stages:
+        if s.output in available or s.output in producers:
+            raise ValueError(f"Output '{s.output}' of stage '{s.name}' is produced twice")
+        producers[s.output] = s.name
+    for s in stages:
+        for i in s.inputs:
+            if i not in available and i not in producers:
+                raise ValueError(f"Stage '{s.name}' needs '{i}', which nothing produces")
+    # Kahn's algorithm: every stage must become runnable eventually
+    ready = set(available)
+    remaining = list(stages)
+    while remaining:
+        runnable = [s for s in remaining if all(i in ready for i in s.inputs)]
+        if not runnable:
+            raise ValueError(f"Cycle among stages: {[s.name for s in remaining]}")
+        for s in runnable:
+            ready.add(s.output)
+            remaining.remove(s)
+
+
+def run_stages(stages: Sequence[Stage], initial: Mapping[str, Any], max_workers: int = 4,
+               previous: Optional[Mapping[str, Mapping[str, str]]] = None,
+               load: Optional[Callable[[Stage], Any]] = None) -> StageRun:
+    """
+    Run `stages` as a DAG on a thread pool: every stage starts as soon as its inputs
+    exist, so wall time follows the critical path rather than the sum of stages.
+
+    A failing stage is recorded in `errors` and its dependents are marked skipped;
+    unrelated branches still run to completion.
+
+    Every stage is fingerprinted from its input hashes and `deps()`. Make-style refresh:
+    given the `previous` run's `fingerprint_records` and a `load(stage)` that returns the
+    stage's saved output, a stage whose fingerprint is unchanged is loaded instead of run
+    (and keeps its recorded output hash, so unchanged outputs keep dependents fresh too).
+    If `load` raises, the stage runs.
+    """
+    validate_stages(stages, initial.keys())
+    run = StageRun(values=dict(initial))
+    run.hashes.update({k: value_hash(v) for k, v in initial.items()})
+    pending: List[Stage] = list(stages)
+    dead_outputs = set()  # outputs of failed/skipped stages
+    running: Dict[Future, Stage] = {}
+    started: Dict[str, float] = {}
+
+    def _call(stage: Stage) -> Any:
+        started[stage.name] = time.perf_counter()
+        with span(stage.name, kind="stage"):
+            value = stage.fn(*[run.values[i] for i in stage.inputs])
+        return value, value_hash(value)
+
+    def _reuse(stage: Stage) -> bool:
+        fp = run.fingerprints[stage.name] = stage_fingerprint(stage, [run.hashes[i] for i in stage.inputs])
+        prev = (previous or {}).get(stage.name) or {}
+        if load is None or prev.get("fingerprint") != fp or not prev.get("output_hash"):
+            return False
+        try:
+            run.values[stage.output] = load(stage)
+        except Exception:
+            return False
+        run.hashes[stage.output] = prev["output_hash"]
+        run.status[stage.name] = OK
+        run.seconds[stage.name] = 0.0
+        run.reused.add(stage.name)
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="credilens-stage") as pool:
+        while pending or running:
+            changed = True
+            while changed:
+                changed = False
+                for s in list(pending):
+                    if any(i in dead_outputs for i in s.inputs):
+                        pending.remove(s)
+                        run.status[s.name] = SKIPPED
+                        dead_outputs.add(s.output)
+                        changed = True
+                    elif all(i in run.values for i in s.inputs):
+                        pending.remove(s)
+                        if _reuse(s):
+                            changed = True
+                        else:
+                            running[pool.submit(propagate(_call), s)] = s
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                s = running.pop(fut)
+                run.seconds[s.name] = round(time.perf_counter() - started.get(s.name, time.perf_counter()), 4)
+                try:
+                    run.values[s.output], run.hashes[s.output] = fut.result()
+                    run.status[s.name] = OK
+                except Exception as e:
+                    run.status[s.name] = FAILED
+                    run.errors[s.name] = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+                    dead_outputs.add(s.output)
+    return run
@@ -0,0 +1,60 @@
+# credilens/agents/shards.py
+"""
+Page-range sharding for ADE parse: split a long PDF into fixed-size page ranges, parse
+them concurrently, and stitch the results back in page order with grounding pages
+shifted to the original document's numbering.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+def pdf_page_count(pdf_path: Path) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(str(pdf_path)).pages)
+
+
+def split_pdf(pdf_path: Path, pages_per_shard: int, out_dir: Path) -> List[Tuple[int, Path]]:
+    """Write shards to `out_dir`; returns [(0-indexed first page, shard path)] in order."""
+    from pypdf import PdfReader, PdfWriter
+    reader = PdfReader(str(pdf_path))
+    n = len(reader.pages)
+    shards = []
+    for start in range(0, n, pages_per_shard):
+        writer = PdfWriter()
+        for i in range(start, min(n, start + pages_per_shard)):
+            writer.add_page(reader.pages[i])
+        path = Path(out_dir) / f"{Path(pdf_path).stem}.p{start:05d}.pdf"
+        with path.open("wb") as f:
+            writer.write(f)
+        shards.append((start, path))
+    return shards
+
+
+def _shift_grounding(g: Any, offset: int) -> Any:
+    if isinstance(g, list):
+        return [_shift_grounding(x, offset) for x in g]
+    if isinstance(g, dict) and g.get("page") is not None:
+        return {**g, "page": int(g["page"]) + offset}
+    return g
+
+
+def merge_shards(parts: Sequence[Tuple[int, str, List[Dict[str, Any]]]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    [(page offset, markdown, chunk dicts)] → (markdown, chunks) for the whole document.
+    Parts are ordered by offset; chunk grounding pages move from shard-local to document
+    pages, and chunk ids stay unique across shards.
+    """
+    markdown, chunks, seen = [], [], set()
+    for shard_no, (offset, md, shard_chunks) in enumerate(sorted(parts, key=lambda p: p[0])):
+        markdown.append(md or "")
+        for ch in shard_chunks:
+            ch = {**ch, "grounding": _shift_grounding(ch.get("grounding"), offset)}
+            cid = ch.get("id")
+            if cid is not None:
+                if cid in seen:
+                    ch["id"] = cid = f"s{shard_no}-{cid}"
+                seen.add(cid)
+            chunks.append(ch)
+    return "\n\n".join(m for m in markdown if m), chunks
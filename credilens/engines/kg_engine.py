@@ -1,11 +1,17 @@
-from typing import Dict, Any, List
-from openai import OpenAI
-from config import settings
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import networkx as nx
-from pyvis.network import Network
 from pathlib import Path
 import json
+import logging
 import re
+from ..services.llm import chat_completion
+from ..services.tracing import annotate, propagate
+from ..store.kg_store import normalize_label
+from config import settings
+
+log = logging.getLogger(__name__)
 
 KG_SYS = (
     "Extract a concise set of entities (Company, Product, Segment, Geography, Risk, Partner, Client, Auditor). "
@@ -18,52 +24,230 @@ BULLETS_SYS = (
     "Be terse and factual."
 )
 
-def _client():
-    return OpenAI(api_key=settings.OPENAI_API_KEY)
-
-def build_kg(doc: Dict[str, Any], out_html: Path) -> Dict[str, Any]:
-    text = " ".join([
-        doc.get("sections", {}).get("business_overview","") or "",
-        doc.get("sections", {}).get("mdna","") or "",
-        " ".join(doc.get("sections", {}).get("risk_factors",[]) or [])
-    ])
-    txt = _client().chat.completions.create(
-        model=settings.OPENAI_MODEL,
-        messages=[{"role":"system","content":KG_SYS},
-                  {"role":"user","content":text[:12000]}],
-        temperature=0.2,
-    ).choices[0].message.content
+SINGLE_CALL_CHARS = 12000
+CHARS_PER_TOKEN = 4  # same rough ratio as services.ratelimit.estimate_tokens
+
+def _sections(doc: Dict[str, Any]) -> List[str]:
+    sec = doc.get("sections", {}) or {}
+    return [sec.get("business_overview", "") or "",
+            sec.get("mdna", "") or "",
+            " ".join(sec.get("risk_factors", []) or [])]
+
+def _fallback_kg(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # very tiny heuristic graph
+    return {"nodes": [{"id": "Company", "label": (doc.get("company") or {}).get("name") or "Company",
+                       "type": "Company"}],
+            "edges": []}
+
+def _parse_kg(txt: str) -> Optional[Dict[str, Any]]:
+    txt = re.sub(r"^```(?:json)?\s*|\s*```$", "", (txt or "").strip())
     try:
         kg = json.loads(txt)
     except Exception:
-        # fallback: very tiny heuristic graph
-        kg = {"nodes":[{"id":"Company","label":doc.get("company",{}).get("name","Company"),"type":"Company"}],
-              "edges":[]}
+        return None
+    if not isinstance(kg, dict) or not isinstance(kg.get("nodes"), list):
+        return None
+    kg.setdefault("edges", [])
+    return kg
+
+def _extract_window(text: str) -> Optional[Dict[str, Any]]:
+    return _parse_kg(chat_completion(
+        [{"role":"system","content":KG_SYS},
+         {"role":"user","content":text}],
+        temperature=0.2,
+    ))
+
+def _extract_window_or_none(text: str) -> Optional[Dict[str, Any]]:
+    # one failed window (timeout, 5xx after retries) must not discard the others
+    try:
+        return _extract_window(text)
+    except Exception as e:
+        log.warning("KG window failed (%d chars): %s: %s", len(text), type(e).__name__, e)
+        return None
 
-    # Render with PyVis
+def _extract_kg_single(doc: Dict[str, Any]) -> Dict[str, Any]:
+    text = " ".join(_sections(doc))
+    kg = _extract_window(text[:SINGLE_CALL_CHARS]) or _fallback_kg(doc)
+    kg["stats"] = {"mode": "single", "windows": 1, "chars": min(len(text), SINGLE_CALL_CHARS),
+                   "nodes": len(kg["nodes"]), "edges": len(kg["edges"])}
+    return kg
+
+def split_windows(texts: List[str], max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Pack paragraphs (then sentences, then hard cuts for run-on text) of each section into
+    windows of at most ~max_tokens, repeating up to overlap_tokens of trailing context so an
+    entity and its relation split across a boundary are still seen together.
+    """
+    limit = max(200, max_tokens * CHARS_PER_TOKEN)
+    overlap = max(0, min(overlap_tokens * CHARS_PER_TOKEN, limit // 2))
+    units: List[str] = []
+    for text in texts:
+        for para in re.split(r"\n\s*\n", text or ""):
+            para = " ".join(para.split())
+            if not para:
+                continue
+            if len(para) <= limit:
+                units.append(para)
+                continue
+            for sent in re.split(r"(?<=[.;!?])\s+", para):
+                units.extend(sent[i:i + limit] for i in range(0, len(sent), limit))
+        units.append("")  # section break: never overlap across sections
+    windows: List[str] = []
+    cur: List[str] = []
+    size = 0
+    for u in units:
+        if not u:
+            if cur:
+                windows.append(" ".join(cur))
+            cur, size = [], 0
+            continue
+        if cur and size + len(u) + 1 > limit:
+            windows.append(" ".join(cur))
+            tail: List[str] = []
+            kept = 0
+            for prev in reversed(cur):
+                if kept + len(prev) > overlap:
+                    break
+                tail.insert(0, prev)
+                kept += len(prev) + 1
+            cur, size = tail, kept
+        cur.append(u)
+        size += len(u) + 1
+    return windows
+
+def merge_kgs(parts: List[Dict[str, Any]], max_nodes: int = 0) -> Dict[str, Any]:
+    """
+    Reduce per-window graphs into one: nodes are deduplicated on (type, normalised label)
+    via a dict index, edges are rewired to the canonical node ids and deduplicated, and
+    self-loops produced by merging are dropped. With max_nodes, the entities mentioned in
+    the most windows are kept (ties in first-seen order).
+    """
+    index: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    mentions: Dict[str, int] = {}
+    edges: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+    for part in parts:
+        local: Dict[str, str] = {}
+        for n in part.get("nodes") or []:
+            if not isinstance(n, dict) or n.get("id") is None:
+                continue
+            label = str(n.get("label") or n["id"]).strip()
+            type_ = str(n.get("type") or "Other")
+            norm = normalize_label(label, type_)
+            if not norm:
+                continue
+            node = index.get((type_, norm))
+            if node is None:
+                node = index[(type_, norm)] = {"id": f"{type_}:{norm}", "label": label, "type": type_}
+            if local.get(str(n["id"])) != node["id"]:
+                mentions[node["id"]] = mentions.get(node["id"], 0) + 1
+            local[str(n["id"])] = node["id"]
+        for e in part.get("edges") or []:
+            if not isinstance(e, dict):
+                continue
+            src, dst = local.get(str(e.get("source"))), local.get(str(e.get("target")))
+            if src is None or dst is None or src == dst:
+                continue
+            label = str(e.get("label") or "").strip()
+            edges.setdefault((src, dst, label.lower()), {"source": src, "target": dst, "label": label})
+    nodes = list(index.values())
+    if max_nodes and len(nodes) > max_nodes:
+        order = {n["id"]: i for i, n in enumerate(nodes)}
+        nodes = sorted(nodes, key=lambda n: (-mentions[n["id"]], order[n["id"]]))[:max_nodes]
+        nodes.sort(key=lambda n: order[n["id"]])
+    keep = {n["id"] for n in nodes}
+    return {"nodes": nodes,
+            "edges": [e for e in edges.values() if e["source"] in keep and e["target"] in keep]}
+
+def _extract_kg_chunked(doc: Dict[str, Any]) -> Dict[str, Any]:
+    windows = split_windows(_sections(doc), settings.KG_WINDOW_TOKENS, settings.KG_WINDOW_OVERLAP_TOKENS)
+    if settings.KG_MAX_WINDOWS and len(windows) > settings.KG_MAX_WINDOWS:
+        log.warning("KG: %d windows, extracting the first %d", len(windows), settings.KG_MAX_WINDOWS)
+        windows = windows[:settings.KG_MAX_WINDOWS]
+    if not windows:
+        return _extract_kg_single(doc)
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.KG_WORKERS, len(windows)))) as pool:
+        parts = list(pool.map(propagate(_extract_window_or_none), windows))
+    ok = [p for p in parts if p]
+    kg = merge_kgs(ok, settings.KG_MAX_NODES) if ok else _fallback_kg(doc)
+    kg["stats"] = {"mode": "chunked", "windows": len(windows), "failed_windows": len(parts) - len(ok),
+                   "chars": sum(len(w) for w in windows),
+                   "raw_nodes": sum(len(p.get("nodes") or []) for p in ok),
+                   "nodes": len(kg["nodes"]), "edges": len(kg["edges"])}
+    return kg
+
+def extract_kg(doc: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    KG_EXTRACT_MODE="chunked" (default) maps the whole business/MD&A/risk text in token-bounded
+    windows and merges the partial graphs; "single" is one call over the first 12,000 chars.
+    The result carries "stats" (mode, windows, nodes, edges) for comparing the two; they are
+    also set on the current span. No timings: the graph is a stage value whose hash decides
+    whether dependents re-run, so it must be the same for the same extraction.
+    """
+    mode = mode or settings.KG_EXTRACT_MODE
+    kg = _extract_kg_chunked(doc) if mode == "chunked" else _extract_kg_single(doc)
+    annotate(**{f"kg_{k}": v for k, v in kg["stats"].items()})
+    return kg
+
+def _to_nx(kg: Dict[str, Any]) -> nx.DiGraph:
     G = nx.DiGraph()
     for n in kg.get("nodes", []):
         G.add_node(n["id"], label=n.get("label", n["id"]), group=n.get("type","Other"))
     for e in kg.get("edges", []):
         if e.get("source") in G.nodes and e.get("target") in G.nodes:
             G.add_edge(e["source"], e["target"], label=e.get("label",""))
+    return G
 
+def render_pyvis(kg: Dict[str, Any], out_html: Path) -> None:
+    """Legacy standalone HTML (KG_RENDER_MODE=pyvis); embeds its own vis.js scaffolding."""
+    from pyvis.network import Network
     net = Network(height="620px", width="100%", notebook=False, directed=True)
-    net.from_nx(G)
+    net.from_nx(_to_nx(kg))
     for e in net.edges:
         if "label" in e["data"]:
             e["title"] = e["data"]["label"]
-    net.show(str(out_html))
+    net.write_html(str(out_html))
+
+def build_kg(doc: Dict[str, Any], out_html: Optional[Path] = None) -> Dict[str, Any]:
+    kg = extract_kg(doc)
+    if out_html is not None:
+        render_pyvis(kg, out_html)
     return kg
 
+LAYOUT_WIDTH, LAYOUT_HEIGHT = 1000, 620
+
+@lru_cache(maxsize=256)
+def _layout(canonical: str) -> Dict[str, Any]:
+    G = _to_nx(json.loads(canonical))
+    if not G.number_of_nodes():
+        return {"width": LAYOUT_WIDTH, "height": LAYOUT_HEIGHT, "nodes": [], "edges": []}
+    # seeded so the same graph always gets the same picture
+    pos = nx.spring_layout(G, seed=7, k=1.5 / max(1, G.number_of_nodes()) ** 0.5, iterations=100)
+    xs = [p[0] for p in pos.values()]
+    ys = [p[1] for p in pos.values()]
+    pad = 60
+    def scale(v, lo, hi, size):
+        return round(pad + (v - lo) / ((hi - lo) or 1) * (size - 2 * pad), 1)
+    nodes = [{"id": n, "label": d["label"], "type": d["group"],
+              "x": scale(pos[n][0], min(xs), max(xs), LAYOUT_WIDTH),
+              "y": scale(pos[n][1], min(ys), max(ys), LAYOUT_HEIGHT)}
+             for n, d in G.nodes(data=True)]
+    edges = [{"source": u, "target": v, "label": d.get("label", "")} for u, v, d in G.edges(data=True)]
+    return {"width": LAYOUT_WIDTH, "height": LAYOUT_HEIGHT, "nodes": nodes, "edges": edges}
+
+def kg_layout(kg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Nodes with precomputed x/y (networkx spring layout) for the static KG renderer.
+    Memoised on the graph's canonical JSON; treat the result as read-only.
+    """
+    return _layout(json.dumps({"nodes": kg.get("nodes", []), "edges": kg.get("edges", [])}, sort_keys=True))
+
 def kg_to_4_bullets(kg_json: Dict[str, Any]) -> List[str]:
-    txt = json.dumps(kg_json)[:12000]
-    out = _client().chat.completions.create(
-        model=settings.OPENAI_MODEL,
-        messages=[{"role":"system","content":BULLETS_SYS},
-                  {"role":"user","content":txt}],
+    txt = json.dumps({"nodes": kg_json.get("nodes", []), "edges": kg_json.get("edges", [])})[:12000]
+    out = chat_completion(
+        [{"role":"system","content":BULLETS_SYS},
+         {"role":"user","content":txt}],
         temperature=0.2,
-    ).choices[0].message.content
+    )
     bullets = re.findall(r"[-•]\s*(.+)", out) or out.split("\n")
     bullets = [b.strip() for b in bullets if b.strip()]
     return bullets[:4]
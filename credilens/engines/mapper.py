@@ -1,13 +1,15 @@
 from typing import Dict, Any
 from ..schemas.models import Extracted10K
 from ..qa.provenance import add_ref
+from ..qa.numeric_index import NumericIndex, attach_numeric_refs
 
 def map_ade_to_10k(ade_json: Dict[str, Any]) -> Extracted10K:
     """
     Expect ade_json like:
     {
       "parsed": {"markdown": "...", "chunks": [...]},
-      "extraction": {... your object ...}
+      "extraction": {... your object ...},
+      "numeric_index": NumericIndex   # optional; built from parsed.chunks when absent
     }
     For simplicity, assume `extraction` already resembles Extracted10K (your ADE schema can mirror it).
     """
@@ -59,4 +61,18 @@ def map_ade_to_10k(ade_json: Dict[str, Any]) -> Extracted10K:
     for key, pages in prov.get("page_refs", {}).items():
         add_ref(page_refs, key, [int(p) for p in pages])
 
+    # Field-level provenance: pages whose chunks print each populated financial value
+    index = ade_json.get("numeric_index")
+    if index is None and (ade_json.get("parsed") or {}).get("chunks"):
+        index = NumericIndex.from_chunks(ade_json["parsed"]["chunks"])
+    if index is not None:
+        values = []
+        for stmt in ("income_stmt", "balance_sheet", "cash_flow"):
+            section = getattr(doc.financials, stmt)
+            for k in section.model_fields.keys():
+                v = getattr(section, k)
+                if isinstance(v, (int, float)):
+                    values.append((f"financials.{stmt}.{k}", v))
+        attach_numeric_refs(page_refs, values, index)
+
     return doc
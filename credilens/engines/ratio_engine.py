@@ -1,80 +1,123 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Mapping, Sequence, Tuple, Union
+import numpy as np
 from ..schemas.models import Extracted10K
-from ..rules.ratios import RATIOS
+from ..rules.ratios import RATIOS, RatioSpec, DEN_POSITIVE
 
-def _get(doc: Extracted10K, dotted: str):
-    cur = doc.model_dump()
-    for part in dotted.split("."):
-        cur = cur.get(part, None)
-        if cur is None:
-            return None
-    return cur
+Doc = Union[Extracted10K, Dict[str, Any]]
 
-def compute_ratios(doc: Extracted10K) -> Dict[str, Any]:
-    out = {"ratios": {}, "used_fields": []}
-    for key, spec in RATIOS.items():
-        vals = [_get(doc, d) for d in spec.inputs]
-        used = [d for d, v in zip(spec.inputs, vals) if v is not None]
-        out["used_fields"].extend(used)
-
-        def set_na():
-            out["ratios"][key] = {"value": None, "unit": spec.display_unit, "na": True}
+class CompiledRatio:
+    """
+    A RatioSpec resolved against a fixed field order: formula terms become column
+    indexes, so evaluating one document is a few list lookups and one division.
+    """
+    __slots__ = ("key", "unit", "num_idx", "num_fill", "den_idx", "den_positive")
 
-        try:
-            if key in ("CURRENT_RATIO", "QUICK_RATIO", "OCF_TO_CL"):
-                num = vals[0] if key != "QUICK_RATIO" else (vals[0] or 0) + (vals[1] or 0) + (vals[2] or 0)
-                den = vals[-1]
-                if den is None or den == 0 or num is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(num/den, 4), "unit": spec.display_unit, "na": False}
+    def __init__(self, key: str, spec: RatioSpec, index: Mapping[str, int]):
+        self.key = key
+        self.unit = spec.display_unit
+        self.num_idx = [index[d] for d in spec.numerator]
+        self.num_fill = [d in spec.zero_if_missing for d in spec.numerator]
+        self.den_idx = index[spec.denominator]
+        self.den_positive = spec.den_rule == DEN_POSITIVE
 
-            elif key == "DEBT_TO_EQUITY":
-                td, te = vals
-                if te is None or te == 0 or td is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(td/te, 4), "unit": spec.display_unit, "na": False}
+    def na(self) -> Dict[str, Any]:
+        return {"value": None, "unit": self.unit, "na": True}
 
-            elif key == "DEBT_TO_ASSETS":
-                td, ta = vals
-                if ta is None or ta == 0 or td is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(td/ta, 4), "unit": "percent", "na": False}
+    def evaluate(self, row: Sequence[Any]) -> Dict[str, Any]:
+        den = row[self.den_idx]
+        if den is None or (den <= 0 if self.den_positive else den == 0):
+            return self.na()
+        num = None
+        for i, fill in zip(self.num_idx, self.num_fill):
+            v = row[i]
+            if fill:
+                v = v or 0
+            elif v is None:
+                return self.na()
+            num = v if num is None else num + v
+        return {"value": round(num/den, 4), "unit": self.unit, "na": False}
 
-            elif key == "INTEREST_COVERAGE":
-                ebit, ie = vals
-                if ie is None or ie <= 0 or ebit is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(ebit/ie, 4), "unit": spec.display_unit, "na": False}
+    def evaluate_columns(self, values: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorised `evaluate` over an N×F matrix: (quotients, na_mask)."""
+        den, den_ok = values[:, self.den_idx], present[:, self.den_idx]
+        bad_den = (den <= 0) if self.den_positive else (den == 0)
+        na = ~den_ok | bad_den
+        num = None
+        for i, fill in zip(self.num_idx, self.num_fill):
+            v = values[:, i]
+            if fill:
+                # mirrors `v or 0`: missing, 0.0 and -0.0 all become +0.0
+                v = np.where(present[:, i] & (v != 0), v, 0.0)
+            else:
+                na = na | ~present[:, i]
+            num = v if num is None else num + v
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            q = np.where(na, 0.0, num) / np.where(na, 1.0, den)
+        return q, na
 
-            elif key == "OCF_TO_DEBT":
-                ocf, td = vals
-                if td is None or td == 0 or ocf is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(ocf/td, 4), "unit": spec.display_unit, "na": False}
+INPUT_FIELDS: List[str] = sorted({d for spec in RATIOS.values() for d in spec.inputs})
+_FIELD_INDEX = {f: i for i, f in enumerate(INPUT_FIELDS)}
+COMPILED: Dict[str, CompiledRatio] = {k: CompiledRatio(k, spec, _FIELD_INDEX) for k, spec in RATIOS.items()}
 
-            elif key in ("FCF_MARGIN", "GROSS_MARGIN", "EBIT_MARGIN", "NET_MARGIN"):
-                num, rev = vals
-                if rev is None or rev == 0 or num is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(num/rev, 4), "unit": "percent", "na": False}
+def _flatten(doc: Doc, fields: Sequence[str] = INPUT_FIELDS) -> List[Any]:
+    """One model_dump per document, then dotted lookups for every ratio input."""
+    cur_doc = doc.model_dump() if isinstance(doc, Extracted10K) else doc
+    row = []
+    for dotted in fields:
+        cur = cur_doc
+        for part in dotted.split("."):
+            cur = cur.get(part, None) if isinstance(cur, dict) else None
+            if cur is None:
+                break
+        row.append(cur)
+    return row
 
-            elif key == "ASSET_TURNOVER":
-                rev, ta = vals
-                if ta is None or ta == 0 or rev is None:
-                    set_na()
-                else:
-                    out["ratios"][key] = {"value": round(rev/ta, 4), "unit": spec.display_unit, "na": False}
-            else:
-                set_na()
+def compute_ratios(doc: Doc) -> Dict[str, Any]:
+    row = _flatten(doc)
+    out = {"ratios": {}, "used_fields": []}
+    for key, cr in COMPILED.items():
+        try:
+            out["ratios"][key] = cr.evaluate(row)
         except Exception:
-            set_na()
+            out["ratios"][key] = cr.na()
+    out["used_fields"] = [f for f, v in zip(INPUT_FIELDS, row) if v is not None]
+    return out
+
+# ---- batch (columnar) path ----
 
-    # Deduplicate used_fields
-    out["used_fields"] = sorted(list(set(out["used_fields"])))
+def build_input_matrix(docs: Sequence[Doc],
+                       fields: Sequence[str] = INPUT_FIELDS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Columnar view of every ratio input: values (N×F float64, 0 where missing) and a
+    presence mask (N×F bool). Missing is tracked separately so NaN/inf inputs keep
+    the same semantics as `compute_ratios`.
+    """
+    rows = [_flatten(d, fields) for d in docs]
+    present = np.array([[v is not None for v in r] for r in rows], dtype=bool).reshape(len(rows), len(fields))
+    values = np.array([[0.0 if v is None else float(v) for v in r] for r in rows],
+                      dtype=np.float64).reshape(len(rows), len(fields))
+    return values, present
+
+def compute_ratios_batch(docs: Sequence[Doc]) -> List[Dict[str, Any]]:
+    """
+    Ratios for many filings at once. Inputs are flattened into one matrix and each
+    ratio is a single array expression over all N documents; results match
+    `compute_ratios(doc)` for every doc, including NA rules and 4-dp rounding.
+    """
+    values, present = build_input_matrix(docs)
+    per_ratio = []
+    for key, cr in COMPILED.items():
+        q, na = cr.evaluate_columns(values, present)
+        per_ratio.append((key, cr.unit, na.tolist(), q.tolist()))
+
+    out = []
+    for i, present_row in enumerate(present.tolist()):
+        ratios = {}
+        for key, unit, na, q in per_ratio:
+            if na[i]:
+                ratios[key] = {"value": None, "unit": unit, "na": True}
+            else:
+                ratios[key] = {"value": round(q[i], 4), "unit": unit, "na": False}
+        used = [f for f, ok in zip(INPUT_FIELDS, present_row) if ok]
+        out.append({"ratios": ratios, "used_fields": used})
     return out
@@ -0,0 +1,104 @@
+import math
+import re
+import time
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Per-document lexical retrieval over ADE chunks (Okapi BM25, pure Python).
+
+_TAG = re.compile(r"<[^>]+>")
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOP = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were
+will with what which who how does did do our we us their they
+""".split())
+
+MAX_PASSAGE_CHARS = 1500
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(_TAG.sub(" ", text or "").lower()) if t not in _STOP]
+
+def passages_from_chunks(chunks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ADE chunk dicts → passages {id, type, page (1-indexed), box, text}; empty chunks dropped."""
+    out = []
+    for ch in chunks or []:
+        text = " ".join(_TAG.sub(" ", ch.get("markdown") or "").split())
+        if not text:
+            continue
+        g = ch.get("grounding") or {}
+        if isinstance(g, list):
+            g = g[0] if g else {}
+        page = (g or {}).get("page")
+        out.append({
+            "id": ch.get("id") or str(len(out)),
+            "type": ch.get("type"),
+            "page": int(page) + 1 if page is not None else None,
+            "box": (g or {}).get("box"),
+            "text": text,
+        })
+    return out
+
+class BM25Index:
+    """
+    Inverted index with precomputed IDF. Serialises to plain JSON (`to_dict`) and
+    `from_dict` wraps the loaded structures without copying, so a cached dict is
+    queryable immediately.
+    """
+
+    def __init__(self, passages: List[Dict[str, Any]], postings: Dict[str, List[List[float]]],
+                 lengths: List[int], k1: float = 1.5, b: float = 0.75, build_ms: Optional[float] = None):
+        self.passages = passages
+        self.postings = postings          # term → [[passage_idx, tf, idf], ...]
+        self.lengths = lengths
+        self.avgdl = (sum(lengths) / len(lengths)) if lengths else 0.0
+        self.k1, self.b = k1, b
+        self.build_ms = build_ms
+
+    @classmethod
+    def build(cls, passages: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        t0 = time.perf_counter()
+        tf_lists: Dict[str, List[List[float]]] = {}
+        lengths = []
+        for i, p in enumerate(passages):
+            toks = tokenize(p["text"])
+            lengths.append(len(toks))
+            for term, tf in Counter(toks).items():
+                tf_lists.setdefault(term, []).append([i, tf])
+        n = len(passages)
+        for plist in tf_lists.values():
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for posting in plist:
+                posting.append(idf)
+        return cls(passages, tf_lists, lengths, k1, b, build_ms=round((time.perf_counter() - t0) * 1000, 3))
+
+    def search(self, query: str, k: int = 6) -> List[Tuple[float, Dict[str, Any]]]:
+        scores: Dict[int, float] = {}
+        k1, b, avgdl, lengths = self.k1, self.b, self.avgdl or 1.0, self.lengths
+        for term in set(tokenize(query)):
+            for i, tf, idf in self.postings.get(term, ()):
+                i = int(i)
+                norm = tf + k1 * (1 - b + b * lengths[i] / avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / norm
+        top = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [(round(s, 4), self.passages[i]) for i, s in top]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k1": self.k1, "b": self.b, "build_ms": self.build_ms, "passages": self.passages,
+                "lengths": self.lengths, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BM25Index":
+        return cls(d.get("passages", []), d.get("postings", {}), d.get("lengths", []),
+                   d.get("k1", 1.5), d.get("b", 0.75), d.get("build_ms"))
+
+def build_retrieval_index(chunks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pipeline stage: ADE chunks → serialised BM25 index (persisted as retrieval.json)."""
+    return BM25Index.build(passages_from_chunks(chunks)).to_dict()
+
+def format_passages(hits: List[Tuple[float, Dict[str, Any]]], max_chars: int = MAX_PASSAGE_CHARS) -> str:
+    lines = []
+    for _, p in hits:
+        page = f"p. {p['page']}" if p.get("page") else "page unknown"
+        text = p["text"] if len(p["text"]) <= max_chars else p["text"][:max_chars] + " …"
+        lines.append(f"[{page}] {text}")
+    return "\n\n".join(lines)
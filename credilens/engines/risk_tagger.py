@@ -0,0 +1,189 @@
+# credilens/engines/risk_tagger.py
+"""
+Local risk tagging against data/config/risk_taxonomy.yaml without an LLM.
+
+All taxonomy anchors are compiled into one case-insensitive alternation (one capture
+group per anchor), so each paragraph is scanned once regardless of how many tags and
+anchors the taxonomy has. Paragraphs are scored per tag, ranked, and located on pages
+by word-shingle votes against the ADE chunk passages. Output is deterministic: same
+text + taxonomy + chunks, same tags, order and pages.
+
+    tagger = RiskTagger.from_yaml(Path("data/config/risk_taxonomy.yaml").read_text())
+    tags = tagger.rank(paragraphs, pages=locate_pages(paragraphs, passages))
+
+Tag every processed filing (writes risk_tags.json next to summaries.json):
+
+    python -m credilens.engines.risk_tagger --outputs data/outputs
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import yaml
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+SHINGLE = 8
+
+
+def split_paragraphs(risk_factors: Iterable[str]) -> List[str]:
+    """Risk factor strings → non-empty paragraphs (each item split further on newlines)."""
+    out = []
+    for item in risk_factors or []:
+        for para in re.split(r"\n+", item or ""):
+            para = " ".join(para.split())
+            if para:
+                out.append(para)
+    return out
+
+
+def _anchor_pattern(anchor: str) -> str:
+    # "variable-rate debt" also matches "variable rate debt"; a trailing plural is optional
+    words = _WORD.findall(anchor.lower())
+    return r"[\s\-]+".join(re.escape(w) for w in words) + r"(?:e?s)?"
+
+
+class RiskTagger:
+    """
+    One-pass multi-anchor matcher. A paragraph's score for a tag is
+    2 * distinct anchors matched + total anchor hits, so breadth beats repetition.
+    """
+
+    def __init__(self, taxonomy: Dict[str, Sequence[str]]):
+        self.tags = list(taxonomy)
+        self._anchor_tag: List[Tuple[str, str]] = []
+        patterns = []
+        # longest anchors first: "credit facility" wins over a hypothetical "credit"
+        for tag, anchor in sorted(((t, a) for t, anchors in taxonomy.items() for a in anchors or []),
+                                  key=lambda ta: -len(ta[1])):
+            if _WORD.search(anchor.lower()):
+                self._anchor_tag.append((tag, anchor))
+                patterns.append(f"({_anchor_pattern(anchor)})")
+        self._regex = re.compile(r"\b(?:" + "|".join(patterns) + r")\b", re.IGNORECASE) if patterns else None
+
+    @classmethod
+    def from_yaml(cls, text: str) -> "RiskTagger":
+        return _tagger_for(text)
+
+    def scan(self, text: str) -> Dict[str, Tuple[int, List[str]]]:
+        """{tag: (score, anchors matched)} for one paragraph."""
+        if self._regex is None:
+            return {}
+        hits: Dict[str, Dict[str, int]] = {}
+        for m in self._regex.finditer(text or ""):
+            tag, anchor = self._anchor_tag[m.lastindex - 1]
+            per = hits.setdefault(tag, {})
+            per[anchor] = per.get(anchor, 0) + 1
+        return {tag: (2 * len(per) + sum(per.values()), sorted(per)) for tag, per in hits.items()}
+
+    def rank(self, paragraphs: Sequence[str], pages: Optional[Sequence[List[int]]] = None,
+             per_tag: int = 3, max_tags: int = 5) -> List[Dict[str, Any]]:
+        """
+        Tags ordered by total score (ties: taxonomy order), each with its top `per_tag`
+        paragraphs (ties: document order) and the pages of those paragraphs.
+        """
+        by_tag: Dict[str, List[Tuple[int, int, List[str]]]] = {}
+        for i, para in enumerate(paragraphs):
+            for tag, (score, anchors) in self.scan(para).items():
+                by_tag.setdefault(tag, []).append((score, i, anchors))
+        order = {t: i for i, t in enumerate(self.tags)}
+        ranked = sorted(by_tag.items(), key=lambda kv: (-sum(s for s, _, _ in kv[1]), order[kv[0]]))
+        out = []
+        for tag, hits in ranked[:max_tags] if max_tags else ranked:
+            top = sorted(hits, key=lambda h: (-h[0], h[1]))[:per_tag]
+            tag_pages = sorted({p for _, i, _ in top for p in (pages[i] if pages else [])})
+            out.append({
+                "tag": tag,
+                "score": sum(s for s, _, _ in hits),
+                "paragraphs": len(hits),
+                "anchors": sorted({a for _, _, anchors in hits for a in anchors}),
+                "top": [{"index": i, "score": s, "pages": list(pages[i]) if pages else []} for s, i, _ in top],
+                "pages": tag_pages,
+            })
+        return out
+
+
+@lru_cache(maxsize=8)
+def _tagger_for(taxonomy_yaml: str) -> RiskTagger:
+    data = yaml.safe_load(taxonomy_yaml) or {}
+    return RiskTagger({tag: list((spec or {}).get("anchors") or []) for tag, spec in data.items()})
+
+
+def _shingles(words: List[str], step: int = 1) -> Iterable[Tuple[str, ...]]:
+    for i in range(0, max(1, len(words) - SHINGLE + 1), step):
+        yield tuple(words[i:i + SHINGLE])
+
+
+def locate_pages(paragraphs: Sequence[str], passages: Sequence[Dict[str, Any]]) -> List[List[int]]:
+    """
+    1-indexed pages printing each paragraph: every passage's 8-word shingles vote for
+    its page; a paragraph keeps the pages with at least a quarter of the top vote, so
+    one that runs over a page break gets both pages. Linear in total words.
+    """
+    index: Dict[Tuple[str, ...], set] = {}
+    for p in passages or []:
+        if p.get("page") is None:
+            continue
+        for sh in _shingles(_WORD.findall((p.get("text") or "").lower())):
+            index.setdefault(sh, set()).add(int(p["page"]))
+    out = []
+    for para in paragraphs:
+        votes: Dict[int, int] = {}
+        for sh in _shingles(_WORD.findall(para.lower()), step=SHINGLE // 2):
+            for page in index.get(sh, ()):
+                votes[page] = votes.get(page, 0) + 1
+        best = max(votes.values(), default=0)
+        out.append(sorted(p for p, v in votes.items() if v * 4 >= best) if best else [])
+    return out
+
+
+def lead(text: str, max_chars: int = 240) -> str:
+    """First sentence of `text`, cut at a word boundary to `max_chars`."""
+    first = _SENTENCE.split(text.strip(), 1)[0]
+    if len(first) <= max_chars:
+        return first
+    return first[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def local_risk_bullets(paragraphs: Sequence[str], tagged: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tagging-only bullets: the top paragraph's lead sentence stands in for the LLM text."""
+    out = []
+    for t in tagged:
+        top = paragraphs[t["top"][0]["index"]]
+        out.append({"tag": t["tag"], "title": t["tag"].replace("_", " ").title(),
+                    "why_it_matters": lead(top), "pages": t["pages"],
+                    "anchors": t["anchors"], "score": t["score"], "source": "local"})
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Tag risk factors of processed filings locally (no LLM).")
+    ap.add_argument("--outputs", type=Path, default=Path("data/outputs"))
+    ap.add_argument("--taxonomy", type=Path, default=Path("data/config/risk_taxonomy.yaml"))
+    ap.add_argument("--per-tag", type=int, default=3)
+    ap.add_argument("--max-tags", type=int, default=0, help="0 = every matched tag")
+    args = ap.parse_args(argv)
+
+    tagger = RiskTagger.from_yaml(args.taxonomy.read_text())
+    t0 = time.perf_counter()
+    n = paras = 0
+    for d in sorted(p for p in args.outputs.iterdir() if (p / "parsed_extracted10k.json").exists()):
+        doc = json.loads((d / "parsed_extracted10k.json").read_text())
+        paragraphs = split_paragraphs((doc.get("sections") or {}).get("risk_factors") or [])
+        retrieval = d / "retrieval.json"
+        passages = json.loads(retrieval.read_text()).get("passages", []) if retrieval.exists() else []
+        tagged = tagger.rank(paragraphs, locate_pages(paragraphs, passages), args.per_tag, args.max_tags)
+        (d / "risk_tags.json").write_text(json.dumps({"risks": local_risk_bullets(paragraphs, tagged)}, indent=2))
+        n += 1
+        paras += len(paragraphs)
+    print(f"tagged {n} filings ({paras} paragraphs) in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
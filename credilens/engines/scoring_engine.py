@@ -1,46 +1,126 @@
 import yaml
+import threading
+from bisect import bisect_right
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
 
-def _band_score(val: float, bands: Dict[str, float]) -> float:
+SCORING_YAML = Path("data/config/scoring.yaml")
+
+LADDER = [("A_min", 95), ("B_min", 85), ("C_min", 70), ("D_min", 55)]
+BELOW_D = 40.0
+GRACE_NA_COUNT = 2      # pillars with this many NA ratios are dampened
+GRACE_FACTOR = 0.8
+_LADDER_SCORES = {float(s): s for _, s in LADDER}   # float → the ladder's own (int) score
+
+def _compile_bands(bands: Dict[str, float]) -> Tuple[List[float], List[float]]:
     """
-    Example bands (higher better): A_min, B_min, C_min, D_min
-    Map value to 0-100 via piecewise linear. Simplified.
+    Ladder → (ascending thresholds, scores) such that the score for `val` is the one
+    paired with the largest threshold <= val. The ladder's rule is "first step (A, B,
+    C, D) whose threshold val meets, else BELOW_D"; only steps whose threshold is below
+    every earlier step can ever match first, so the others are dropped, which keeps that
+    rule exact even for increasing band ladders.
     """
-    if val is None:
-        return None
-    ladder = [("A_min", 95), ("B_min", 85), ("C_min", 70), ("D_min", 55)]
-    prev_thr, prev_score = None, None
-    for k, s in ladder:
+    thr_desc, scores = [], []
+    for k, s in LADDER:
         thr = bands.get(k)
-        if thr is None: 
+        if thr is None:
             continue
-        if val >= thr:
-            # linear interpolate between thr and previous threshold if exists
-            if prev_thr is None:
-                return s
-            # else interpolate between prev_thr(s_prev) and thr(s)
-            # but since decreasing scores, keep it simple:
-            return s
-        prev_thr, prev_score = thr, s
-    return 40.0  # below D
+        if not thr_desc or thr < thr_desc[-1]:
+            thr_desc.append(float(thr))
+            scores.append(s)
+    return thr_desc[::-1], scores[::-1]
+
+class ScoringConfig:
+    """
+    scoring.yaml validated and compiled once: band ladders as sorted threshold arrays,
+    pillar weights as vectors over a fixed ratio order.
+    """
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        bands = raw.get("bands") or {}
+        ratio_weights = raw.get("ratio_weights") or {}
+        pillars = raw.get("pillars") or {}
+        for name, section in (("bands", bands), ("ratio_weights", ratio_weights), ("pillars", pillars)):
+            if not isinstance(section, dict):
+                raise ValueError(f"scoring.yaml: '{name}' must be a mapping")
+        for rk, b in bands.items():
+            if not isinstance(b, dict) or not all(isinstance(v, (int, float)) for v in b.values()):
+                raise ValueError(f"scoring.yaml: bands.{rk} must map band names to numbers")
+        for p, ws in ratio_weights.items():
+            if not isinstance(ws, dict) or not all(isinstance(v, (int, float)) for v in ws.values()):
+                raise ValueError(f"scoring.yaml: ratio_weights.{p} must map ratios to numeric weights")
+        for p, w in pillars.items():
+            if not isinstance(w, (int, float)):
+                raise ValueError(f"scoring.yaml: pillars.{p} must be a number")
+
+        self.bands: Dict[str, Tuple[List[float], List[float]]] = {
+            rk: _compile_bands(b) for rk, b in bands.items() if b
+        }
+        self.ratio_keys: List[str] = list(dict.fromkeys(
+            [*self.bands, *(rk for ws in ratio_weights.values() for rk in ws)]
+        ))
+        self.ratio_index = {rk: i for i, rk in enumerate(self.ratio_keys)}
+        # pillar → [(ratio column, weight)] in config order
+        self.pillar_terms: Dict[str, List[Tuple[int, float]]] = {
+            p: [(self.ratio_index[rk], float(w)) for rk, w in ws.items()]
+            for p, ws in ratio_weights.items()
+        }
+        self.pillar_names: List[str] = list(ratio_weights)
+        self.final_weights: List[Tuple[str, float]] = [(p, float(w)) for p, w in pillars.items()]
+
+    def band_score(self, rkey: str, val: Optional[float]) -> Optional[float]:
+        compiled = self.bands.get(rkey)
+        if compiled is None or val is None:
+            return None
+        thr, scores = compiled
+        if val != val:  # NaN never clears a threshold
+            return BELOW_D
+        i = bisect_right(thr, val) - 1
+        return scores[i] if i >= 0 else BELOW_D
+
+    def band_scores(self, rkey: str, vals: np.ndarray) -> np.ndarray:
+        """Vectorised `band_score` for one ratio column (NaN in → NaN out when unbanded)."""
+        compiled = self.bands.get(rkey)
+        if compiled is None:
+            return np.full(vals.shape, np.nan)
+        thr, scores = compiled
+        idx = np.searchsorted(np.asarray(thr), vals, side="right") - 1
+        lut = np.append(np.asarray(scores, dtype=np.float64), BELOW_D)   # idx -1 → BELOW_D
+        out = lut[idx]
+        out[np.isnan(vals)] = BELOW_D
+        return out
+
+_cfg: Optional[ScoringConfig] = None
+_cfg_mtime: Optional[int] = None
+_cfg_lock = threading.Lock()
+
+def get_scoring_config() -> ScoringConfig:
+    """Compiled scoring config, re-read only when scoring.yaml's mtime changes."""
+    global _cfg, _cfg_mtime
+    mtime = SCORING_YAML.stat().st_mtime_ns
+    with _cfg_lock:
+        if _cfg is None or mtime != _cfg_mtime:
+            _cfg = ScoringConfig(yaml.safe_load(SCORING_YAML.read_text()))
+            _cfg_mtime = mtime
+        return _cfg
+
+def load_scoring_config() -> Dict[str, Any]:
+    return get_scoring_config().raw
 
 def compute_scores(ratios_result: Dict[str, Any]) -> Dict[str, Any]:
-    cfg = yaml.safe_load(Path("data/config/scoring.yaml").read_text())
+    cfg = get_scoring_config()
     ratio_scores = {}
     for rkey, rdata in ratios_result["ratios"].items():
         if rdata["na"]:
             ratio_scores[rkey] = None
             continue
-        bands = cfg["bands"].get(rkey)
-        if not bands:
-            ratio_scores[rkey] = None
-        else:
-            ratio_scores[rkey] = _band_score(rdata["value"], bands)
+        ratio_scores[rkey] = cfg.band_score(rkey, rdata["value"])
 
     # Pillars
     pillars_out = {}
-    for pillar, weights in cfg["ratio_weights"].items():
+    for pillar, weights in cfg.raw["ratio_weights"].items():
         total_w, acc = 0.0, 0.0
         na_count = 0
         for rk, w in weights.items():
@@ -57,15 +137,15 @@ def compute_scores(ratios_result: Dict[str, Any]) -> Dict[str, Any]:
 
     # Grace rules
     for pillar, meta in pillars_out.items():
-        if meta.get("na_count", 0) >= 2:
+        if meta.get("na_count", 0) >= GRACE_NA_COUNT:
             # dampen this pillar by 20%
             if meta["score"] is not None:
-                meta["score"] = round(meta["score"] * 0.8, 2)
+                meta["score"] = round(meta["score"] * GRACE_FACTOR, 2)
 
     # Final weighted
     final = 0.0
     total_w = 0.0
-    for pillar, w in cfg["pillars"].items():
+    for pillar, w in cfg.raw["pillars"].items():
         sc = pillars_out.get(pillar, {}).get("score")
         if sc is None:
             continue
@@ -74,3 +154,100 @@ def compute_scores(ratios_result: Dict[str, Any]) -> Dict[str, Any]:
     final_score = round(final/total_w, 2) if total_w else None
 
     return {"ratio_scores": ratio_scores, "pillars": pillars_out, "final_score": final_score}
+
+# ---- batch (matrix) path ----
+
+def _round(a: np.ndarray, nd: int) -> np.ndarray:
+    # Python's round() (correctly rounded decimal) so batch results equal compute_scores exactly
+    return np.array([round(x, nd) for x in a.tolist()], dtype=np.float64)
+
+def compute_scores_matrix(values: np.ndarray, na: Optional[np.ndarray] = None,
+                          ratio_keys: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Score N filings in one call. `values` is N×R (columns = `ratio_keys`, default the
+    config's ratio order); `na` marks NA ratios (default: NaN cells). Returns arrays with
+    NaN for None: ratio_scores (N×R), pillar_scores (N×P, see `pillars`), pillar_na_count
+    (N×P) and final_score (N).
+    """
+    cfg = get_scoring_config()
+    ratio_keys = list(ratio_keys or cfg.ratio_keys)
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(ratio_keys))
+    na = np.isnan(values) if na is None else np.asarray(na, dtype=bool)
+    n = values.shape[0]
+    col = {rk: j for j, rk in enumerate(ratio_keys)}
+
+    # ratio scores in the config's column order (ratios absent from input → NA)
+    S = np.full((n, len(cfg.ratio_keys)), np.nan)
+    for rk, j in cfg.ratio_index.items():
+        if rk in col:
+            c = col[rk]
+            s = cfg.band_scores(rk, values[:, c])
+            s[na[:, c]] = np.nan
+            S[:, j] = s
+
+    P = np.full((n, len(cfg.pillar_names)), np.nan)
+    NA = np.zeros((n, len(cfg.pillar_names)), dtype=np.int64)
+    for k, pillar in enumerate(cfg.pillar_names):
+        acc, total_w = np.zeros(n), np.zeros(n)
+        for j, w in cfg.pillar_terms[pillar]:
+            ok = ~np.isnan(S[:, j])
+            acc = acc + np.where(ok, S[:, j] * w, 0.0)
+            total_w = total_w + np.where(ok, w, 0.0)
+            NA[:, k] += ~ok
+        has = total_w != 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = _round(np.where(has, acc / np.where(has, total_w, 1.0), np.nan), 2)
+        damp = has & (NA[:, k] >= GRACE_NA_COUNT)
+        if damp.any():
+            score[damp] = _round(score[damp] * GRACE_FACTOR, 2)
+        P[:, k] = score
+
+    final, total_w = np.zeros(n), np.zeros(n)
+    pidx = {p: k for k, p in enumerate(cfg.pillar_names)}
+    for pillar, w in cfg.final_weights:
+        if pillar not in pidx:
+            continue
+        sc = P[:, pidx[pillar]]
+        ok = ~np.isnan(sc)
+        final = final + np.where(ok, sc * w, 0.0)
+        total_w = total_w + np.where(ok, w, 0.0)
+    has = total_w != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        final_score = _round(np.where(has, final / np.where(has, total_w, 1.0), np.nan), 2)
+
+    return {"ratio_keys": list(cfg.ratio_keys), "ratio_scores": S,
+            "pillars": list(cfg.pillar_names), "pillar_scores": P,
+            "pillar_na_count": NA, "final_score": final_score}
+
+def compute_scores_batch(ratio_results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """`compute_scores` for many `compute_ratios` results via `compute_scores_matrix`."""
+    keys = list(dict.fromkeys(rk for r in ratio_results for rk in r["ratios"]))
+    values = np.full((len(ratio_results), len(keys)), np.nan)
+    na = np.ones((len(ratio_results), len(keys)), dtype=bool)
+    for i, r in enumerate(ratio_results):
+        for j, rk in enumerate(keys):
+            d = r["ratios"].get(rk)
+            # a None value scores like NA in compute_scores
+            if d and not d["na"] and d["value"] is not None:
+                values[i, j], na[i, j] = d["value"], False
+    m = compute_scores_matrix(values, na=na, ratio_keys=keys)
+    cfg = get_scoring_config()
+    nan_none = lambda x: None if x != x else x
+
+    out = []
+    for i, r in enumerate(ratio_results):
+        ratio_scores = {}
+        for rk, rdata in r["ratios"].items():
+            j = cfg.ratio_index.get(rk)
+            sc = None if rdata["na"] or j is None else nan_none(float(m["ratio_scores"][i, j]))
+            ratio_scores[rk] = _LADDER_SCORES.get(sc, sc)
+        pillars_out = {}
+        for k, pillar in enumerate(m["pillars"]):
+            sc = nan_none(float(m["pillar_scores"][i, k]))
+            if sc is None:
+                pillars_out[pillar] = {"score": None, "na": True}
+            else:
+                pillars_out[pillar] = {"score": sc, "na": False, "na_count": int(m["pillar_na_count"][i, k])}
+        out.append({"ratio_scores": ratio_scores, "pillars": pillars_out,
+                    "final_score": nan_none(float(m["final_score"][i]))})
+    return out
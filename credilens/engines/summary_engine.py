@@ -1,6 +1,10 @@
-from typing import Dict, Any, List
-from openai import OpenAI
+from typing import Dict, Any, List, Optional
+import json
 from config import settings
+from .scoring_engine import load_scoring_config
+from .retrieval import passages_from_chunks
+from .risk_tagger import RiskTagger, local_risk_bullets, locate_pages, split_paragraphs
+from ..services.llm import chat_completion
 
 PILLAR_SUMMARY_SYS = (
     "You are a financial analyst. Write a brief, factual 1-2 sentence summary "
@@ -8,43 +12,103 @@ PILLAR_SUMMARY_SYS = (
     "Include a short rationale with the leading ratio(s). No speculation."
 )
 
+PILLAR_BATCH_SYS = (
+    "You are a financial analyst. For EACH pillar in the provided JSON list, write a brief, "
+    "factual 1-2 sentence summary using only that pillar's score and ratios. "
+    "Include a short rationale with the leading ratio(s). No speculation. "
+    "Return one JSON object mapping every pillar name exactly as given to its summary string."
+)
+
 RISK_BULLETS_SYS = (
     "You are extracting risk factors from 10-K text. "
     "Return 3-5 JSON objects with 'tag', 'title', 'why_it_matters', 'pages'. "
     "Use the provided taxonomy anchors to tag."
 )
 
-def _client():
-    return OpenAI(api_key=settings.OPENAI_API_KEY)
+RISK_EXPLAIN_SYS = (
+    "You are a credit analyst reading 10-K risk factors. For EACH tag in the provided JSON list, "
+    "use only that tag's paragraphs to write a short 'title' and a 1-2 sentence 'why_it_matters' "
+    "for a lender. No speculation. Return one JSON object mapping every tag exactly as given to "
+    "{\"title\": ..., \"why_it_matters\": ...}."
+)
 
-def _chat(system: str, user: str, model: str = None) -> str:
-    resp = _client().chat.completions.create(
-        model=model or settings.OPENAI_MODEL,
-        messages=[{"role":"system","content":system},{"role":"user","content":user}],
-        temperature=0.2
+def _chat(system: str, user: str, model: str = None, json_mode: bool = False) -> str:
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+    return chat_completion(
+        [{"role":"system","content":system},{"role":"user","content":user}],
+        model=model,
+        temperature=0.2,
+        **kwargs
     )
-    return resp.choices[0].message.content.strip()
 
-def generate_pillar_summaries(doc: Dict[str, Any], ratios: Dict[str, Any], score: Dict[str, Any]) -> Dict[str, str]:
+def _parse_json_object(txt: str) -> Dict[str, Any]:
+    """Tolerant JSON-object parse: accepts bare JSON or JSON wrapped in prose/code fences."""
+    try:
+        data = json.loads(txt)
+    except Exception:
+        lo, hi = txt.find("{"), txt.rfind("}")
+        if lo < 0 or hi <= lo:
+            return {}
+        try:
+            data = json.loads(txt[lo:hi + 1])
+        except Exception:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+def _fmt_ratio(rk: str, data: Dict[str, Any]) -> str:
+    return f"{rk}: {data['value']}{'x' if data['unit']=='multiple' else ''}"
+
+def _pillar_ratios(pillar: str, ratios: Dict[str, Any], ratio_weights: Dict[str, Dict[str, float]]) -> List[str]:
+    """Non-NA ratios that feed `pillar`, heaviest weight first; falls back to the first two overall."""
+    weights = ratio_weights.get(pillar) or {}
+    rs = ratios["ratios"]
+    leading = [_fmt_ratio(rk, rs[rk])
+               for rk, _ in sorted(weights.items(), key=lambda kv: -kv[1])
+               if rs.get(rk) and not rs[rk]["na"]]
+    if weights:
+        return leading
+    for rk, data in rs.items():
+        if data and not data["na"]:
+            leading.append(_fmt_ratio(rk, data))
+        if len(leading) >= 2:
+            break
+    return leading
+
+def _summarize_pillar(pillar: str, meta: Dict[str, Any], leading: List[str]) -> str:
+    user = f"PILLAR: {pillar}\nPILLAR_SCORE: {meta['score']}\nLEADING: {', '.join(leading)}"
+    return _chat(PILLAR_SUMMARY_SYS, user)
+
+def generate_pillar_summaries(doc: Dict[str, Any], ratios: Dict[str, Any], score: Dict[str, Any],
+                              batched: Optional[bool] = None) -> Dict[str, str]:
+    """
+    One summary per scored pillar. Batched mode (default, PILLAR_SUMMARY_BATCHED) sends all
+    pillars with their own ratios in a single JSON-mode request and only re-asks, one by one,
+    for pillars missing from the reply.
+    """
+    if batched is None:
+        batched = settings.PILLAR_SUMMARY_BATCHED
+    ratio_weights = load_scoring_config().get("ratio_weights", {})
+    leading = {p: _pillar_ratios(p, ratios, ratio_weights) for p in score["pillars"]}
+
     out = {}
+    if batched and score["pillars"]:
+        payload = [{"pillar": p, "score": meta["score"], "ratios": leading[p]}
+                   for p, meta in score["pillars"].items()]
+        reply = _parse_json_object(_chat(PILLAR_BATCH_SYS, json.dumps(payload), json_mode=True))
+        for p in score["pillars"]:
+            text = reply.get(p)
+            if isinstance(text, str) and text.strip():
+                out[p] = text.strip()
+
     for pillar, meta in score["pillars"].items():
-        # pick 1-2 leading ratios for explanation
-        # naive: choose the first two ratios from config presence in ratios
-        leading = []
-        for rk, data in ratios["ratios"].items():
-            if data and not data["na"]:
-                leading.append(f"{rk}: {data['value']}{'x' if data['unit']=='multiple' else ''}")
-            if len(leading) >= 2:
-                break
-        user = f"PILLAR: {pillar}\nPILLAR_SCORE: {meta['score']}\nLEADING: {', '.join(leading)}"
-        out[pillar] = _chat(PILLAR_SUMMARY_SYS, user)
-    return out
-
-def generate_risk_bullets(risk_text: str, taxonomy_yaml: str) -> List[Dict[str, Any]]:
+        if pillar not in out:
+            out[pillar] = _summarize_pillar(pillar, meta, leading[pillar])
+    return {p: out[p] for p in score["pillars"]}
+
+def _llm_risk_bullets(risk_text: str, taxonomy_yaml: str) -> List[Dict[str, Any]]:
     user = f"TAXONOMY:\n{taxonomy_yaml}\n\nRISK_FACTORS_TEXT:\n{risk_text}\n\nReturn JSON list."
     txt = _chat(RISK_BULLETS_SYS, user)
     # be tolerant: attempt eval safe
-    import json
     try:
         data = json.loads(txt)
         if isinstance(data, list):
@@ -52,3 +116,41 @@ def generate_risk_bullets(risk_text: str, taxonomy_yaml: str) -> List[Dict[str,
     except Exception:
         pass
     return []
+
+def generate_risk_bullets(risk_text: str, taxonomy_yaml: str, chunks: Optional[List[Dict[str, Any]]] = None,
+                          mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Risk bullets {tag, title, why_it_matters, pages, ...} for the risk factor text.
+
+    RISK_TAGGER_MODE:
+      "hybrid" (default): tags, ranking and pages come from the local anchor tagger; one
+                          JSON-mode request with only the top RISK_PARAGRAPHS_PER_TAG paragraphs
+                          per tag writes title/why_it_matters (local text for tags it skips).
+      "local":            tagging only, no LLM call (bulk runs).
+      "llm":              the whole taxonomy and risk text in one prompt (previous behaviour).
+    """
+    mode = mode or settings.RISK_TAGGER_MODE
+    if mode == "llm":
+        return _llm_risk_bullets(risk_text, taxonomy_yaml)
+
+    paragraphs = split_paragraphs([risk_text])
+    tagger = RiskTagger.from_yaml(taxonomy_yaml)
+    pages = locate_pages(paragraphs, passages_from_chunks(chunks)) if chunks else None
+    tagged = tagger.rank(paragraphs, pages, per_tag=settings.RISK_PARAGRAPHS_PER_TAG,
+                         max_tags=settings.RISK_MAX_TAGS)
+    bullets = local_risk_bullets(paragraphs, tagged)
+    if mode != "hybrid" or not tagged:
+        return bullets
+
+    limit = settings.RISK_PARAGRAPH_MAX_CHARS
+    payload = [{"tag": t["tag"], "anchors": t["anchors"],
+                "paragraphs": [paragraphs[h["index"]][:limit] for h in t["top"]]}
+               for t in tagged]
+    reply = _parse_json_object(_chat(RISK_EXPLAIN_SYS, json.dumps(payload), json_mode=True))
+    for b in bullets:
+        item = reply.get(b["tag"])
+        if isinstance(item, dict) and str(item.get("why_it_matters") or "").strip():
+            b["title"] = str(item.get("title") or b["title"]).strip()
+            b["why_it_matters"] = str(item["why_it_matters"]).strip()
+            b["source"] = "llm"
+    return bullets
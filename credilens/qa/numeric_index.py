@@ -0,0 +1,191 @@
+# credilens/qa/numeric_index.py
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# A number as printed in a filing: optional "(" / "-" / "$", digits with optional
+# thousands separators and decimals, optional ")" and an optional scale word.
+_NUMBER = re.compile(
+    r"(?P<open>\()?\s*(?P<minus>[-−–])?\s*\$?\s*"
+    r"(?P<num>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+    r"\s*(?P<close>\))?"
+    r"(?P<pct>\s*%)?"
+    r"(?:\s*(?P<scale>thousands?|millions?|billions?|bn|mm|[kmb])\b)?",
+    re.IGNORECASE,
+)
+_TAG = re.compile(r"<[^>]+>")
+# "(in millions)", "(Dollars in thousands, except per share)": only the "in <scale>" part matters
+_HEADER_SCALE = re.compile(r"\bin\s+(thousands|millions|billions)\b", re.IGNORECASE)
+# markdown pipe rows or HTML table cells
+_TABLE = re.compile(r"^\s*\||<t[dh]\b", re.IGNORECASE | re.MULTILINE)
+
+_SCALES = {
+    "thousand": 1e3, "thousands": 1e3, "k": 1e3,
+    "million": 1e6, "millions": 1e6, "m": 1e6, "mm": 1e6,
+    "billion": 1e9, "billions": 1e9, "b": 1e9, "bn": 1e9,
+}
+# Unscaled tokens in tables are also indexed at these magnitudes: extraction may report a
+# table's "1,234" (in millions) as 1234, 1234000 or 1234000000 depending on the schema/model.
+# Prose numbers ("within 45 days") are only indexed as printed.
+_IMPLICIT_SCALES = (1.0, 1e3, 1e6, 1e9)
+
+STRONG, WEAK = 2, 1
+MIN_SIG_DIGITS = 2
+MIN_IMPLICIT_SIG_DIGITS = 3   # guessed magnitudes need more digits before they count
+
+
+def _key(value: float, sig: int) -> Optional[Tuple[int, int, int]]:
+    """(significant digits, decimal exponent, mantissa) of |value| rounded to `sig` digits."""
+    v = abs(value)
+    if v == 0 or not math.isfinite(v):
+        return None
+    exp = math.floor(math.log10(v))
+    mant = round(v / 10 ** (exp - sig + 1))
+    if mant >= 10 ** sig:  # 9.995 → 10.00: renormalise
+        exp += 1
+        mant = round(v / 10 ** (exp - sig + 1))
+    return sig, exp, mant
+
+
+def _sig_digits(num: str) -> int:
+    # Trailing zeros count: statements print exact figures, so "1,200" means 1200, not ~1.2k.
+    return len(num.replace(",", "").replace(".", "").lstrip("0")) or 1
+
+
+def parse_numeric_tokens(text: str) -> List[Tuple[float, int, Optional[float]]]:
+    """
+    Numbers printed in `text` as (signed value, significant digits, explicit scale or None).
+
+    Handles "1,234", "(1,234)" and "-1,234" negatives, "$1.2 billion", "450M", "12.5".
+    Percentages and bare four-digit years (1900–2100) are skipped.
+
+    Example:
+        parse_numeric_tokens("Revenue $(1,234.5) million")  ->  [(-1234.5, 5, 1e6)]
+    """
+    out = []
+    for m in _NUMBER.finditer(_TAG.sub(" ", text or "")):
+        if m.group("pct"):
+            continue
+        num = m.group("num")
+        if "," not in num and "." not in num and len(num) == 4 and 1900 <= int(num) <= 2100:
+            continue
+        value = float(num.replace(",", ""))
+        if m.group("minus") or (m.group("open") and m.group("close")):
+            value = -value
+        scale = m.group("scale")
+        out.append((value, _sig_digits(num), _SCALES.get(scale.lower()) if scale else None))
+    return out
+
+
+class NumericIndex:
+    """
+    Inverted index from normalised numeric values to the chunks/pages printing them.
+
+    Values are keyed by (significant digits, exponent, mantissa) at the precision they
+    were printed, so "1,234" in a table "in millions" matches an extracted 1_234_000_000
+    or 1234 but not 1_235_000_000. Explicit scales ("$1.2 billion") and a table's own
+    "(in millions)" header are STRONG evidence and match values they round; magnitudes
+    guessed for a table without a header are WEAK, need MIN_IMPLICIT_SIG_DIGITS and
+    must print the value exactly. Numbers in prose are only indexed as printed.
+    Building is linear in the number of tokens and a lookup probes one key per precision
+    present in the document, so tens of thousands of tokens never need pairwise matching.
+
+    Usage:
+        idx = NumericIndex.from_chunks(chunks)          # ADE chunk dicts with grounding
+        idx.pages_for(1_234_000_000)                    # -> [44, 12]  (1-indexed)
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[Tuple[int, int, int], Dict[int, int]] = {}
+        self._precisions: set = set()
+        self.tokens = 0
+
+    def add(self, value: float, sig: int, page: int, strength: int = STRONG) -> None:
+        if sig < MIN_SIG_DIGITS:
+            return
+        key = _key(value, sig)
+        if key is None:
+            return
+        pages = self._postings.setdefault(key, {})
+        if pages.get(page, 0) < strength:
+            pages[page] = strength
+        self._precisions.add(sig)
+
+    def add_text(self, text: str, page: int) -> None:
+        """Index every number in `text` (one chunk) as printed on 1-indexed `page`."""
+        header = _HEADER_SCALE.search(text or "")
+        header_scale = _SCALES[header.group(1).lower()] if header else None
+        scales = _IMPLICIT_SCALES if header or _TABLE.search(text or "") else (1.0,)
+        for value, sig, scale in parse_numeric_tokens(text):
+            self.tokens += 1
+            if scale is not None:
+                self.add(value * scale, sig, page, STRONG)
+                continue
+            for s in scales:
+                # a table's own "(in millions)" header makes that magnitude the strong one
+                strong = s == (header_scale or 1.0)
+                if strong or sig >= MIN_IMPLICIT_SIG_DIGITS:
+                    self.add(value * s, sig, page, STRONG if strong else WEAK)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict[str, Any]]) -> "NumericIndex":
+        idx = cls()
+        for ch in chunks or []:
+            g = ch.get("grounding") or {}
+            if isinstance(g, list):
+                g = g[0] if g else {}
+            page = (g or {}).get("page")
+            if page is None:
+                continue
+            idx.add_text(ch.get("markdown") or "", int(page) + 1)  # ADE pages are 0-indexed
+        return idx
+
+    def pages_for(self, value: Optional[float], limit: int = 5) -> List[int]:
+        """
+        Pages printing `value` (sign-insensitive), strongest evidence first, then by the
+        most precise match, then page order. Returns [] for None/0/non-finite values.
+        """
+        if value is None or isinstance(value, bool):
+            return []
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return []
+        best: Dict[int, Tuple[int, int]] = {}
+        for sig in self._precisions:
+            key = _key(value, sig)
+            if key is None:
+                return []
+            postings = self._postings.get(key)
+            if not postings:
+                continue
+            # WEAK evidence must print the value in full, not a rounding of it
+            exact = abs(key[2] * 10.0 ** (key[1] - sig + 1) - abs(value)) <= 1e-9 * abs(value)
+            for page, strength in postings.items():
+                if strength == WEAK and not exact:
+                    continue
+                rank = (strength, sig)
+                if rank > best.get(page, (0, 0)):
+                    best[page] = rank
+        ordered = sorted(best.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0]))
+        return [p for p, _ in ordered[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+
+def attach_numeric_refs(page_refs: Dict[str, List[int]], values: Sequence[Tuple[str, Any]],
+                        index: NumericIndex, limit: int = 5) -> List[str]:
+    """
+    add_ref() the pages printing each (keypath, value); returns the keypaths matched.
+    """
+    from .provenance import add_ref
+    matched = []
+    for keypath, value in values:
+        pages = index.pages_for(value, limit=limit)
+        if pages:
+            add_ref(page_refs, keypath, pages)
+            matched.append(keypath)
+    return matched
@@ -1,8 +1,9 @@
 # credilens/qa/provenance.py
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
-from typing import Dict, List, Iterable, Mapping, Optional, Tuple
+from typing import Dict, List, Iterable, Iterator, Mapping, Optional, Tuple, Union
 from urllib.parse import urlencode, quote_plus
 
 
@@ -19,11 +20,176 @@ def _normalize_pages(pages: Iterable[int]) -> List[int]:
     return sorted(uniq)
 
 
+def _is_normalized(pages: List[int]) -> bool:
+    """True if `pages` is already strictly increasing positive ints (linear, no sort)."""
+    prev = 0
+    for p in pages:
+        if type(p) is not int or p <= prev:
+            return False
+        prev = p
+    return True
+
+
+class PageSet:
+    """
+    Set of 1-indexed pages stored as sorted, disjoint, non-adjacent inclusive intervals.
+
+    A document's citations are mostly runs (a statement spanning pp. 44–47), so this is
+    far smaller than a page list, and:
+      - `add` is a bisect plus at most one interval splice (no re-sort);
+      - `update` / `union` merge interval lists linearly;
+      - `compact()` formats straight from the intervals (same text as `compact_ranges`);
+      - `to_list()` / `from_list()` round-trip losslessly with the `List[int]` format
+        stored in `page_refs`.
+
+    Example:
+        ps = PageSet([5, 6, 7, 10])
+        ps.add(8)
+        ps.ranges()     # [(5, 8), (10, 10)]
+        ps.compact()    # "pp. 5–8, 10"
+        ps.to_list()    # [5, 6, 7, 8, 10]
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, pages: Iterable[int] = ()):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self.update(pages)
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[Tuple[int, int]]) -> "PageSet":
+        ps = cls()
+        for s, e in ranges:
+            ps.add_range(s, e)
+        return ps
+
+    @classmethod
+    def from_list(cls, pages: Iterable[int]) -> "PageSet":
+        return cls(pages)
+
+    def add(self, page: int) -> None:
+        self.add_range(page, page)
+
+    def add_range(self, start: int, end: int) -> None:
+        """Add pages start..end inclusive (invalid / non-positive pages are ignored)."""
+        try:
+            start, end = max(int(start), 1), int(end)
+        except (TypeError, ValueError):
+            return
+        if end < start:
+            return
+        starts, ends = self._starts, self._ends
+        # intervals [i, j) touch or overlap [start, end] (adjacent runs coalesce)
+        i = bisect_left(ends, start - 1)
+        j = bisect_right(starts, end + 1)
+        if i == j:
+            starts.insert(i, start)
+            ends.insert(i, end)
+            return
+        starts[i:j] = [min(start, starts[i])]
+        ends[i:j] = [max(end, ends[j - 1])]
+
+    def update(self, pages: Iterable[int]) -> None:
+        if isinstance(pages, PageSet):
+            self._merge_ranges(pages.ranges())
+            return
+        norm = pages if isinstance(pages, list) and _is_normalized(pages) else _normalize_pages(pages)
+        if len(norm) <= 4:
+            for p in norm:
+                self.add(p)
+        else:
+            self._merge_ranges(_pairwise_ranges(norm))
+
+    def _merge_ranges(self, other: List[Tuple[int, int]]) -> None:
+        """Linear merge of another sorted interval list into this one."""
+        merged: List[Tuple[int, int]] = []
+        a, b = list(zip(self._starts, self._ends)), other
+        i = j = 0
+        while i < len(a) or j < len(b):
+            if j >= len(b) or (i < len(a) and a[i][0] <= b[j][0]):
+                s, e = a[i]
+                i += 1
+            else:
+                s, e = b[j]
+                j += 1
+            if merged and s <= merged[-1][1] + 1:
+                if e > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], e)
+            else:
+                merged.append((s, e))
+        self._starts = [s for s, _ in merged]
+        self._ends = [e for _, e in merged]
+
+    def union(self, other: Union["PageSet", Iterable[int]]) -> "PageSet":
+        out = self.copy()
+        out.update(other)
+        return out
+
+    __or__ = union
+
+    def copy(self) -> "PageSet":
+        ps = PageSet()
+        ps._starts, ps._ends = list(self._starts), list(self._ends)
+        return ps
+
+    def ranges(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __contains__(self, page: object) -> bool:
+        if not isinstance(page, int):
+            return False
+        i = bisect_right(self._starts, page) - 1
+        return i >= 0 and page <= self._ends[i]
+
+    def __iter__(self) -> Iterator[int]:
+        for s, e in zip(self._starts, self._ends):
+            yield from range(s, e + 1)
+
+    def __len__(self) -> int:
+        return sum(e - s + 1 for s, e in zip(self._starts, self._ends))
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PageSet):
+            return self._starts == other._starts and self._ends == other._ends
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PageSet({self.compact() or '[]'})"
+
+    def to_list(self) -> List[int]:
+        return list(self)
+
+    def compact(self) -> str:
+        if not self._starts:
+            return ""
+        parts = [f"{s}–{e}" if e > s else f"{s}" for s, e in zip(self._starts, self._ends)]
+        label = "p." if self._ends[0] == self._starts[0] and len(self._starts) == 1 else "pp."
+        return f"{label} " + ", ".join(parts)
+
+
+def page_sets_from_refs(page_refs: Mapping[str, Iterable[int]]) -> Dict[str, PageSet]:
+    """`Dict[str, List[int]]` (the stored format) → `Dict[str, PageSet]`."""
+    return {k: PageSet(v or ()) for k, v in page_refs.items()}
+
+
+def page_sets_to_refs(page_sets: Mapping[str, PageSet]) -> Dict[str, List[int]]:
+    """Inverse of `page_sets_from_refs`; keys with empty sets are kept as []."""
+    return {k: ps.to_list() for k, ps in page_sets.items()}
+
+
 def add_ref(page_refs: Dict[str, List[int]], keypath: str, pages: Iterable[int]) -> None:
     """
     Attach one or more 1-indexed page numbers to a dotted keypath.
     Idempotent: maintains unique, sorted page lists.
 
+    Existing lists written by `add_ref` are already normalised, so new pages are
+    bisect-inserted in place instead of re-sorting the whole list; a list that isn't
+    normalised (hand-edited JSON) is repaired once.
+
     Example:
         add_ref(doc.provenance.page_refs, "financials.income_stmt.revenue", [44])
     """
@@ -32,9 +198,20 @@ def add_ref(page_refs: Dict[str, List[int]], keypath: str, pages: Iterable[int])
     pages_norm = _normalize_pages(pages)
     if not pages_norm:
         return
-    existing = page_refs.get(keypath, [])
-    merged = _normalize_pages([*existing, *pages_norm])
-    page_refs[keypath] = merged
+    existing = page_refs.get(keypath)
+    if not existing:
+        page_refs[keypath] = pages_norm
+        return
+    if not (isinstance(existing, list) and _is_normalized(existing)):
+        existing = _normalize_pages(existing)
+        page_refs[keypath] = existing
+    if len(pages_norm) > 16:
+        page_refs[keypath] = PageSet(existing).union(pages_norm).to_list()
+        return
+    for p in pages_norm:
+        i = bisect_left(existing, p)
+        if i == len(existing) or existing[i] != p:
+            existing.insert(i, p)
 
 
 def get_refs_for(page_refs: Mapping[str, List[int]], keypath: str) -> List[int]:
@@ -47,12 +224,16 @@ def merge_page_refs(a: Mapping[str, List[int]], b: Mapping[str, List[int]]) -> D
     Merge two page_refs maps. Values are merged uniquely and sorted.
     Left-biased on keys; values are union.
     """
-    out: Dict[str, List[int]] = {k: _normalize_pages(v) for k, v in a.items()}
+    def norm(v) -> List[int]:
+        # lists written by add_ref are already normalised: skip the per-item int() pass
+        return list(v) if isinstance(v, list) and _is_normalized(v) else _normalize_pages(v or [])
+
+    out: Dict[str, List[int]] = {k: norm(v) for k, v in a.items()}
     for k, v in b.items():
         if k in out:
-            out[k] = _normalize_pages([*out[k], *(v or [])])
+            out[k] = sorted({*out[k], *norm(v)})
         else:
-            out[k] = _normalize_pages(v or [])
+            out[k] = norm(v)
     return out
 
 
@@ -72,11 +253,13 @@ def _pairwise_ranges(sorted_pages: List[int]) -> List[Tuple[int, int]]:
     return runs
 
 
-def compact_ranges(pages: Iterable[int]) -> str:
+def compact_ranges(pages: Union[PageSet, Iterable[int]]) -> str:
     """
     Nicely format pages like: [5,6,7,10] -> "pp. 5–7, 10".
-    Returns "" for empty.
+    Returns "" for empty. A PageSet is formatted straight from its intervals.
     """
+    if isinstance(pages, PageSet):
+        return pages.compact()
     sp = _normalize_pages(pages)
     if not sp:
         return ""
@@ -131,7 +314,11 @@ def build_clickmap(
     clickmap: Dict[str, List[Dict[str, str]]] = {}
     for key, pages in page_refs.items():
         entries: List[Dict[str, str]] = []
-        for p in _normalize_pages(pages):
+        if isinstance(pages, PageSet) or (isinstance(pages, list) and _is_normalized(pages)):
+            ordered: Iterable[int] = pages
+        else:
+            ordered = _normalize_pages(pages)
+        for p in ordered:
             q: Dict[str, str] = {"page": str(p)}
             if doc_id:
                 q["doc"] = doc_id
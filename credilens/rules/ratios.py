@@ -1,12 +1,39 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
+# NA rules for the denominator (a missing denominator is always NA)
+DEN_NONZERO = "nonzero"     # den == 0 → NA
+DEN_POSITIVE = "positive"   # den <= 0 → NA
+
 @dataclass
 class RatioSpec:
+    """
+    Declarative ratio: sum(numerator) ÷ denominator.
+
+    Defaults read the formula off `inputs`: every input but the last is summed into the
+    numerator, the last is the denominator. Numerator terms listed in `zero_if_missing`
+    count as 0 when absent; any other missing input makes the ratio NA, as does a
+    denominator failing `den_rule`. The engine compiles these once at import.
+    """
     inputs: List[str]
     formula_hint: str
     display_unit: str = "multiple"
     notes: Optional[str] = None
+    numerator: Optional[List[str]] = None
+    denominator: Optional[str] = None
+    zero_if_missing: List[str] = field(default_factory=list)
+    den_rule: str = DEN_NONZERO
+
+    def __post_init__(self):
+        if self.numerator is None:
+            self.numerator = list(self.inputs[:-1])
+        if self.denominator is None:
+            self.denominator = self.inputs[-1]
+        if self.den_rule not in (DEN_NONZERO, DEN_POSITIVE):
+            raise ValueError(f"Unknown den_rule: {self.den_rule}")
+        unknown = set(self.numerator + [self.denominator] + self.zero_if_missing) - set(self.inputs)
+        if unknown or not self.numerator:
+            raise ValueError(f"Ratio formula must use declared inputs: {sorted(unknown)}")
 
 RATIOS = {
     "CURRENT_RATIO": RatioSpec(
@@ -25,7 +52,12 @@ RATIOS = {
         ],
         formula_hint="(cash + short-term investments + receivables) ÷ current liabilities",
         display_unit="multiple",
-        notes="If current_liabilities == 0 → NA",
+        notes="If current_liabilities == 0 → NA; missing quick assets count as 0",
+        zero_if_missing=[
+            "financials.balance_sheet.cash",
+            "financials.balance_sheet.short_term_investments",
+            "financials.balance_sheet.accounts_receivable",
+        ],
     ),
     "DEBT_TO_EQUITY": RatioSpec(
         inputs=["financials.balance_sheet.total_debt",
@@ -47,6 +79,7 @@ RATIOS = {
         formula_hint="EBIT ÷ interest expense",
         display_unit="multiple",
         notes="If interest_expense <= 0 or missing → NA",
+        den_rule=DEN_POSITIVE,
     ),
     "OCF_TO_DEBT": RatioSpec(
         inputs=["financials.cash_flow.net_cash_from_ops",
@@ -0,0 +1,97 @@
+# credilens/services/clients.py
+"""
+Process-wide OpenAI and LandingAI ADE clients.
+
+Building an SDK client creates a fresh httpx connection pool, so a client per call pays
+for a new TCP + TLS handshake every time. `get_openai()` / `get_ade()` build each client
+once per process with a bounded keep-alive pool (HTTP_* settings) and hand the same
+instance to every thread; httpx clients are thread-safe. SDK-level retries are off:
+`ratelimit.governed_call` owns backoff so retries are counted against the shared quota.
+
+FAKE_SERVICES=true swaps both for the offline stand-ins in `services/fakes.py`.
+
+After `fork()` the child drops the inherited clients without closing them (their
+sockets still belong to the parent) and builds its own on first use.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Dict
+
+import httpx
+import landingai_ade
+import openai
+
+from config import settings
+
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _reset_after_fork() -> None:
+    global _lock, _pid
+    _clients.clear()
+    _lock = threading.Lock()
+    _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=settings.HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS)
+
+
+def _timeout(read_seconds: float) -> httpx.Timeout:
+    return httpx.Timeout(read_seconds, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _get(name: str, factory: Callable[[], Any]) -> Any:
+    if os.getpid() != _pid:  # forked without the at-fork hook (e.g. a C extension)
+        _reset_after_fork()
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def get_openai() -> openai.OpenAI:
+    """Shared OpenAI client (honours OPENAI_BASE_URL like the SDK default)."""
+    if settings.FAKE_SERVICES:
+        from .fakes import FakeOpenAI
+        return _get("openai", FakeOpenAI)
+    return _get("openai", lambda: openai.OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        http_client=openai.DefaultHttpxClient(limits=_limits()),
+        timeout=_timeout(settings.OPENAI_TIMEOUT_SECONDS),
+        max_retries=0,
+    ))
+
+
+def get_ade() -> landingai_ade.LandingAIADE:
+    """Shared LandingAI ADE client (API key from VISION_AGENT_API_KEY)."""
+    if settings.FAKE_SERVICES:
+        from .fakes import FakeADE
+        return _get("ade", FakeADE)
+    return _get("ade", lambda: landingai_ade.LandingAIADE(
+        http_client=landingai_ade.DefaultHttpxClient(limits=_limits()),
+        timeout=_timeout(settings.ADE_TIMEOUT_SECONDS),
+        max_retries=0,
+    ))
+
+
+def close_clients() -> None:
+    """Close this process's pooled connections (tests, graceful shutdown)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        c.close()
@@ -0,0 +1,223 @@
+# credilens/services/fakes.py
+"""
+Offline stand-ins for the LandingAI ADE and OpenAI clients, for benchmarks and local runs
+without keys or network (FAKE_SERVICES=true makes `clients.get_ade()` / `get_openai()`
+return them).
+
+Both are seeded from data/examples/dummy_extracted_10k.yaml (FAKE_SEED_PATH). Each input
+PDF gets its own deterministic variant of the seed (company name and amounts derived from
+the file's hash), so distinct uploads do not collide in the ADE/LLM caches. Latency is
+simulated with `time.sleep` (base + per page / per token, ± FAKE_JITTER) and response size
+follows the PDF's page count and FAKE_ADE_CHUNKS_PER_PAGE / FAKE_ADE_CHUNK_CHARS /
+FAKE_LLM_COMPLETION_TOKENS.
+
+Only the SDK surface the pipeline uses is implemented:
+    FakeADE().parse(document_url=..., model=...)          -> .markdown, .chunks
+    FakeADE().extract(schema=..., markdown=path, model=...) -> .extraction
+    FakeOpenAI().chat.completions.create(model=..., messages=[...], stream=False|True, ...)
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import yaml
+
+from config import settings
+
+_rng = random.Random(0)
+_rng_lock = threading.Lock()
+_MARKER = re.compile(r"<!-- fake-doc: (\d+) -->")
+_NAME = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)+\b")
+_KG_TYPES = ("Partner", "Client", "Product", "Segment", "Geography")
+# filler for pages past the seeded content: no names, anchors or amounts, so provenance,
+# risk pages and the KG only point at the seeded chunks
+_FILLER = ("the company its operations results period during compared prior year management "
+           "believes certain factors described herein including general conditions may affect "
+           "future performance as discussed below under this section and in the notes").split()
+
+
+def _sleep(base_ms: float, per_unit_ms: float = 0.0, units: float = 0.0) -> None:
+    ms = base_ms + per_unit_ms * units
+    if settings.FAKE_JITTER:
+        with _rng_lock:
+            ms *= 1.0 + _rng.uniform(-settings.FAKE_JITTER, settings.FAKE_JITTER)
+    if ms > 0:
+        time.sleep(ms / 1000.0)
+
+
+@lru_cache(maxsize=4)
+def load_seed(path: str) -> Dict[str, Any]:
+    data = yaml.safe_load(Path(path).read_text()) or {}
+    data.setdefault("company", {}).setdefault("name", "Example Corp")
+    return data
+
+
+def _variant(seed: Dict[str, Any], n: int) -> Dict[str, Any]:
+    """Copy of the seed with its own company name and amounts scaled by 0.5–1.5x."""
+    doc = copy.deepcopy(seed)
+    if n:
+        doc["company"]["name"] = f"{doc['company']['name']} {n % 100000:05d}"
+        factor = 0.5 + (n % 1000) / 1000.0
+        for stmt in (doc.get("financials") or {}).values():
+            for k, v in list((stmt or {}).items()):
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    stmt[k] = round(v * factor, 1)
+    return doc
+
+
+def _project(data: Any, schema: Dict[str, Any]) -> Any:
+    """Keep only the properties `schema` asks for (ADE returns the schema's shape)."""
+    props = (schema or {}).get("properties")
+    if not isinstance(data, dict) or not props:
+        return data
+    return {k: _project(data[k], props[k]) for k in props if k in data and data[k] is not None}
+
+
+def _table(title: str, rows: Dict[str, Any]) -> str:
+    lines = [f"| {title} (in millions) | FY |", "|---|---|"]
+    lines += [f"| {k.replace('_', ' ').title()} | {v:,.1f} |" for k, v in rows.items()
+              if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    return "\n".join(lines)
+
+
+class FakeADE:
+    """`landingai_ade.LandingAIADE` stand-in: parse → seeded markdown/chunks, extract → seeded fields."""
+
+    def __init__(self, seed_path: Optional[str] = None):
+        self.seed = load_seed(seed_path or settings.FAKE_SEED_PATH)
+
+    def _pages(self, path: Path) -> int:
+        try:
+            from ..agents.shards import pdf_page_count
+            return max(1, pdf_page_count(path))
+        except Exception:
+            return settings.FAKE_ADE_PAGES
+
+    def parse(self, document_url: Optional[str] = None, document: Any = None, model: Optional[str] = None,
+              **_: Any) -> SimpleNamespace:
+        path = Path(document_url or document)
+        n = int(hashlib.sha256(path.read_bytes()).hexdigest()[:8], 16)
+        pages = self._pages(path)
+        _sleep(settings.FAKE_ADE_LATENCY_MS, settings.FAKE_ADE_MS_PER_PAGE, pages)
+        doc = _variant(self.seed, n)
+        sec = doc.get("sections") or {}
+        head = [f"<!-- fake-doc: {n} -->\n# {doc['company']['name']} Form 10-K",
+                sec.get("business_overview") or "", sec.get("mdna") or ""]
+        head += list(sec.get("risk_factors") or [])
+        head += [_table(name.replace("_", " ").title(), rows or {})
+                 for name, rows in (doc.get("financials") or {}).items()]
+        rnd = random.Random(n)
+        per_page = max(1, settings.FAKE_ADE_CHUNKS_PER_PAGE)
+        chunks: List[Dict[str, Any]] = []
+        for i in range(pages * per_page):
+            page, slot = divmod(i, per_page)
+            if i < len(head):
+                text = head[i]
+            else:
+                text = " ".join(rnd.choice(_FILLER) for _ in range(max(1, settings.FAKE_ADE_CHUNK_CHARS // 7)))
+            top = slot / per_page
+            chunks.append({"id": f"c{i}", "type": "table" if text.startswith("|") else "text",
+                           "markdown": text,
+                           "grounding": {"page": page, "box": {"left": 0.08, "top": round(top, 3), "right": 0.92,
+                                                              "bottom": round(top + 0.9 / per_page, 3)}}})
+        return SimpleNamespace(markdown="\n\n".join(c["markdown"] for c in chunks), chunks=chunks)
+
+    def extract(self, schema: Dict[str, Any], markdown: Any, model: Optional[str] = None,
+                **_: Any) -> SimpleNamespace:
+        text = Path(markdown).read_text() if isinstance(markdown, (str, Path)) and Path(markdown).exists() \
+            else str(markdown)
+        _sleep(settings.FAKE_ADE_LATENCY_MS, settings.FAKE_ADE_MS_PER_PAGE, len(text) / 3000)
+        m = _MARKER.search(text)
+        return SimpleNamespace(extraction=_project(_variant(self.seed, int(m.group(1)) if m else 0), schema))
+
+    def close(self) -> None:
+        pass
+
+
+def _reply(messages: List[Dict[str, Any]], response_format: Optional[Dict[str, Any]]) -> str:
+    """Plausible content for each prompt the engines send, recognised by its system message."""
+    system = str(messages[0].get("content") or "") if messages else ""
+    user = str(messages[-1].get("content") or "") if messages else ""
+    if "Extract a concise set of entities" in system:
+        names = list(dict.fromkeys(_NAME.findall(user)))[:12] or ["Company"]
+        nodes = [{"id": "n0", "label": names[0], "type": "Company"}]
+        nodes += [{"id": f"n{i}", "label": name, "type": _KG_TYPES[i % len(_KG_TYPES)]}
+                  for i, name in enumerate(names[1:], 1)]
+        edges = [{"source": "n0", "target": n["id"], "label": "related to"} for n in nodes[1:]]
+        return json.dumps({"nodes": nodes, "edges": edges})
+    if "For EACH pillar" in system:
+        items = json.loads(user)
+        return json.dumps({it["pillar"]: f"{it['pillar']} scored {it['score']}; led by "
+                           f"{', '.join(it['ratios'][:2]) or 'no ratios'}." for it in items})
+    if "For EACH tag" in system:
+        items = json.loads(user)
+        return json.dumps({it["tag"]: {"title": it["tag"].replace("_", " ").title(),
+                                       "why_it_matters": (it["paragraphs"] or [""])[0][:200]} for it in items})
+    if "extracting risk factors" in system:
+        return json.dumps([{"tag": "LIQUIDITY", "title": "Liquidity", "why_it_matters": user[:200], "pages": []}])
+    words = re.findall(r"[A-Za-z][A-Za-z\-']+", user) or ["ok"]
+    n = max(1, settings.FAKE_LLM_COMPLETION_TOKENS)
+    body = " ".join(words[i % len(words)] for i in range(n))
+    if "bullet" in system:
+        step = max(1, n // 4)
+        return "\n".join("- " + " ".join(body.split()[i * step:(i + 1) * step][:20]) for i in range(4))
+    if response_format and response_format.get("type") == "json_object":
+        return json.dumps({"answer": body})
+    return body
+
+
+def _usage(messages: List[Dict[str, Any]], content: str) -> SimpleNamespace:
+    prompt = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion = max(1, len(content) // 4)
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+
+class _Stream:
+    def __init__(self, content: str, usage: SimpleNamespace):
+        self._content, self._usage, self._closed = content, usage, False
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        _sleep(settings.FAKE_LLM_LATENCY_MS)
+        pieces = re.findall(r"\S+\s*", self._content) or [self._content]
+        for i in range(0, len(pieces), 4):
+            if self._closed:
+                return
+            delta = "".join(pieces[i:i + 4])
+            _sleep(0, settings.FAKE_LLM_MS_PER_TOKEN, max(1, len(delta) // 4))
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+        yield SimpleNamespace(usage=self._usage, choices=[])
+
+    def close(self) -> None:
+        self._closed = True
+
+
+class _Completions:
+    def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False,
+               response_format: Optional[Dict[str, Any]] = None, **_: Any) -> Any:
+        content = _reply(messages, response_format)
+        usage = _usage(messages, content)
+        if stream:
+            return _Stream(content, usage)
+        _sleep(settings.FAKE_LLM_LATENCY_MS, settings.FAKE_LLM_MS_PER_TOKEN, usage.completion_tokens)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(
+            finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))])
+
+
+class FakeOpenAI:
+    """`openai.OpenAI` stand-in for chat.completions.create (plain and streaming)."""
+
+    def __init__(self) -> None:
+        self.chat = SimpleNamespace(completions=_Completions())
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,143 @@
+# credilens/services/llm.py
+"""
+Single entry point for chat completions. Engines and routes call `chat_completion`
+instead of building their own OpenAI client, so cross-cutting behaviour (response
+caching, pooled clients, rate limiting and retries) lives in one place.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from openai import OpenAI
+
+from config import settings
+from .clients import get_openai
+from .llm_cache import LLMCache, llm_cache_key
+from .ratelimit import estimate_tokens, governed_call
+from .tracing import estimate_cost, record, span
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(Path(settings.STORAGE_DIR) / "cache" / "llm.sqlite3",
+                              ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                              max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+
+def _client() -> OpenAI:
+    return get_openai()
+
+
+def chat_completion(messages: List[Dict[str, Any]], model: Optional[str] = None,
+                    temperature: Optional[float] = 0.2, use_cache: bool = True,
+                    **params: Any) -> str:
+    """
+    Return the assistant text for `messages`, served from the LLM cache when the same
+    model/messages/temperature/params were answered before.
+
+    `use_cache=False` (or LLM_CACHE_ENABLED=false) bypasses lookup and store.
+    Extra `params` (e.g. response_format) are forwarded to the API and part of the key.
+    """
+    model = model or settings.OPENAI_MODEL
+    caching = use_cache and settings.LLM_CACHE_ENABLED
+    key = llm_cache_key(model, messages, temperature, **params) if caching else None
+    with span("openai.chat", kind="call", model=model) as sp:
+        if caching:
+            hit = get_llm_cache().get(key)
+            if hit is not None:
+                sp.set(cache="hit")
+                return hit
+
+        t0 = time.perf_counter()
+        resp = governed_call(
+            "openai", model,
+            lambda: _client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **params
+            ),
+            est_tokens=estimate_tokens(messages),
+            usage_tokens=lambda r: getattr(getattr(r, "usage", None), "total_tokens", None),
+        )
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            prompt, completion = usage.prompt_tokens or 0, usage.completion_tokens or 0
+            sp.set(prompt_tokens=prompt, completion_tokens=completion,
+                   cost_usd=round(estimate_cost(model, prompt, completion), 6))
+    text = (resp.choices[0].message.content or "").strip()
+
+    if caching and text:
+        get_llm_cache().put(key, model, text, latency_ms=latency_ms,
+                            tokens=getattr(usage, "total_tokens", 0) if usage else 0)
+    return text
+
+
+def chat_completion_stream(messages: List[Dict[str, Any]], model: Optional[str] = None,
+                           temperature: Optional[float] = 0.2, use_cache: bool = True,
+                           **params: Any) -> Iterator[str]:
+    """
+    Streaming `chat_completion`: yields text deltas as the API produces them. A cache hit
+    is yielded as a single delta. Closing the generator early (client disconnect) closes
+    the upstream HTTP stream, and the partial answer is not cached.
+    """
+    model = model or settings.OPENAI_MODEL
+    caching = use_cache and settings.LLM_CACHE_ENABLED
+    key = llm_cache_key(model, messages, temperature, **params) if caching else None
+    if caching:
+        hit = get_llm_cache().get(key)
+        if hit is not None:
+            record("openai.chat_stream", "call", 0.0, model=model, cache="hit")
+            yield hit
+            return
+
+    t0 = time.perf_counter()
+    parts: List[str] = []
+    tokens = 0
+    usage = None
+    stream = None
+    err = None
+    try:
+        # Only opening the stream is governed/retried; a failure mid-answer surfaces to the caller.
+        stream = governed_call(
+            "openai", model,
+            lambda: _client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=True,
+                stream_options={"include_usage": True}, **params
+            ),
+            est_tokens=estimate_tokens(messages),
+        )
+        for event in stream:
+            if getattr(event, "usage", None):
+                usage = event.usage
+                tokens = event.usage.total_tokens or 0
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    except BaseException as e:  # includes GeneratorExit when the client disconnects
+        err = type(e).__name__
+        raise
+    finally:
+        if stream is not None:
+            stream.close()
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        attrs = {"error": err} if err else {}
+        record("openai.chat_stream", "call", (time.perf_counter() - t0) * 1000.0, model=model,
+               prompt_tokens=prompt, completion_tokens=completion,
+               cost_usd=round(estimate_cost(model, prompt, completion), 6), **attrs)
+
+    text = "".join(parts).strip()
+    if caching and text:
+        get_llm_cache().put(key, model, text, latency_ms=(time.perf_counter() - t0) * 1000.0,
+                            tokens=tokens)
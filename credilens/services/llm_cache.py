@@ -0,0 +1,151 @@
+# credilens/services/llm_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    latency_ms  REAL NOT NULL DEFAULT 0,
+    tokens      INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+CREATE INDEX IF NOT EXISTS responses_created_at ON responses(created_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def llm_cache_key(model: str, messages: List[Dict[str, Any]], temperature: Optional[float],
+                  **params: Any) -> str:
+    """Stable key over model, messages, temperature and any output-shaping params (e.g. response_format)."""
+    blob = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "params": params},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed memo of chat completion texts with TTL and LRU size eviction.
+
+    Every stored row remembers the latency and token count of the original call, so
+    `stats()` can report what the hits saved, not just how many there were.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: int, max_bytes: int):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = int(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    @staticmethod
+    def _bump(con: sqlite3.Connection, name: str, n: float = 1) -> None:
+        con.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, n),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT response, latency_ms, tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl_seconds > 0 and now - row[3] > self.ttl_seconds:
+                con.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump(con, "expired")
+                row = None
+            if row is None:
+                self._bump(con, "misses")
+                return None
+            con.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(con, "hits")
+            self._bump(con, "saved_ms", row[1])
+            self._bump(con, "saved_tokens", row[2])
+        return row[0]
+
+    def put(self, key: str, model: str, response: str, latency_ms: float = 0.0, tokens: int = 0) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, latency_ms, tokens, created_at, last_access) "
+                "VALUES (?,?,?,?,?,?,?,?)",
+                (key, model, response, size, float(latency_ms), int(tokens or 0), now, now),
+            )
+            self._bump(con, "stores")
+            self._evict(con, now)
+
+    def _evict(self, con: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds > 0:
+            cur = con.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            if cur.rowcount:
+                self._bump(con, "expired", cur.rowcount)
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in con.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            con.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        if evicted:
+            self._bump(con, "evictions", evicted)
+
+    def clear(self) -> None:
+        with self._connect() as con:
+            con.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as con:
+            c = dict(con.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        hits, misses = int(c.get("hits", 0)), int(c.get("misses", 0))
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "stores": int(c.get("stores", 0)),
+            "evictions": int(c.get("evictions", 0)),
+            "expired": int(c.get("expired", 0)),
+            "saved_seconds": round(c.get("saved_ms", 0.0) / 1000.0, 3),
+            "saved_tokens": int(c.get("saved_tokens", 0)),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,322 @@
+# credilens/services/ratelimit.py
+"""
+Outbound call governor for OpenAI and ADE.
+
+Every call goes through `governed_call(service, model, fn)`, which
+
+1. reserves one request (and an estimated token count) from per-(service, model)
+   token buckets kept in SQLite, so all worker processes on the host share the quota;
+2. holds a per-(service, model) concurrency slot for the duration of the call, leased in
+   the same SQLite file so the cap holds across processes (a dead process's lease expires);
+3. retries 429 / 408 / 409 / 5xx / connection errors with jittered exponential backoff,
+   sleeping at least as long as the server's Retry-After;
+4. records how long the call queued (bucket wait + slot wait + backoff) per key.
+
+Limits come from settings (LLM_RPM/LLM_TPM/LLM_MAX_CONCURRENCY, ADE_RPM/ADE_MAX_CONCURRENCY)
+with per-model overrides in RATE_LIMITS, e.g. `{"openai:gpt-5": {"rpm": 500, "tpm": 400000}}`.
+"""
+from __future__ import annotations
+
+import email.utils
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+import landingai_ade
+import openai
+
+from config import settings
+from .tracing import annotate
+
+log = logging.getLogger(__name__)
+T = TypeVar("T")
+
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRY_TYPES = (openai.APIConnectionError, landingai_ade.APIConnectionError)  # timeouts subclass these
+
+
+class TokenBuckets:
+    """
+    Token buckets in a SQLite table, refilled continuously at `per_minute / 60` per second
+    up to `per_minute`. `reserve` always deducts (the balance may go negative) and returns
+    how long the caller must wait for its share, so concurrent callers queue in arrival
+    order instead of polling.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                        "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    def reserve(self, name: str, cost: float, per_minute: float) -> float:
+        if per_minute <= 0 or cost <= 0:
+            return 0.0
+        rate = per_minute / 60.0
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = con.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * rate)
+                tokens -= cost
+                con.execute("INSERT INTO buckets (name, tokens, updated) VALUES (?,?,?) "
+                            "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                            (name, tokens, now))
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        return max(0.0, -tokens / rate)
+
+    def adjust(self, name: str, delta: float) -> None:
+        """Credit (+) or charge (-) a bucket, e.g. once actual token usage is known."""
+        if delta:
+            with self._connect() as con:
+                con.execute("UPDATE buckets SET tokens = tokens + ? WHERE name = ?", (delta, name))
+
+
+class SharedSlots:
+    """
+    Concurrency slots as leased rows in a SQLite table: at most `size` unexpired leases per
+    name across every process using the file. Leases expire after `lease_seconds`, so slots
+    held by a process that died mid-call come back without cleanup.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS slots ("
+                        "id TEXT PRIMARY KEY, name TEXT NOT NULL, expires REAL NOT NULL)")
+            con.execute("CREATE INDEX IF NOT EXISTS slots_name ON slots (name, expires)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    def try_acquire(self, name: str, size: int, lease_seconds: float) -> Optional[str]:
+        """A lease id, or None if `size` leases on `name` are already held."""
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                con.execute("DELETE FROM slots WHERE name = ? AND expires < ?", (name, now))
+                held = con.execute("SELECT COUNT(*) FROM slots WHERE name = ?", (name,)).fetchone()[0]
+                lease = None
+                if held < size:
+                    lease = uuid.uuid4().hex
+                    con.execute("INSERT INTO slots (id, name, expires) VALUES (?,?,?)",
+                                (lease, name, now + lease_seconds))
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        return lease
+
+    def acquire(self, name: str, size: int, lease_seconds: float) -> str:
+        delay = 0.01
+        while True:
+            lease = self.try_acquire(name, size, lease_seconds)
+            if lease is not None:
+                return lease
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def release(self, lease: str) -> None:
+        with self._connect() as con:
+            con.execute("DELETE FROM slots WHERE id = ?", (lease,))
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0          # 429 responses
+    wait_s_total: float = 0.0
+    wait_s_max: float = 0.0
+    wait_s_last: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls, "retries": self.retries, "throttled": self.throttled,
+            "wait_ms_avg": round(self.wait_s_total / self.calls * 1000, 1) if self.calls else None,
+            "wait_ms_max": round(self.wait_s_max * 1000, 1),
+            "wait_ms_last": round(self.wait_s_last * 1000, 1),
+        }
+
+
+def _limits(service: str, model: str) -> Tuple[int, int, int]:
+    """(requests/min, tokens/min, max concurrent) for a service/model; 0 = unlimited."""
+    if service == "ade":
+        rpm, tpm, conc = settings.ADE_RPM, 0, settings.ADE_MAX_CONCURRENCY
+    else:
+        rpm, tpm, conc = settings.LLM_RPM, settings.LLM_TPM, settings.LLM_MAX_CONCURRENCY
+    o = settings.RATE_LIMITS.get(f"{service}:{model}") or {}
+    return int(o.get("rpm", rpm)), int(o.get("tpm", tpm)), int(o.get("concurrency", conc))
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Server-requested delay from Retry-After-Ms / Retry-After (seconds or HTTP date)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(exc: BaseException) -> bool:
+    return isinstance(exc, _RETRY_TYPES) or getattr(exc, "status_code", None) in _RETRY_STATUS
+
+
+def backoff_seconds(attempt: int, exc: BaseException) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    cap = min(settings.RATE_LIMIT_BACKOFF_MAX_SECONDS,
+              settings.RATE_LIMIT_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    ra = retry_after_seconds(exc)
+    return max(delay, ra) if ra is not None else delay
+
+
+class Governor:
+    def __init__(self, buckets: TokenBuckets, slots: Optional[SharedSlots] = None):
+        self.buckets = buckets
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, CallStats] = {}
+
+    def _slot(self, key: str, size: int) -> Optional[threading.BoundedSemaphore]:
+        if size <= 0:
+            return None
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(size)
+            return self._slots[key]
+
+    def _record(self, key: str, waited: float, retries: int, throttled: int) -> None:
+        with self._lock:
+            s = self._stats.setdefault(key, CallStats())
+            s.calls += 1
+            s.retries += retries
+            s.throttled += throttled
+            s.wait_s_total += waited
+            s.wait_s_max = max(s.wait_s_max, waited)
+            s.wait_s_last = waited
+
+    def call(self, service: str, model: str, fn: Callable[[], T], est_tokens: int = 0,
+             usage_tokens: Optional[Callable[[T], Optional[int]]] = None) -> T:
+        key = f"{service}:{model}"
+        rpm, tpm, conc = _limits(service, model)
+        slot = self._slot(key, conc)
+        waited, retries, throttled = 0.0, 0, 0
+        attempt = 0
+        while True:
+            wait = self.buckets.reserve(f"{key}:req", 1, rpm)
+            if tpm and est_tokens:
+                wait = max(wait, self.buckets.reserve(f"{key}:tok", est_tokens, tpm))
+            if wait:
+                time.sleep(wait)
+            t0 = time.perf_counter()
+            lease = None
+            if slot is not None:
+                slot.acquire()  # this process's threads queue locally before polling SQLite
+                if self.slots is not None:
+                    try:
+                        lease = self.slots.acquire(key, conc, settings.RATE_LIMIT_SLOT_LEASE_SECONDS)
+                    except BaseException:
+                        slot.release()
+                        raise
+            waited += wait + (time.perf_counter() - t0)
+            try:
+                result = fn()
+            except Exception as e:
+                if tpm and est_tokens:
+                    self.buckets.adjust(f"{key}:tok", est_tokens)  # nothing was consumed
+                if attempt >= settings.RATE_LIMIT_MAX_RETRIES or not _retryable(e):
+                    self._record(key, waited, retries, throttled)
+                    annotate(queued_ms=round(waited * 1000, 1), retries=retries)
+                    raise
+                throttled += getattr(e, "status_code", None) == 429
+                delay = backoff_seconds(attempt, e)
+                log.warning("%s: %s, retry %d in %.2fs", key, type(e).__name__, attempt + 1, delay)
+                attempt += 1
+                retries += 1
+            else:
+                if tpm and est_tokens and usage_tokens is not None:
+                    used = usage_tokens(result)
+                    if used:
+                        self.buckets.adjust(f"{key}:tok", est_tokens - used)
+                self._record(key, waited, retries, throttled)
+                annotate(queued_ms=round(waited * 1000, 1), retries=retries)
+                log.debug("%s: queued %.1f ms, %d retries", key, waited * 1000, retries)
+                return result
+            finally:
+                if lease is not None:
+                    self.slots.release(lease)
+                if slot is not None:
+                    slot.release()
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: s.as_dict() for k, s in self._stats.items()}
+
+
+_governor: Optional[Governor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> Governor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            db = Path(settings.STORAGE_DIR) / "ratelimit.sqlite3"
+            _governor = Governor(TokenBuckets(db), SharedSlots(db))
+    return _governor
+
+
+def governed_call(service: str, model: str, fn: Callable[[], T], est_tokens: int = 0,
+                  usage_tokens: Optional[Callable[[T], Optional[int]]] = None) -> T:
+    """Run `fn` under the shared limits for `service` ("openai" / "ade") and `model`."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return fn()
+    return get_governor().call(service, model, fn, est_tokens=est_tokens, usage_tokens=usage_tokens)
+
+
+def estimate_tokens(messages: Any, completion_tokens: int = 1024) -> int:
+    """Rough pre-call token estimate (~4 chars/token for the prompt plus a completion budget)."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages) if isinstance(messages, list) else len(str(messages))
+    return chars // 4 + completion_tokens
@@ -0,0 +1,267 @@
+# credilens/services/tracing.py
+"""
+Structured timing spans and process-wide Prometheus metrics.
+
+    with trace(doc_id) as tr:                      # per-document collector (None if disabled)
+        with span("ade.parse", kind="call", model=m) as sp:
+            ...
+            sp.set(pages=80, cost_usd=0.0)
+    save_json(tr.to_dict(), out_dir / "timings.json")
+
+Spans nest through contextvars, so a call span knows the stage it ran under; work handed
+to a thread pool keeps its parent via `propagate(fn)`. Every finished span also feeds the
+in-process histograms/counters rendered by `render_metrics()` (the app's /metrics route;
+each worker process exposes its own).
+
+With TRACING_ENABLED=false `span()` returns a shared no-op and `trace()` yields None, so
+the instrumented paths cost one settings lookup per span.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+_trace: ContextVar[Optional["Trace"]] = ContextVar("credilens_trace", default=None)
+_span: ContextVar[Optional["Span"]] = ContextVar("credilens_span", default=None)
+
+
+def estimate_cost(model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> float:
+    """USD for one call from LLM_PRICES (per 1M tokens; exact model, else longest prefix)."""
+    prices = settings.LLM_PRICES.get(model)
+    if prices is None:
+        prefixes = [m for m in settings.LLM_PRICES if model.startswith(m)]
+        prices = settings.LLM_PRICES[max(prefixes, key=len)] if prefixes else {}
+    return (prompt_tokens * prices.get("prompt", 0.0) + completion_tokens * prices.get("completion", 0.0)) / 1e6
+
+
+# ---- metrics ----
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_HELP = {
+    "credilens_span_duration_seconds": ("histogram", "Duration of pipeline phases, stages and outbound calls."),
+    "credilens_calls_total": ("counter", "Outbound ADE/OpenAI calls by outcome (ok, error, cache_hit)."),
+    "credilens_llm_tokens_total": ("counter", "LLM tokens by model and type (prompt, completion)."),
+    "credilens_estimated_cost_usd_total": ("counter", "Estimated spend from LLM_PRICES / ADE_COST_PER_PAGE."),
+}
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hist: Dict[Tuple[str, Labels], List[float]] = {}   # bucket counts..., sum, count
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            h = self._hist.get((name, labels))
+            if h is None:
+                h = self._hist[(name, labels)] = [0.0] * (len(_BUCKETS) + 2)
+            for i, b in enumerate(_BUCKETS):
+                if value <= b:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0.0) + value
+
+    @staticmethod
+    def _fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ""
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> str:
+        with self._lock:
+            hist = {k: list(v) for k, v in self._hist.items()}
+            counters = dict(self._counters)
+        lines: List[str] = []
+        for name, (kind, text) in _HELP.items():
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            if kind == "histogram":
+                for (n, labels), h in sorted(hist.items()):
+                    if n != name:
+                        continue
+                    for b, c in zip(_BUCKETS, h):
+                        lines.append(f"{name}_bucket{self._fmt(labels, (('le', repr(b)),))} {c:g}")
+                    lines.append(f"{name}_bucket{self._fmt(labels, (('le', '+Inf'),))} {h[-1]:g}")
+                    lines.append(f"{name}_sum{self._fmt(labels)} {h[-2]:.6f}")
+                    lines.append(f"{name}_count{self._fmt(labels)} {h[-1]:g}")
+            else:
+                for (n, labels), v in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{self._fmt(labels)} {v:g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format (version 0.0.4) of this process's metrics."""
+    return METRICS.render()
+
+
+# ---- spans ----
+
+class Span:
+    __slots__ = ("name", "kind", "attrs", "stage", "parent", "trace", "start", "ms", "_token")
+
+    def __init__(self, name: str, kind: str, attrs: Dict[str, Any]):
+        self.name, self.kind, self.attrs = name, kind, attrs
+        self.ms = 0.0
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _span.get()
+        self.parent = parent.name if parent else None
+        self.stage = self.name if self.kind == "stage" else (parent.stage if parent else None)
+        self.trace = _trace.get()
+        self._token = _span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.ms = (time.perf_counter() - self.start) * 1000.0
+        _span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _finish(self)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, kind: str = "span", **attrs: Any):
+    """Time a block; kinds used: pipeline, phase, stage, call."""
+    if not settings.TRACING_ENABLED:
+        return _NOOP
+    return Span(name, kind, attrs)
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes to the innermost open span, if any (e.g. retries from the rate limiter)."""
+    sp = _span.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
+
+
+def record(name: str, kind: str, ms: float, **attrs: Any) -> None:
+    """A span timed by the caller (streams, whose body outlives any `with` block)."""
+    if not settings.TRACING_ENABLED:
+        return
+    sp = Span(name, kind, attrs)
+    parent = _span.get()
+    sp.parent = parent.name if parent else None
+    sp.stage = parent.stage if parent else None
+    sp.trace = _trace.get()
+    sp.start = time.perf_counter() - ms / 1000.0
+    sp.ms = ms
+    _finish(sp)
+
+
+def _finish(sp: Span) -> None:
+    a = sp.attrs
+    METRICS.observe("credilens_span_duration_seconds", (("kind", sp.kind), ("name", sp.name)), sp.ms / 1000.0)
+    if sp.kind == "call":
+        outcome = "error" if "error" in a else ("cache_hit" if a.get("cache") == "hit" else "ok")
+        METRICS.inc("credilens_calls_total", (("name", sp.name), ("outcome", outcome)))
+        model = str(a.get("model") or "")
+        for t in ("prompt", "completion"):
+            if a.get(f"{t}_tokens"):
+                METRICS.inc("credilens_llm_tokens_total", (("model", model), ("type", t)), a[f"{t}_tokens"])
+        if a.get("cost_usd"):
+            METRICS.inc("credilens_estimated_cost_usd_total",
+                        (("service", sp.name.split(".", 1)[0]), ("model", model)), a["cost_usd"])
+    if sp.trace is not None:
+        sp.trace.add(sp)
+
+
+def propagate(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """`fn` bound to the caller's trace/span context, for thread-pool submission."""
+    if not settings.TRACING_ENABLED:
+        return fn
+    ctx = copy_context()
+    return lambda *a, **kw: ctx.copy().run(fn, *a, **kw)
+
+
+# ---- per-document trace ----
+
+class Trace:
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, sp: Span) -> None:
+        row = {"name": sp.name, "kind": sp.kind, "stage": sp.stage, "parent": sp.parent,
+               "start_ms": round((sp.start - self._t0) * 1000.0, 1), "ms": round(sp.ms, 1)}
+        row.update(sp.attrs)
+        with self._lock:
+            self.spans.append(row)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """timings.json: every span in start order plus per-stage and per-call rollups."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        calls = [s for s in spans if s["kind"] == "call"]
+        totals = {"calls": len(calls),
+                  "cache_hits": sum(1 for s in calls if s.get("cache") == "hit"),
+                  "errors": sum(1 for s in calls if "error" in s),
+                  "prompt_tokens": sum(s.get("prompt_tokens") or 0 for s in calls),
+                  "completion_tokens": sum(s.get("completion_tokens") or 0 for s in calls),
+                  "cost_usd": round(sum(s.get("cost_usd") or 0.0 for s in calls), 6)}
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        for s in spans:
+            if s["kind"] in ("phase", "stage"):
+                by_stage.setdefault(s["name"], {"ms": 0.0, "calls": 0, "call_ms": 0.0, "tokens": 0, "cost_usd": 0.0})
+                by_stage[s["name"]]["ms"] = round(by_stage[s["name"]]["ms"] + s["ms"], 1)
+        for s in calls:
+            key = s["stage"] or s["parent"] or "-"
+            agg = by_stage.setdefault(key, {"ms": 0.0, "calls": 0, "call_ms": 0.0, "tokens": 0, "cost_usd": 0.0})
+            agg["calls"] += 1
+            agg["call_ms"] = round(agg["call_ms"] + s["ms"], 1)
+            agg["tokens"] += (s.get("prompt_tokens") or 0) + (s.get("completion_tokens") or 0)
+            agg["cost_usd"] = round(agg["cost_usd"] + (s.get("cost_usd") or 0.0), 6)
+        total_ms = max((s["start_ms"] + s["ms"] for s in spans), default=0.0)
+        return {"doc_id": self.doc_id, "started_at": self.started_at, "total_ms": round(total_ms, 1),
+                "totals": totals, "by_stage": by_stage, "spans": spans}
+
+
+@contextmanager
+def trace(doc_id: str) -> Iterator[Optional[Trace]]:
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    tr = Trace(doc_id)
+    token = _trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _trace.reset(token)
@@ -0,0 +1,107 @@
+# credilens/store/artifacts.py
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_MISSING = object()
+_MISSING_SIZE = 256  # nominal footprint so negative entries are bounded too
+
+
+class ArtifactCache:
+    """
+    Bounded in-memory LRU of parsed JSON artifacts under `<outputs>/<doc_id>/`.
+
+    An entry is trusted without touching the disk for `revalidate_seconds`; after that a
+    single stat() compares mtime/size and re-reads only if the file changed. `invalidate`
+    drops a document immediately (called when its pipeline finishes). Memory is bounded
+    by the on-disk size of cached files, a close proxy for their parsed footprint.
+
+    Returned objects are shared between requests: treat them as read-only.
+    """
+
+    def __init__(self, outputs: Path, max_bytes: int, revalidate_seconds: float = 5.0):
+        self.outputs = Path(outputs)
+        self.max_bytes = int(max_bytes)
+        self.revalidate_seconds = float(revalidate_seconds)
+        self._lock = threading.Lock()
+        # (doc_id, name) → (value, stamp, size, checked_at)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Optional[Tuple[int, int]], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, doc_id: str, name: str, default: Any = None) -> Any:
+        key = (doc_id, name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[3] < self.revalidate_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return default if entry[0] is _MISSING else entry[0]
+
+        path = self.outputs / doc_id / name
+        stamp = self._stamp(path)
+        if entry is not None and entry[1] == stamp:
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key] = (entry[0], stamp, entry[2], now)
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return default if entry[0] is _MISSING else entry[0]
+
+        value: Any = _MISSING
+        size = _MISSING_SIZE
+        if stamp is not None:
+            try:
+                value = json.loads(path.read_text())
+                size = stamp[1]
+            except (OSError, ValueError):
+                value, stamp, size = _MISSING, None, _MISSING_SIZE
+        with self._lock:
+            self.misses += 1
+            self._put(key, value, stamp, size, now)
+        return default if value is _MISSING else value
+
+    def _put(self, key, value, stamp, size, now) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, stamp, size, now)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, sz, _) = self._entries.popitem(last=False)
+            self._bytes -= sz
+            self.evictions += 1
+
+    def invalidate(self, doc_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == doc_id]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
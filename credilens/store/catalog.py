@@ -0,0 +1,178 @@
+# credilens/store/catalog.py
+"""
+SQLite catalog of processed documents, so listing and lookups don't scan data/outputs.
+
+    cat = Catalog(Path("data/catalog.sqlite3"))
+    cat.upsert("1762750644-40cb22", company={"name": "Acme", "ticker": "ACME"}, final_score=71.2)
+    cat.recent(limit=10, offset=0)
+    cat.search("acm")
+
+Backfill existing outputs once:
+
+    python -m credilens.store.catalog --outputs data/outputs --db data/catalog.sqlite3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+PROCESSING, READY, FAILED = "processing", "ready", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id       TEXT PRIMARY KEY,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    status       TEXT NOT NULL,
+    company_name TEXT,
+    company_norm TEXT,
+    ticker       TEXT,
+    final_score  REAL
+);
+CREATE INDEX IF NOT EXISTS documents_created ON documents(created_at DESC);
+CREATE INDEX IF NOT EXISTS documents_company ON documents(company_norm);
+CREATE INDEX IF NOT EXISTS documents_ticker ON documents(ticker);
+CREATE INDEX IF NOT EXISTS documents_score ON documents(final_score);
+"""
+
+_UPSERT = (
+    "INSERT INTO documents (doc_id, created_at, updated_at, status, company_name, company_norm, "
+    "ticker, final_score) VALUES (?,?,?,?,?,?,?,?) "
+    "ON CONFLICT(doc_id) DO UPDATE SET "
+    "updated_at = excluded.updated_at, status = excluded.status, "
+    "company_name = COALESCE(excluded.company_name, company_name), "
+    "company_norm = COALESCE(excluded.company_norm, company_norm), "
+    "ticker = COALESCE(excluded.ticker, ticker), "
+    "final_score = COALESCE(excluded.final_score, final_score)"
+)
+
+_COLUMNS = "doc_id, created_at, updated_at, status, company_name, ticker, final_score"
+
+
+def _norm(name: Optional[str]) -> Optional[str]:
+    return " ".join(name.lower().split()) if name else None
+
+
+def created_from_doc_id(doc_id: str) -> Optional[float]:
+    """doc_ids are '<unix seconds>-<hex>'; returns the timestamp part when present."""
+    head = doc_id.split("-", 1)[0]
+    return float(head) if head.isdigit() else None
+
+
+class Catalog:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    @staticmethod
+    def _params(doc_id: str, status: str, company: Optional[Mapping[str, Any]],
+                final_score: Optional[float], created_at: Optional[float]) -> tuple:
+        company = company or {}
+        now = time.time()
+        name = company.get("name")
+        return (doc_id, created_at or created_from_doc_id(doc_id) or now, now, status, name, _norm(name),
+                (company.get("ticker") or "").upper() or None, final_score)
+
+    def upsert(self, doc_id: str, *, status: str = READY, company: Optional[Mapping[str, Any]] = None,
+               final_score: Optional[float] = None, created_at: Optional[float] = None) -> None:
+        """Insert or update one document; fields left as None keep their stored value."""
+        with self._connect() as con:
+            con.execute(_UPSERT, self._params(doc_id, status, company, final_score, created_at))
+
+    def upsert_many(self, docs: Iterable[Mapping[str, Any]]) -> int:
+        """Bulk `upsert` in one transaction; each item holds doc_id plus upsert's keyword fields."""
+        params = [self._params(d["doc_id"], d.get("status", READY), d.get("company"),
+                               d.get("final_score"), d.get("created_at")) for d in docs]
+        with self._connect() as con:
+            con.execute("BEGIN")
+            con.executemany(_UPSERT, params)
+            con.execute("COMMIT")
+        return len(params)
+
+    def set_status(self, doc_id: str, status: str) -> None:
+        self.upsert(doc_id, status=status)
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            row = con.execute(f"SELECT {_COLUMNS} FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def recent(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._connect() as con:
+            rows = con.execute(
+                f"SELECT {_COLUMNS} FROM documents ORDER BY created_at DESC, doc_id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def search(self, q: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Company-name prefix match or exact ticker, newest first. Both are index range scans."""
+        qn = _norm(q) or ""
+        if not qn:
+            return self.recent(limit, offset)
+        with self._connect() as con:
+            rows = con.execute(
+                f"SELECT {_COLUMNS} FROM documents WHERE company_norm >= ? AND company_norm < ? "
+                f"UNION SELECT {_COLUMNS} FROM documents WHERE ticker = ? "
+                "ORDER BY created_at DESC, doc_id DESC LIMIT ? OFFSET ?",
+                (qn, qn + "\uffff", q.strip().upper(), limit, offset),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def backfill(self, outputs: Path) -> int:
+        """Index every <doc_id>/ under `outputs` from its index.json/score.json. Returns rows written."""
+        rows = []
+        for ddir in sorted(p for p in Path(outputs).iterdir() if p.is_dir()):
+            meta = _read_json(ddir / "index.json") or {}
+            company = meta.get("company") or (_read_json(ddir / "parsed_extracted10k.json") or {}).get("company")
+            score = _read_json(ddir / "score.json") or {}
+            rows.append({
+                "doc_id": ddir.name,
+                "status": READY if (ddir / "parsed_extracted10k.json").exists() else FAILED,
+                "company": company,
+                "final_score": score.get("final_score"),
+                "created_at": created_from_doc_id(ddir.name) or ddir.stat().st_mtime,
+            })
+        return self.upsert_many(rows)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Backfill the document catalog from processed outputs.")
+    ap.add_argument("--outputs", type=Path, default=Path("data/outputs"))
+    ap.add_argument("--db", type=Path, default=Path("data/catalog.sqlite3"))
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    n = Catalog(args.db).backfill(args.outputs)
+    print(f"indexed {n} documents into {args.db} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# credilens/store/kg_store.py
+"""
+Portfolio-wide knowledge graph in SQLite: every document's `build_kg` output is merged
+into shared entity / mention / edge tables, with entities resolved by normalised label
+and type, so cross-borrower questions are index lookups.
+
+    store = KGStore(Path("data/kg.sqlite3"))
+    store.ingest("1762750644-40cb22", kg)              # replaces that document's graph
+    store.shared_entities(types=["Auditor"])           # auditors used by 2+ borrowers
+    store.documents_sharing("1762750644-40cb22")       # borrowers with common entities
+    store.neighbors(store.resolve("Deloitte LLP", "Auditor")[0]["id"])
+
+Ingest existing outputs (documents whose kg.json is unchanged are skipped):
+
+    python -m credilens.store.kg_store --outputs data/outputs --db data/kg.sqlite3
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id    INTEGER PRIMARY KEY,
+    type  TEXT NOT NULL,
+    norm  TEXT NOT NULL,
+    label TEXT NOT NULL,
+    UNIQUE (type, norm)
+);
+CREATE INDEX IF NOT EXISTS entities_norm ON entities(norm);
+CREATE INDEX IF NOT EXISTS entities_type ON entities(type);
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      TEXT PRIMARY KEY,
+    kg_hash     TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mentions (
+    doc_id    TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    local_id  TEXT,
+    PRIMARY KEY (doc_id, entity_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS mentions_entity ON mentions(entity_id, doc_id);
+CREATE TABLE IF NOT EXISTS edges (
+    doc_id TEXT NOT NULL,
+    src    INTEGER NOT NULL,
+    dst    INTEGER NOT NULL,
+    label  TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (doc_id, src, dst, label)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_src ON edges(src, dst);
+CREATE INDEX IF NOT EXISTS edges_dst ON edges(dst, src);
+"""
+
+_PUNCT = re.compile(r"[^\w\s]")
+# Legal-form suffixes dropped when resolving organisations ("Deloitte & Touche LLP" == "Deloitte and Touche")
+_ORG_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "llc", "llp", "lp", "ltd",
+                 "limited", "plc", "sa", "ag", "nv", "bv", "gmbh", "holdings", "group"}
+ORG_TYPES = {"Company", "Partner", "Client", "Auditor"}
+
+
+def normalize_label(label: str, type_: Optional[str] = None) -> str:
+    """Case/punctuation/whitespace-insensitive key; organisations also lose legal-form suffixes."""
+    text = (label or "").lower().replace("&", " and ").replace(".", "")   # "L.L.P." → "llp"
+    words = _PUNCT.sub(" ", text).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    if type_ in ORG_TYPES:
+        while len(words) > 1 and words[-1] in _ORG_SUFFIXES:
+            words.pop()
+    return " ".join(words)
+
+
+def kg_hash(kg: Mapping[str, Any]) -> str:
+    # graph content only: extraction "stats" are run metadata, not part of the graph
+    graph = {"nodes": kg.get("nodes") or [], "edges": kg.get("edges") or []}
+    return hashlib.sha256(json.dumps(graph, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class KGStore:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            yield con
+        finally:
+            con.close()
+
+    # ---- ingestion ----
+
+    @staticmethod
+    def _entity_id(con: sqlite3.Connection, cache: Dict[tuple, int], type_: str, label: str) -> Optional[int]:
+        norm = normalize_label(label, type_)
+        if not norm:
+            return None
+        key = (type_, norm)
+        if key not in cache:
+            con.execute("INSERT INTO entities (type, norm, label) VALUES (?,?,?) "
+                        "ON CONFLICT(type, norm) DO NOTHING", (type_, norm, label))
+            cache[key] = con.execute("SELECT id FROM entities WHERE type = ? AND norm = ?", key).fetchone()[0]
+        return cache[key]
+
+    def _ingest(self, con: sqlite3.Connection, doc_id: str, kg: Mapping[str, Any], digest: str) -> None:
+        con.execute("DELETE FROM mentions WHERE doc_id = ?", (doc_id,))
+        con.execute("DELETE FROM edges WHERE doc_id = ?", (doc_id,))
+        cache: Dict[tuple, int] = {}
+        local: Dict[str, int] = {}
+        for n in kg.get("nodes") or []:
+            if not isinstance(n, dict) or n.get("id") is None:
+                continue
+            eid = self._entity_id(con, cache, str(n.get("type") or "Other"), str(n.get("label") or n["id"]))
+            if eid is not None:
+                local[str(n["id"])] = eid
+                con.execute("INSERT OR IGNORE INTO mentions (doc_id, entity_id, local_id) VALUES (?,?,?)",
+                            (doc_id, eid, str(n["id"])))
+        rows = [(doc_id, local[str(e.get("source"))], local[str(e.get("target"))], str(e.get("label") or ""))
+                for e in kg.get("edges") or []
+                if isinstance(e, dict) and str(e.get("source")) in local and str(e.get("target")) in local]
+        con.executemany("INSERT OR IGNORE INTO edges (doc_id, src, dst, label) VALUES (?,?,?,?)", rows)
+        con.execute("INSERT INTO documents (doc_id, kg_hash, ingested_at) VALUES (?,?,?) "
+                    "ON CONFLICT(doc_id) DO UPDATE SET kg_hash = excluded.kg_hash, ingested_at = excluded.ingested_at",
+                    (doc_id, digest, time.time()))
+
+    def ingest(self, doc_id: str, kg: Mapping[str, Any], force: bool = False) -> bool:
+        """Replace one document's graph. Returns False if the same graph was already ingested."""
+        return self.ingest_many([(doc_id, kg)], force=force) == 1
+
+    def ingest_many(self, items: Sequence[tuple], force: bool = False) -> int:
+        """Bulk `ingest` of (doc_id, kg) pairs in one transaction; returns documents (re)ingested."""
+        n = 0
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for doc_id, kg in items:
+                    digest = kg_hash(kg)
+                    row = con.execute("SELECT kg_hash FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+                    if row and row[0] == digest and not force:
+                        continue
+                    self._ingest(con, doc_id, kg, digest)
+                    n += 1
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        return n
+
+    def remove(self, doc_id: str) -> None:
+        with self._connect() as con:
+            con.execute("BEGIN")
+            for table in ("mentions", "edges", "documents"):
+                con.execute(f"DELETE FROM {table} WHERE doc_id = ?", (doc_id,))
+            con.execute("COMMIT")
+
+    # ---- queries ----
+
+    def resolve(self, label: str, type_: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entities matching `label` after normalisation (any type unless `type_` is given)."""
+        with self._connect() as con:
+            if type_:
+                rows = con.execute("SELECT id, type, label FROM entities WHERE type = ? AND norm = ?",
+                                   (type_, normalize_label(label, type_))).fetchall()
+            else:
+                norms = {normalize_label(label), normalize_label(label, "Company")}
+                rows = con.execute(f"SELECT id, type, label FROM entities WHERE norm IN ({','.join('?' * len(norms))})",
+                                   tuple(norms)).fetchall()
+        return [dict(r) for r in rows]
+
+    def entity(self, entity_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT e.id, e.type, e.label, (SELECT COUNT(*) FROM mentions m WHERE m.entity_id = e.id) AS docs "
+                "FROM entities e WHERE e.id = ?", (entity_id,)).fetchone()
+        return dict(row) if row else None
+
+    def documents_for(self, entity_id: int) -> List[str]:
+        with self._connect() as con:
+            return [r[0] for r in con.execute(
+                "SELECT doc_id FROM mentions WHERE entity_id = ? ORDER BY doc_id", (entity_id,))]
+
+    def neighbors(self, entity_id: int, doc_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Adjacent entities (either direction) with edge labels and how many documents assert them."""
+        doc_clause = " AND doc_id = ?" if doc_id else ""
+        params: List[Any] = [entity_id] + ([doc_id] if doc_id else [])
+        sql = (
+            "SELECT e.id, e.type, e.label, x.direction, x.rel, COUNT(DISTINCT x.doc_id) AS docs FROM ("
+            f" SELECT dst AS other, 'out' AS direction, label AS rel, doc_id FROM edges WHERE src = ?{doc_clause}"
+            " UNION ALL"
+            f" SELECT src, 'in', label, doc_id FROM edges WHERE dst = ?{doc_clause}"
+            ") x JOIN entities e ON e.id = x.other "
+            "GROUP BY e.id, x.direction, x.rel ORDER BY docs DESC, e.label LIMIT ?"
+        )
+        with self._connect() as con:
+            rows = con.execute(sql, (*params, *params, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+    def shared_entities(self, types: Optional[Sequence[str]] = None, min_docs: int = 2,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+        """Entities mentioned by at least `min_docs` documents, most shared first, with their doc_ids."""
+        type_clause = f"WHERE e.type IN ({','.join('?' * len(types))})" if types else ""
+        sql = (
+            "SELECT e.id, e.type, e.label, COUNT(*) AS docs, GROUP_CONCAT(m.doc_id) AS doc_ids "
+            f"FROM entities e JOIN mentions m ON m.entity_id = e.id {type_clause} "
+            "GROUP BY e.id HAVING COUNT(*) >= ? ORDER BY docs DESC, e.label LIMIT ?"
+        )
+        with self._connect() as con:
+            rows = con.execute(sql, (*(types or ()), min_docs, limit)).fetchall()
+        return [{**dict(r), "doc_ids": sorted(r["doc_ids"].split(","))} for r in rows]
+
+    def documents_sharing(self, doc_id: str, types: Optional[Sequence[str]] = None,
+                          limit: int = 50) -> List[Dict[str, Any]]:
+        """Other documents that mention any of `doc_id`'s entities, with the shared entities."""
+        type_clause = f"AND e.type IN ({','.join('?' * len(types))})" if types else ""
+        sql = (
+            "SELECT m2.doc_id, COUNT(*) AS shared, GROUP_CONCAT(e.type || ':' || e.label, '|') AS entities "
+            "FROM mentions m1 JOIN mentions m2 ON m2.entity_id = m1.entity_id AND m2.doc_id != m1.doc_id "
+            f"JOIN entities e ON e.id = m1.entity_id WHERE m1.doc_id = ? {type_clause} "
+            "GROUP BY m2.doc_id ORDER BY shared DESC, m2.doc_id LIMIT ?"
+        )
+        with self._connect() as con:
+            rows = con.execute(sql, (doc_id, *(types or ()), limit)).fetchall()
+        return [{"doc_id": r["doc_id"], "shared": r["shared"], "entities": r["entities"].split("|")} for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as con:
+            return {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                    for t in ("documents", "entities", "mentions", "edges")}
+
+    def backfill(self, outputs: Path, batch: int = 500) -> int:
+        """Ingest every <doc_id>/kg.json under `outputs`; unchanged graphs are skipped."""
+        items, n = [], 0
+        for path in sorted(Path(outputs).glob("*/kg.json")):
+            try:
+                kg = (json.loads(path.read_text()) or {}).get("kg") or {}
+            except (OSError, ValueError):
+                continue
+            items.append((path.parent.name, kg))
+            if len(items) >= batch:
+                n += self.ingest_many(items)
+                items = []
+        return n + (self.ingest_many(items) if items else 0)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Ingest processed documents' knowledge graphs into the portfolio KG store.")
+    ap.add_argument("--outputs", type=Path, default=Path("data/outputs"))
+    ap.add_argument("--db", type=Path, default=Path("data/kg.sqlite3"))
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    store = KGStore(args.db)
+    n = store.backfill(args.outputs)
+    print(f"ingested {n} documents into {args.db} in {time.perf_counter() - t0:.2f}s: {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
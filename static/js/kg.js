@@ -0,0 +1,149 @@
+/* CrediLens knowledge-graph renderer.
+ * Draws a precomputed layout ({width, height, nodes:[{id,label,type,x,y}], edges:[{source,target,label}]})
+ * on a canvas: no physics in the browser, drag to pan, wheel to zoom, hover for details.
+ * Usage: CrediLensKG.render(canvasElement, layoutObject)
+ */
+(function (global) {
+  "use strict";
+
+  var PALETTE = {
+    Company: "#2563eb", Product: "#16a34a", Segment: "#0d9488", Geography: "#9333ea",
+    Risk: "#dc2626", Partner: "#ea580c", Client: "#ca8a04", Auditor: "#475569"
+  };
+  var RADIUS = 9;
+
+  function colorFor(type) { return PALETTE[type] || "#64748b"; }
+
+  function render(canvas, layout) {
+    var ctx = canvas.getContext("2d");
+    var nodes = layout.nodes || [], edges = layout.edges || [];
+    var byId = {};
+    nodes.forEach(function (n) { byId[n.id] = n; });
+    var view = { x: 0, y: 0, k: 1 };
+    var hover = null, drag = null;
+
+    function resize() {
+      var dpr = global.devicePixelRatio || 1;
+      var w = canvas.clientWidth, h = canvas.clientHeight;
+      canvas.width = Math.round(w * dpr);
+      canvas.height = Math.round(h * dpr);
+      ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+      // fit the layout box into the canvas
+      view.k = Math.min(w / layout.width, h / layout.height);
+      view.x = (w - layout.width * view.k) / 2;
+      view.y = (h - layout.height * view.k) / 2;
+      draw();
+    }
+
+    function toScreen(n) { return [n.x * view.k + view.x, n.y * view.k + view.y]; }
+
+    function neighbours(id) {
+      var s = {};
+      edges.forEach(function (e) {
+        if (e.source === id) s[e.target] = true;
+        if (e.target === id) s[e.source] = true;
+      });
+      return s;
+    }
+
+    function arrow(x1, y1, x2, y2) {
+      var a = Math.atan2(y2 - y1, x2 - x1), r = RADIUS + 2;
+      var tx = x2 - Math.cos(a) * r, ty = y2 - Math.sin(a) * r;
+      ctx.beginPath();
+      ctx.moveTo(x1, y1);
+      ctx.lineTo(tx, ty);
+      ctx.stroke();
+      ctx.beginPath();
+      ctx.moveTo(tx, ty);
+      ctx.lineTo(tx - 8 * Math.cos(a - 0.4), ty - 8 * Math.sin(a - 0.4));
+      ctx.lineTo(tx - 8 * Math.cos(a + 0.4), ty - 8 * Math.sin(a + 0.4));
+      ctx.closePath();
+      ctx.fill();
+    }
+
+    function draw() {
+      var w = canvas.clientWidth, h = canvas.clientHeight;
+      ctx.clearRect(0, 0, w, h);
+      var near = hover ? neighbours(hover.id) : null;
+      ctx.font = "11px system-ui, sans-serif";
+      edges.forEach(function (e) {
+        var s = byId[e.source], t = byId[e.target];
+        if (!s || !t) return;
+        var lit = hover && (e.source === hover.id || e.target === hover.id);
+        ctx.globalAlpha = hover && !lit ? 0.15 : 0.8;
+        ctx.strokeStyle = ctx.fillStyle = lit ? "#111827" : "#94a3b8";
+        var a = toScreen(s), b = toScreen(t);
+        arrow(a[0], a[1], b[0], b[1]);
+        if (e.label && (lit || view.k > 1.4)) {
+          ctx.fillStyle = "#334155";
+          ctx.fillText(e.label, (a[0] + b[0]) / 2 + 4, (a[1] + b[1]) / 2 - 4);
+        }
+      });
+      ctx.font = "12px system-ui, sans-serif";
+      nodes.forEach(function (n) {
+        var p = toScreen(n);
+        var dim = hover && n !== hover && !near[n.id];
+        ctx.globalAlpha = dim ? 0.25 : 1;
+        ctx.fillStyle = colorFor(n.type);
+        ctx.beginPath();
+        ctx.arc(p[0], p[1], n === hover ? RADIUS + 3 : RADIUS, 0, 2 * Math.PI);
+        ctx.fill();
+        ctx.fillStyle = "#0f172a";
+        ctx.fillText(n.label, p[0] + RADIUS + 3, p[1] + 4);
+      });
+      ctx.globalAlpha = 1;
+      if (hover) {
+        var p = toScreen(hover), text = hover.label + " · " + (hover.type || "Other");
+        var tw = ctx.measureText(text).width + 12;
+        ctx.fillStyle = "rgba(15,23,42,.9)";
+        ctx.fillRect(p[0] - tw / 2, p[1] - RADIUS - 30, tw, 20);
+        ctx.fillStyle = "#fff";
+        ctx.fillText(text, p[0] - tw / 2 + 6, p[1] - RADIUS - 16);
+      }
+    }
+
+    function nodeAt(mx, my) {
+      for (var i = nodes.length - 1; i >= 0; i--) {
+        var p = toScreen(nodes[i]);
+        if ((p[0] - mx) * (p[0] - mx) + (p[1] - my) * (p[1] - my) <= (RADIUS + 3) * (RADIUS + 3)) return nodes[i];
+      }
+      return null;
+    }
+
+    function local(ev) {
+      var r = canvas.getBoundingClientRect();
+      return [ev.clientX - r.left, ev.clientY - r.top];
+    }
+
+    canvas.addEventListener("mousedown", function (ev) {
+      var m = local(ev);
+      drag = { x: m[0] - view.x, y: m[1] - view.y };
+    });
+    global.addEventListener("mouseup", function () { drag = null; });
+    canvas.addEventListener("mousemove", function (ev) {
+      var m = local(ev);
+      if (drag) {
+        view.x = m[0] - drag.x;
+        view.y = m[1] - drag.y;
+      } else {
+        var h = nodeAt(m[0], m[1]);
+        if (h === hover) return;
+        hover = h;
+        canvas.style.cursor = h ? "pointer" : "grab";
+      }
+      draw();
+    });
+    canvas.addEventListener("wheel", function (ev) {
+      ev.preventDefault();
+      var m = local(ev), f = ev.deltaY < 0 ? 1.15 : 1 / 1.15;
+      view.x = m[0] - (m[0] - view.x) * f;
+      view.y = m[1] - (m[1] - view.y) * f;
+      view.k *= f;
+      draw();
+    }, { passive: false });
+    global.addEventListener("resize", resize);
+    resize();
+  }
+
+  global.CrediLensKG = { render: render };
+})(window);
@@ -0,0 +1,12 @@
+# wsgi.py
+"""
+WSGI entry point for production servers, e.g. `gunicorn -w 2 wsgi:app`.
+
+Each server worker imports this module and starts its job workers right away, so jobs
+queued before a restart are recovered without waiting for a request. With
+`gunicorn --preload` the workers are forked after import: call `start_job_workers()` from
+a post_fork hook instead.
+"""
+from app import app, start_job_workers
+
+start_job_workers()